@@ -0,0 +1,114 @@
+"""
+Attendance ingestion endpoints for the Flask backend.
+
+Register `attendance_bp` on the app, or run this file for a standalone
+ingestion server on port 5000:
+
+    POST /attendance        {"name": ..., "timestamp": <unix s>, "hash": ..., "session": ...}
+    POST /attendance/bulk   {"events": [<event>, ...]}
+
+Dashboard reads only touch the pre-aggregated rollup tables:
+
+    GET /dashboard/days?start=YYYY-MM-DD&end=YYYY-MM-DD
+    GET /dashboard/days/<date>
+    GET /dashboard/students/<name>?start=...&end=...
+    GET /dashboard/sessions/<date>
+
+"session" is the class period the event belongs to (one record per student
+per session); events without one are assigned attendance_store.session_id.
+"""
+from flask import Blueprint, Flask, current_app, g, jsonify, request
+import attendance_store
+
+attendance_bp = Blueprint("attendance", __name__)
+
+
+@attendance_bp.record_once
+def _migrate(state):
+    conn = attendance_store.connect(state.app.config.get("ATTENDANCE_DB", attendance_store.DB_PATH))
+    conn.close()
+
+
+def get_db():
+    if "attendance_db" not in g:
+        g.attendance_db = attendance_store.connect(
+            current_app.config.get("ATTENDANCE_DB", attendance_store.DB_PATH), migrate=False)
+    return g.attendance_db
+
+
+@attendance_bp.teardown_app_request
+def _close_db(exc):
+    conn = g.pop("attendance_db", None)
+    if conn is not None:
+        conn.close()
+
+
+@attendance_bp.route("/attendance", methods=["POST"])
+def record_attendance():
+    event = request.get_json(silent=True)
+    error = attendance_store.validate_event(event)
+    if error:
+        return jsonify({"message": error}), 400
+    inserted, _ = attendance_store.insert_events(get_db(), [event])
+    if not inserted:
+        # Already recorded for this session; clients treat 409 as delivered
+        return jsonify({"message": f"Attendance already recorded for {event['name']}"}), 409
+    return jsonify({"message": f"Attendance recorded for {event['name']}",
+                    "timestamp": attendance_store.format_timestamp(event["timestamp"])}), 201
+
+
+@attendance_bp.route("/attendance/bulk", methods=["POST"])
+def record_attendance_bulk():
+    body = request.get_json(silent=True) or {}
+    events = body.get("events")
+    if not isinstance(events, list) or not events:
+        return jsonify({"message": "events must be a non-empty list"}), 400
+    for index, event in enumerate(events):
+        error = attendance_store.validate_event(event)
+        if error:
+            return jsonify({"message": f"event {index}: {error}"}), 400
+    inserted, duplicates = attendance_store.insert_events(get_db(), events)
+    return jsonify({"message": f"Recorded {inserted} attendance events",
+                    "inserted": inserted, "duplicates": duplicates}), 201
+
+
+@attendance_bp.route("/dashboard/days", methods=["GET"])
+def dashboard_days():
+    rows = attendance_store.daily_summary(get_db(), request.args.get("start"),
+                                          request.args.get("end"))
+    return jsonify([{"date": d, "students": students, "events": events}
+                    for d, students, events in rows])
+
+
+@attendance_bp.route("/dashboard/days/<date>", methods=["GET"])
+def dashboard_day(date):
+    rows = attendance_store.day_detail(get_db(), date)
+    return jsonify([{"name": name, "first_seen": first, "last_seen": last, "count": count}
+                    for name, first, last, count in rows])
+
+
+@attendance_bp.route("/dashboard/students/<name>", methods=["GET"])
+def dashboard_student(name):
+    rows = attendance_store.student_summary(get_db(), name, request.args.get("start"),
+                                            request.args.get("end"))
+    return jsonify([{"date": d, "first_seen": first, "last_seen": last, "count": count}
+                    for d, first, last, count in rows])
+
+
+@attendance_bp.route("/dashboard/sessions/<date>", methods=["GET"])
+def dashboard_sessions(date):
+    rows = attendance_store.session_summary(get_db(), date)
+    return jsonify([{"session": session, "first_seen": first, "last_seen": last,
+                     "students": students}
+                    for session, first, last, students in rows])
+
+
+def create_app(db_path=attendance_store.DB_PATH):
+    app = Flask(__name__)
+    app.config["ATTENDANCE_DB"] = db_path
+    app.register_blueprint(attendance_bp)
+    return app
+
+
+if __name__ == "__main__":
+    create_app().run(port=5000)
@@ -0,0 +1,182 @@
+import collections
+import random
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from bounded_queue import BoundedQueue, BLOCK
+from metrics import REGISTRY
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# 409 means the backend already has the event (idempotent re-send), so it counts as delivered
+ACK_STATUSES = {200, 201, 409}
+
+
+def is_permanent(response):
+    """A 4xx the backend will return again on every retry: the event itself is bad."""
+    return (response is not None and 400 <= response.status_code < 500
+            and response.status_code not in (409, 429))
+
+
+class AttendanceClient:
+    """
+    Background attendance submitter for the Flask backend.
+
+    submit() only enqueues the payload, so the video loop never waits on
+    the network. A sender thread coalesces whatever is queued (up to
+    `max_batch` events, waiting at most `max_wait` seconds for more) into one
+    POST to `bulk_url` over a pooled keep-alive session; a single event goes
+    to `api_url` as before. Connection errors, 429 and 5xx responses are
+    retried with exponential backoff and jitter. If the backend has no bulk
+    endpoint (404) the batch is sent event by event, and so is a batch the
+    backend refuses outright (e.g. 400 for one malformed event), so only
+    the bad events fail.
+    """
+
+    def __init__(self, api_url, bulk_url=None, max_batch=100, max_wait=0.05,
+                 queue_size=10000, max_retries=5, backoff=0.5, max_backoff=30.0,
+                 timeout=5.0, on_failure=None):
+        self.api_url = api_url
+        self.bulk_url = bulk_url or api_url.rstrip("/") + "/bulk"
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.on_failure = on_failure
+        self.queue = BoundedQueue(queue_size, BLOCK)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.sent = 0
+        self.failed = 0
+        self.rejected = 0
+        self.retries = 0
+        self.batches = 0
+        self._latencies = collections.deque(maxlen=1000)  # seconds per POST
+        self._bulk_supported = True
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._send_loop, daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self, timeout=10.0):
+        """Stop after flushing what is queued (bounded by `timeout`)."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.session.close()
+
+    def submit(self, payload, timeout=0.5):
+        """Queue one event; returns False if the queue stayed full."""
+        if self.queue.put(payload, timeout=timeout):
+            return True
+        self.rejected += 1
+        return False
+
+    def metrics(self):
+        latencies = sorted(self._latencies)
+        return {
+            "queue_depth": len(self.queue),
+            "sent": self.sent,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "retries": self.retries,
+            "batches": self.batches,
+            "send_latency_avg_ms": 1000 * sum(latencies) / len(latencies) if latencies else None,
+            "send_latency_p95_ms": 1000 * latencies[int(0.95 * (len(latencies) - 1))]
+            if latencies else None,
+        }
+
+    def _next_batch(self):
+        first = self.queue.get(timeout=0.1)
+        if first is None:
+            return []
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            item = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            if item is None:
+                break
+            batch.append(item)
+        return batch
+
+    def send(self, batch):
+        """
+        Deliver a list of payloads now, on the calling thread (with retries).
+
+        Returns (failed, invalid): payloads worth retrying later, and payloads
+        the backend rejected permanently (a 4xx other than 409/429).
+        """
+        if len(batch) > 1 and self._bulk_supported:
+            response = self._post(self.bulk_url, {"events": batch})
+            if response is not None and response.status_code == 404:
+                self._bulk_supported = False
+                print("Backend has no bulk endpoint; sending events one by one")
+            elif is_permanent(response):
+                print(f"Bulk request rejected ({response.status_code}); "
+                      "sending events one by one to isolate the bad ones")
+            else:
+                return (batch, []) if not self._finish(batch, response) else ([], [])
+        failed, invalid = [], []
+        for payload in batch:
+            response = self._post(self.api_url, payload)
+            if not self._finish([payload], response):
+                (invalid if is_permanent(response) else failed).append(payload)
+        return failed, invalid
+
+    def _send_loop(self):
+        while not self._stop.is_set() or len(self.queue):
+            batch = self._next_batch()
+            if not batch:
+                continue
+            failed, invalid = self.send(batch)
+            if (failed or invalid) and self.on_failure is not None:
+                self.on_failure(failed + invalid)
+
+    def _post(self, url, body):
+        """POST with retries; returns the final response, or None if it never connected."""
+        for attempt in range(self.max_retries + 1):
+            start = time.perf_counter()
+            try:
+                response = self.session.post(url, json=body, timeout=self.timeout)
+            except requests.RequestException as e:
+                response = None
+                error = e
+            self._latencies.append(time.perf_counter() - start)
+            REGISTRY.observe("post", time.perf_counter() - start)
+            if response is not None and response.status_code not in RETRY_STATUSES:
+                return response
+            if attempt == self.max_retries:
+                if response is None:
+                    print("Error sending request:", error)
+                return response
+            self.retries += 1
+            delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+            time.sleep(delay * random.uniform(0.5, 1.0))
+        return None
+
+    def _finish(self, batch, response):
+        self.batches += 1
+        if response is not None and response.status_code in ACK_STATUSES:
+            self.sent += len(batch)
+            try:
+                data = response.json()
+                print(data.get("message", "No message in response"))
+                if "timestamp" in data:
+                    print("Recorded at:", data["timestamp"])
+            except ValueError:
+                print("Server returned non-JSON:", response.text)
+            return True
+        self.failed += len(batch)
+        if response is not None:
+            print(f"Server returned status code {response.status_code}")
+            print("Response text:", response.text)
+        return False
@@ -0,0 +1,163 @@
+"""
+Streaming attendance export from the SQLite store or the contract.
+
+    python attendance_export.py db --format csv --output term.csv
+    python attendance_export.py chain --contract 0xABC... --format ndjson
+    python attendance_export.py db --output term.csv --resume <token>
+
+Rows are read in fixed-size pages (keyset pagination on id for SQLite,
+getAllRecords(start, end) windows on chain) and written as they arrive, so
+memory use does not depend on the size of the export. After every page a
+resume token is printed to stderr; passing it back with --resume continues
+after the last row written and appends to the output file.
+"""
+import argparse
+import base64
+import csv
+import json
+import sys
+from datetime import datetime
+import attendance_store
+
+DB_FIELDS = ["id", "name", "timestamp", "hash", "session_id"]
+
+
+def encode_token(state):
+    return base64.urlsafe_b64encode(json.dumps(state).encode("utf-8")).decode("ascii")
+
+
+def decode_token(token):
+    try:
+        return json.loads(base64.urlsafe_b64decode(token.encode("ascii")))
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid resume token")
+
+
+def iter_db_pages(conn, page_size=1000, after_id=0, start=None, end=None):
+    """
+    Yield pages (lists of dicts) of attendance rows with id > after_id, in id
+    order. Each page is a fresh indexed range query, so no cursor is held
+    open between pages.
+    """
+    sql = "SELECT id, name, timestamp, hash, session_id FROM attendance WHERE id > ?"
+    filters = []
+    if start is not None:
+        sql += " AND timestamp >= ?"
+        filters.append(attendance_store.format_timestamp(start))
+    if end is not None:
+        sql += " AND timestamp < ?"
+        filters.append(attendance_store.format_timestamp(end))
+    sql += " ORDER BY id LIMIT ?"
+    while True:
+        rows = conn.execute(sql, [after_id] + filters + [page_size]).fetchall()
+        if not rows:
+            return
+        yield [dict(zip(DB_FIELDS, row)) for row in rows]
+        after_id = rows[-1][0]
+
+
+def iter_chain_pages(contract_address, page_size=100, start=0):
+    """Yield pages of on-chain records as dicts with their record index."""
+    import blockchain_client  # web3 is only needed for chain exports
+
+    page = []
+    for index, record in blockchain_client.iter_records(contract_address, page_size, start):
+        row = {"index": index}
+        row.update(blockchain_client.record_to_dict(record))
+        page.append(row)
+        if len(page) == page_size:
+            yield page
+            page = []
+    if page:
+        yield page
+
+
+def next_state(source, state, page):
+    """Resume state after `page` has been written."""
+    if source == "db":
+        return dict(state, after_id=page[-1]["id"])
+    return dict(state, next_index=page[-1]["index"] + 1)
+
+
+def export(pages, out, fmt, source, state, write_header=True, on_page=None):
+    """
+    Write pages to `out` as CSV or NDJSON, flushing after each page. Returns
+    the number of rows written; `on_page(token)` is called after each page.
+    """
+    writer = None
+    count = 0
+    for page in pages:
+        if fmt == "ndjson":
+            for row in page:
+                out.write(json.dumps(row, default=str) + "\n")
+        else:
+            if writer is None:
+                writer = csv.DictWriter(out, fieldnames=list(page[0]), extrasaction="ignore")
+                if write_header:
+                    writer.writeheader()
+            writer.writerows(page)
+        out.flush()
+        count += len(page)
+        state = next_state(source, state, page)
+        if on_page is not None:
+            on_page(encode_token(state))
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream attendance records out as CSV/NDJSON")
+    parser.add_argument("source", choices=["db", "chain"])
+    parser.add_argument("--db", default=attendance_store.DB_PATH)
+    parser.add_argument("--contract", help="contract address (chain source)")
+    parser.add_argument("--format", choices=["csv", "ndjson"], default="csv")
+    parser.add_argument("--output", default="-", help="file path, '-' for stdout")
+    parser.add_argument("--page-size", type=int, default=None)
+    parser.add_argument("--start", help="db only: first day/time to export (ISO)")
+    parser.add_argument("--end", help="db only: export before this day/time (ISO)")
+    parser.add_argument("--resume", help="token printed by an earlier, interrupted export")
+    args = parser.parse_args()
+
+    if args.resume:
+        state = decode_token(args.resume)
+    else:
+        state = {"source": args.source, "start": args.start, "end": args.end}
+    if state.get("source") != args.source:
+        parser.error("resume token was issued for a different source")
+
+    if args.source == "db":
+        conn = attendance_store.connect(args.db)
+        start, end = (datetime.fromisoformat(state[k]) if state.get(k) else None
+                      for k in ("start", "end"))
+        pages = iter_db_pages(conn, args.page_size or 1000, after_id=state.get("after_id", 0),
+                              start=start, end=end)
+    else:
+        contract = args.contract or state.get("contract")
+        if not contract:
+            parser.error("--contract is required for chain exports")
+        state["contract"] = contract
+        pages = iter_chain_pages(contract, args.page_size or 100,
+                                 start=state.get("next_index", 0))
+
+    resuming = args.resume is not None
+    out = sys.stdout if args.output == "-" else open(args.output, "a" if resuming else "w",
+                                                     newline="")
+    last_token = [args.resume]
+
+    def on_page(token):
+        last_token[0] = token
+        print(f"resume token: {token}", file=sys.stderr)
+
+    try:
+        count = export(pages, out, args.format, args.source, state,
+                       write_header=not resuming, on_page=on_page)
+        print(f"Exported {count} records", file=sys.stderr)
+    except KeyboardInterrupt:
+        print(f"Interrupted; continue with --resume {last_token[0]}", file=sys.stderr)
+        sys.exit(130)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+import hashlib
+import math
+import os
+import sqlite3
+from datetime import datetime
+
+DB_PATH = "attendance.db"
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S.%f"  # same text format flask_sqlalchemy writes
+# Length of a class period, counted from local midnight: the one setting the
+# live script, batch_process and the API all use. Clients send the period an
+# event falls in as its "session"; events without one (older clients) are
+# put in the same period here.
+SESSION_SECONDS = float(os.getenv("SESSION_SECONDS", "3600"))
+# Key mixed into every attendance hash (compute_attendance_hash). Keep it
+# private, e.g. in an .env file; the live script, reconcile.py and
+# merkle_anchor.py must all see the same value.
+SECRET_KEY = os.getenv("SECRET_KEY", "YourSecretKeyHere")
+# Accepted event timestamps (unix seconds): 2000-01-01 .. 2100-01-01 UTC
+MIN_TIMESTAMP = 946684800
+MAX_TIMESTAMP = 4102444800
+
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-65536",       # 64 MiB page cache
+    "PRAGMA mmap_size=268435456",     # 256 MiB memory-mapped reads
+    "PRAGMA busy_timeout=5000",
+)
+
+# Columns added on top of the original (id, name, timestamp) table. Legacy
+# rows keep a NULL session_id, which the unique index treats as distinct.
+MIGRATIONS = (
+    ("hash", "ALTER TABLE attendance ADD COLUMN hash TEXT"),
+    ("session_id", "ALTER TABLE attendance ADD COLUMN session_id TEXT"),
+)
+
+INDEXES = (
+    "CREATE INDEX IF NOT EXISTS ix_attendance_name_timestamp ON attendance (name, timestamp)",
+    "CREATE INDEX IF NOT EXISTS ix_attendance_timestamp ON attendance (timestamp)",
+    "CREATE INDEX IF NOT EXISTS ix_attendance_hash ON attendance (hash)",  # chain reconciliation
+    # One row per student per session: duplicates are rejected by the index itself
+    "CREATE UNIQUE INDEX IF NOT EXISTS ux_attendance_name_session ON attendance (name, session_id)",
+)
+
+
+# Dashboard rollups, maintained by triggers inside the same transaction as
+# the raw insert (so they only count rows that were actually inserted):
+#   attendance_daily     one row per (date, student)
+#   attendance_days      one row per date: distinct students seen
+#   attendance_sessions  one row per session/class period
+ROLLUP_SCHEMA = """
+CREATE TABLE IF NOT EXISTS attendance_daily (
+    date TEXT NOT NULL,
+    name VARCHAR(50) NOT NULL,
+    first_seen DATETIME NOT NULL,
+    last_seen DATETIME NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (date, name)
+);
+CREATE INDEX IF NOT EXISTS ix_attendance_daily_name ON attendance_daily (name, date);
+
+CREATE TABLE IF NOT EXISTS attendance_days (
+    date TEXT PRIMARY KEY,
+    students INTEGER NOT NULL,
+    events INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS attendance_sessions (
+    session_id TEXT PRIMARY KEY,
+    date TEXT NOT NULL,
+    first_seen DATETIME NOT NULL,
+    last_seen DATETIME NOT NULL,
+    students INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_attendance_sessions_date ON attendance_sessions (date);
+
+CREATE TRIGGER IF NOT EXISTS trg_attendance_rollup AFTER INSERT ON attendance
+WHEN NEW.timestamp IS NOT NULL
+BEGIN
+    INSERT INTO attendance_days (date, students, events)
+    VALUES (substr(NEW.timestamp, 1, 10), 0, 1)
+    ON CONFLICT (date) DO UPDATE SET events = events + 1;
+
+    INSERT INTO attendance_daily (date, name, first_seen, last_seen, count)
+    VALUES (substr(NEW.timestamp, 1, 10), NEW.name, NEW.timestamp, NEW.timestamp, 1)
+    ON CONFLICT (date, name) DO UPDATE SET
+        first_seen = min(first_seen, excluded.first_seen),
+        last_seen = max(last_seen, excluded.last_seen),
+        count = count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_attendance_session_rollup AFTER INSERT ON attendance
+WHEN NEW.timestamp IS NOT NULL AND NEW.session_id IS NOT NULL
+BEGIN
+    INSERT INTO attendance_sessions (session_id, date, first_seen, last_seen, students)
+    VALUES (NEW.session_id, substr(NEW.timestamp, 1, 10), NEW.timestamp, NEW.timestamp, 1)
+    ON CONFLICT (session_id) DO UPDATE SET
+        first_seen = min(first_seen, excluded.first_seen),
+        last_seen = max(last_seen, excluded.last_seen),
+        students = students + 1;
+END;
+
+-- A new (date, name) row means one more distinct student that day
+CREATE TRIGGER IF NOT EXISTS trg_attendance_daily_students AFTER INSERT ON attendance_daily
+BEGIN
+    UPDATE attendance_days SET students = students + 1 WHERE date = NEW.date;
+END;
+"""
+
+
+def connect(path=DB_PATH, migrate=True):
+    """Open the attendance DB with the tuned pragmas (and an up-to-date schema)."""
+    conn = sqlite3.connect(path, check_same_thread=False)
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    if migrate:
+        ensure_schema(conn)
+    return conn
+
+
+def ensure_schema(conn):
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS attendance ("
+        "id INTEGER NOT NULL, name VARCHAR(50) NOT NULL, timestamp DATETIME, "
+        "PRIMARY KEY (id))")
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(attendance)")}
+    for column, sql in MIGRATIONS:
+        if column not in columns:
+            conn.execute(sql)
+    for sql in INDEXES:
+        conn.execute(sql)
+    conn.commit()
+    rollups_exist = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'attendance_daily'").fetchone()
+    conn.executescript(ROLLUP_SCHEMA)
+    if not rollups_exist:
+        rebuild_rollups(conn)  # first run on an existing DB: backfill from history
+
+
+def rebuild_rollups(conn):
+    """Recompute every rollup table from the raw attendance rows."""
+    with conn:
+        conn.execute("DELETE FROM attendance_daily")
+        conn.execute("DELETE FROM attendance_days")
+        conn.execute("DELETE FROM attendance_sessions")
+        conn.execute(
+            "INSERT INTO attendance_days (date, students, events) "
+            "SELECT substr(timestamp, 1, 10), 0, COUNT(*) FROM attendance "
+            "WHERE timestamp IS NOT NULL GROUP BY 1")
+        # attendance_days.students is filled in by the attendance_daily trigger
+        conn.execute(
+            "INSERT INTO attendance_daily (date, name, first_seen, last_seen, count) "
+            "SELECT substr(timestamp, 1, 10), name, MIN(timestamp), MAX(timestamp), COUNT(*) "
+            "FROM attendance WHERE timestamp IS NOT NULL GROUP BY 1, 2")
+        conn.execute(
+            "INSERT INTO attendance_sessions (session_id, date, first_seen, last_seen, students) "
+            "SELECT session_id, substr(MIN(timestamp), 1, 10), MIN(timestamp), MAX(timestamp), "
+            "COUNT(*) FROM attendance "
+            "WHERE timestamp IS NOT NULL AND session_id IS NOT NULL GROUP BY session_id")
+
+
+def rollup_mismatches(conn):
+    """
+    Rollup rows that differ from a fresh aggregation of the raw table, as
+    [(table, row), ...]; empty when the triggers kept everything in step.
+    """
+    expected = {
+        "attendance_days": (
+            "SELECT substr(timestamp, 1, 10), COUNT(DISTINCT name), COUNT(*) FROM attendance "
+            "WHERE timestamp IS NOT NULL GROUP BY 1",
+            "SELECT date, students, events FROM attendance_days"),
+        "attendance_daily": (
+            "SELECT substr(timestamp, 1, 10), name, MIN(timestamp), MAX(timestamp), COUNT(*) "
+            "FROM attendance WHERE timestamp IS NOT NULL GROUP BY 1, 2",
+            "SELECT date, name, first_seen, last_seen, count FROM attendance_daily"),
+        "attendance_sessions": (
+            "SELECT session_id, substr(MIN(timestamp), 1, 10), MIN(timestamp), MAX(timestamp), "
+            "COUNT(*) FROM attendance WHERE timestamp IS NOT NULL AND session_id IS NOT NULL "
+            "GROUP BY session_id",
+            "SELECT session_id, date, first_seen, last_seen, students FROM attendance_sessions"),
+    }
+    mismatches = []
+    for table, (fresh, stored) in expected.items():
+        for a, b in ((fresh, stored), (stored, fresh)):
+            mismatches += [(table, row) for row in conn.execute(f"{a} EXCEPT {b}")]
+    return mismatches
+
+
+def format_timestamp(value):
+    """Unix seconds (int/float) or datetime -> the table's DATETIME text."""
+    if isinstance(value, (int, float)):
+        value = datetime.fromtimestamp(value)
+    return value.strftime(TIMESTAMP_FORMAT)
+
+
+def compute_attendance_hash(name, timestamp, secret_key):
+    """
+    Combine the name, timestamp, and a secret key, then compute a SHA-256 hash.
+    """
+    data_str = f"{name}|{timestamp}|{secret_key}"
+    return hashlib.sha256(data_str.encode("utf-8")).hexdigest()
+
+
+def session_id(timestamp, period_seconds=SESSION_SECONDS):
+    """Id of the class period containing `timestamp`: its local start, "YYYY-MM-DDTHH:MM"."""
+    moment = datetime.fromtimestamp(timestamp)
+    midnight = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    elapsed = (moment - midnight).total_seconds()
+    start = midnight.timestamp() + elapsed // period_seconds * period_seconds
+    return datetime.fromtimestamp(start).strftime("%Y-%m-%dT%H:%M")
+
+
+def session_for(event):
+    """The event's session id: its "session" field, else its class period."""
+    if event.get("session"):
+        return str(event["session"])
+    return session_id(event["timestamp"])
+
+
+def validate_event(event):
+    """Returns an error string for a malformed event, or None."""
+    if not isinstance(event, dict):
+        return "event must be an object"
+    name = event.get("name")
+    if not isinstance(name, str) or not name or len(name) > 50:
+        return "name must be a non-empty string of at most 50 characters"
+    timestamp = event.get("timestamp")
+    # bool is an int subclass, and NaN/inf/huge values break format_timestamp
+    if (isinstance(timestamp, bool) or not isinstance(timestamp, (int, float))
+            or not math.isfinite(timestamp)
+            or not MIN_TIMESTAMP <= timestamp < MAX_TIMESTAMP):
+        return "timestamp must be unix seconds between 2000 and 2100"
+    return None
+
+
+def insert_events(conn, events):
+    """
+    Insert many events in one transaction with executemany.
+
+    Returns (inserted, duplicates); a duplicate is a second event for the
+    same student and session, rejected by the unique index.
+    """
+    rows = [(e["name"], format_timestamp(e["timestamp"]), e.get("hash"), session_for(e))
+            for e in events]
+    with conn:
+        cursor = conn.executemany(
+            "INSERT OR IGNORE INTO attendance (name, timestamp, hash, session_id) "
+            "VALUES (?, ?, ?, ?)", rows)
+    # rowcount (sqlite3_changes) leaves out the rows the rollup triggers touch
+    inserted = cursor.rowcount
+    return inserted, len(rows) - inserted
+
+
+def records_for_student(conn, name, start=None, end=None):
+    """Rows for one student, optionally within [start, end), via (name, timestamp)."""
+    sql = "SELECT id, name, timestamp, hash, session_id FROM attendance WHERE name = ?"
+    params = [name]
+    if start is not None:
+        sql += " AND timestamp >= ?"
+        params.append(format_timestamp(start))
+    if end is not None:
+        sql += " AND timestamp < ?"
+        params.append(format_timestamp(end))
+    return conn.execute(sql + " ORDER BY timestamp", params).fetchall()
+
+
+def daily_summary(conn, start_date=None, end_date=None):
+    """[(date, students, events)] per day from the rollup, dates as YYYY-MM-DD."""
+    sql = "SELECT date, students, events FROM attendance_days WHERE date >= ? AND date <= ?"
+    return conn.execute(sql + " ORDER BY date",
+                        (start_date or "0000-00-00", end_date or "9999-99-99")).fetchall()
+
+
+def day_detail(conn, date):
+    """[(name, first_seen, last_seen, count)] for every student seen on `date`."""
+    return conn.execute(
+        "SELECT name, first_seen, last_seen, count FROM attendance_daily "
+        "WHERE date = ? ORDER BY name", (date,)).fetchall()
+
+
+def student_summary(conn, name, start_date=None, end_date=None):
+    """[(date, first_seen, last_seen, count)] for one student."""
+    return conn.execute(
+        "SELECT date, first_seen, last_seen, count FROM attendance_daily "
+        "WHERE name = ? AND date >= ? AND date <= ? ORDER BY date",
+        (name, start_date or "0000-00-00", end_date or "9999-99-99")).fetchall()
+
+
+def session_summary(conn, date):
+    """[(session_id, first_seen, last_seen, students)] for the sessions held on `date`."""
+    return conn.execute(
+        "SELECT session_id, first_seen, last_seen, students FROM attendance_sessions "
+        "WHERE date = ? ORDER BY first_seen", (date,)).fetchall()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Attendance DB maintenance")
+    parser.add_argument("command", choices=["migrate", "rebuild-rollups", "check-rollups"])
+    parser.add_argument("--db", default=DB_PATH)
+    args = parser.parse_args()
+
+    conn = connect(args.db)
+    if args.command == "rebuild-rollups":
+        rebuild_rollups(conn)
+        print("Rollups rebuilt:", conn.execute("SELECT COUNT(*) FROM attendance_days").fetchone()[0],
+              "days,", conn.execute("SELECT COUNT(*) FROM attendance_daily").fetchone()[0],
+              "student-days")
+    elif args.command == "check-rollups":
+        mismatches = rollup_mismatches(conn)
+        for table, row in mismatches:
+            print(table, row)
+        print(f"{len(mismatches)} rollup rows out of step" if mismatches else "Rollups match")
+    conn.close()
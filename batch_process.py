@@ -0,0 +1,167 @@
+"""
+Headless batch attendance from recorded footage and photo folders.
+
+    python batch_process.py lecture1.mp4 lecture2.mp4 photos/ --stride 15 --output events.csv
+    python batch_process.py lecture1.mp4 --db attendance.db
+
+Videos are decoded with a frame stride, images directories are read in name
+order, and detection/encoding runs on a process pool across all cores. The
+first sighting of each person per class period (attendance_store.session_id,
+SESSION_SECONDS long, as in the live script) in each input becomes one
+attendance event. No window is opened; throughput is printed at the end.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from functools import partial
+import cv2
+import attendance_store
+from encoding_cache import load_known_faces, IMAGE_EXTENSIONS
+from encoding_pool import EncodingPool
+from face_matcher import make_matcher, UNKNOWN_NAME
+from recognition_pipeline import detect_and_encode
+
+
+def iter_video(path, stride, start_time=None):
+    """
+    Yield (timestamp, frame) for every `stride`-th frame. Without start_time
+    the recording is assumed to have ended at the file's mtime.
+    """
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        print(f"Error: Could not open video {path}")
+        return
+    fps = capture.get(cv2.CAP_PROP_FPS) or 25.0
+    if start_time is None:
+        frame_count = capture.get(cv2.CAP_PROP_FRAME_COUNT) or 0
+        start_time = os.path.getmtime(path) - frame_count / fps
+    index = 0
+    while True:
+        if index % stride:
+            # grab() skips decoding frames we are not going to look at
+            if not capture.grab():
+                break
+        else:
+            ret, frame = capture.read()
+            if not ret:
+                break
+            yield start_time + index / fps, frame
+        index += 1
+    capture.release()
+
+
+def iter_images(directory):
+    """Yield (file mtime, frame) for each image in the directory, in name order."""
+    for filename in sorted(os.listdir(directory)):
+        if filename.lower().endswith(IMAGE_EXTENSIONS):
+            path = os.path.join(directory, filename)
+            frame = cv2.imread(path)
+            if frame is not None:
+                yield os.path.getmtime(path), frame
+
+
+def iter_input(path, stride, start_time=None):
+    if os.path.isdir(path):
+        return iter_images(path)
+    return iter_video(path, stride, start_time)
+
+
+def process_input(path, pool, matcher, stride, start_time=None):
+    """Returns ([(name, timestamp), ...] first sightings per session, frames processed)."""
+    timestamps = []
+
+    def frames():
+        for timestamp, frame in iter_input(path, stride, start_time):
+            timestamps.append(timestamp)
+            yield frame
+
+    seen = {}
+    count = 0
+    for count, (face_locations, face_encodings) in enumerate(pool.map(frames()), start=1):
+        timestamp = timestamps[count - 1]
+        for name in matcher.identify(face_encodings):
+            key = (name, attendance_store.session_id(timestamp))
+            if name != UNKNOWN_NAME and key not in seen:
+                seen[key] = timestamp
+    return sorted(((name, ts) for (name, _), ts in seen.items()), key=lambda item: item[1]), count
+
+
+def write_events(events, output):
+    """CSV or NDJSON depending on the extension; '-' writes CSV to stdout."""
+    if output == "-":
+        f = sys.stdout
+    else:
+        f = open(output, "w", newline="")
+    try:
+        if output.endswith((".ndjson", ".jsonl")):
+            for event in events:
+                f.write(json.dumps(event) + "\n")
+        else:
+            writer = csv.DictWriter(f, fieldnames=["name", "timestamp", "session", "source"])
+            writer.writeheader()
+            writer.writerows(events)
+    finally:
+        if f is not sys.stdout:
+            f.close()
+
+
+def write_events_db(events, db_path):
+    """Insert into the backend's attendance table in one transaction."""
+    conn = attendance_store.connect(db_path)
+    try:
+        inserted, duplicates = attendance_store.insert_events(conn, events)
+    finally:
+        conn.close()
+    print(f"Inserted {inserted} events into {db_path} ({duplicates} already recorded)",
+          file=sys.stderr)
+
+
+def main():
+    from face_recognition_script import KNOWN_FACES_DIR, MATCHER_KIND, ENROL_TEMPLATE
+
+    parser = argparse.ArgumentParser(description="Batch attendance from recorded video and images")
+    parser.add_argument("inputs", nargs="+", help="video files and/or image directories")
+    parser.add_argument("--stride", type=int, default=15, help="process every Nth video frame")
+    parser.add_argument("--scale", type=float, default=1.0, help="detection scale, e.g. 0.5")
+    parser.add_argument("--processes", type=int, default=None, help="default: all cores")
+    parser.add_argument("--start", help="recording start (ISO time) for video timestamps")
+    parser.add_argument("--output", default="-", help="events file (.csv or .ndjson)")
+    parser.add_argument("--db", help="write events to this SQLite attendance DB instead")
+    args = parser.parse_args()
+
+    start_time = datetime.fromisoformat(args.start).timestamp() if args.start else None
+    known_faces, known_names = load_known_faces(KNOWN_FACES_DIR, template=ENROL_TEMPLATE)
+    matcher = make_matcher(MATCHER_KIND, known_faces, known_names, tolerance=0.5)
+
+    events = []
+    total_frames = 0
+    started = time.perf_counter()
+    with EncodingPool(processes=args.processes,
+                      encode_frame=partial(detect_and_encode, scale=args.scale)) as pool:
+        for path in args.inputs:
+            input_started = time.perf_counter()
+            sightings, frames = process_input(path, pool, matcher, args.stride, start_time)
+            elapsed = time.perf_counter() - input_started
+            total_frames += frames
+            events.extend({"name": name, "timestamp": ts, "session": attendance_store.session_id(ts),
+                           "source": path} for name, ts in sightings)
+            print(f"{path}: {frames} frames, {len(sightings)} people, "
+                  f"{frames / elapsed if elapsed else 0:.1f} fps", file=sys.stderr)
+
+    elapsed = time.perf_counter() - started
+    print(f"Total: {total_frames} frames in {elapsed:.1f}s "
+          f"({total_frames / elapsed if elapsed else 0:.1f} fps), {len(events)} events",
+          file=sys.stderr)
+
+    if args.db:
+        write_events_db(events, args.db)
+    else:
+        write_events(events, args.output)
+
+
+if __name__ == "__main__":
+    main()
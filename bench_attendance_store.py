@@ -0,0 +1,94 @@
+"""
+Benchmark: bulk insert rate and query latency of the attendance store.
+
+    python bench_attendance_store.py --rows 10000000 --db /tmp/bench_attendance.db
+
+Inserts synthetic events through attendance_store.insert_events in batches
+(the same path as POST /attendance/bulk), then times per-student and
+per-day lookups against the indexed table and the dashboard rollups.
+"""
+import argparse
+import os
+import random
+import time
+import attendance_store
+
+DAY = 24 * 3600
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--students", type=int, default=20_000)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--db", default="bench_attendance.db")
+    args = parser.parse_args()
+
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(args.db + suffix):
+            os.remove(args.db + suffix)
+    conn = attendance_store.connect(args.db)
+
+    # One event per student per hourly session, spread over consecutive days
+    start_ts = 1_700_000_000
+    rng = random.Random(0)
+    inserted = 0
+    started = time.perf_counter()
+    for batch_start in range(0, args.rows, args.batch_size):
+        events = []
+        for i in range(batch_start, min(args.rows, batch_start + args.batch_size)):
+            session, student = divmod(i, args.students)
+            ts = start_ts + session * 3600 + rng.randrange(3600)
+            events.append({"name": f"student{student:06d}", "timestamp": ts,
+                           "hash": f"{i:064x}", "session": f"s{session}"})
+        inserted += attendance_store.insert_events(conn, events)[0]
+    insert_seconds = time.perf_counter() - started
+    print(f"insert: {inserted} rows in {insert_seconds:.1f}s "
+          f"({inserted / insert_seconds:,.0f} rows/s)")
+
+    end_ts = start_ts + (args.rows // args.students + 1) * 3600
+    timings = {"student": [], "student_week": [], "day": [],
+               "rollup_day": [], "rollup_student": []}
+    for _ in range(args.queries):
+        name = f"student{rng.randrange(args.students):06d}"
+        day = rng.randrange(start_ts, max(start_ts + 1, end_ts - DAY))
+
+        t = time.perf_counter()
+        attendance_store.records_for_student(conn, name)
+        timings["student"].append(time.perf_counter() - t)
+
+        t = time.perf_counter()
+        attendance_store.records_for_student(conn, name, day, day + 7 * DAY)
+        timings["student_week"].append(time.perf_counter() - t)
+
+        t = time.perf_counter()
+        conn.execute("SELECT COUNT(*) FROM attendance WHERE timestamp >= ? AND timestamp < ?",
+                     (attendance_store.format_timestamp(day),
+                      attendance_store.format_timestamp(day + DAY))).fetchone()
+        timings["day"].append(time.perf_counter() - t)
+
+        # What the dashboard actually reads
+        date = attendance_store.format_timestamp(day)[:10]
+        t = time.perf_counter()
+        attendance_store.daily_summary(conn, date, date)
+        attendance_store.day_detail(conn, date)
+        timings["rollup_day"].append(time.perf_counter() - t)
+
+        t = time.perf_counter()
+        attendance_store.student_summary(conn, name)
+        timings["rollup_student"].append(time.perf_counter() - t)
+
+    for query, values in timings.items():
+        print(f"{query:>13}: p50 {1000 * percentile(values, 0.5):.3f} ms, "
+              f"p99 {1000 * percentile(values, 0.99):.3f} ms")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
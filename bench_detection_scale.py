@@ -0,0 +1,79 @@
+"""
+Benchmark: detection scale vs. FPS and recognition accuracy on recorded clips.
+
+    python bench_detection_scale.py clip1.mp4 clip2.mp4 --stride 5
+
+Each clip is decoded once; every sampled frame is then recognised at each
+scale. Accuracy is the share of frames whose set of recognised names equals
+the full-resolution (scale 1.0) result, so no hand labelling is needed.
+"""
+import argparse
+import json
+import time
+import cv2
+from encoding_cache import load_known_faces
+from face_matcher import make_matcher
+from recognition_pipeline import DETECTION_SCALES, detect_and_encode
+
+
+def read_frames(path, stride, limit):
+    capture = cv2.VideoCapture(path)
+    frames = []
+    index = 0
+    while len(frames) < limit:
+        ret, frame = capture.read()
+        if not ret:
+            break
+        if index % stride == 0:
+            frames.append(frame)
+        index += 1
+    capture.release()
+    return frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("clips", nargs="+", help="recorded video files")
+    parser.add_argument("--known-faces", default="known_faces")
+    parser.add_argument("--scales", type=float, nargs="+", default=list(DETECTION_SCALES))
+    parser.add_argument("--stride", type=int, default=5, help="use every Nth frame")
+    parser.add_argument("--max-frames", type=int, default=200, help="per clip")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    matcher = make_matcher("exact", *load_known_faces(args.known_faces))
+    frames = [f for clip in args.clips for f in read_frames(clip, args.stride, args.max_frames)]
+    if not frames:
+        parser.error("no frames could be read from the given clips")
+    print(f"{len(frames)} frames, {frames[0].shape[1]}x{frames[0].shape[0]}, gallery of {len(matcher)}")
+
+    scales = sorted(set(args.scales) | {1.0}, reverse=True)
+    names_by_scale = {}
+    results = []
+    for scale in scales:
+        start = time.perf_counter()
+        names = []
+        faces = 0
+        for frame in frames:
+            face_locations, face_encodings = detect_and_encode(frame, scale)
+            names.append(frozenset(matcher.identify(face_encodings)))
+            faces += len(face_locations)
+        elapsed = time.perf_counter() - start
+        names_by_scale[scale] = names
+        reference = names_by_scale[1.0]
+        agreement = sum(a == b for a, b in zip(names, reference)) / len(frames)
+        results.append({"scale": scale, "fps": len(frames) / elapsed,
+                        "accuracy_vs_full": agreement,
+                        "faces": faces})
+
+    print(f"{'scale':>6} {'fps':>8} {'accuracy':>9} {'faces':>6}")
+    for r in results:
+        print(f"{r['scale']:>6.2f} {r['fps']:>8.2f} {r['accuracy_vs_full']:>9.1%} {r['faces']:>6}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"frames": len(frames), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Benchmark: blockchain_client start-up cost with a cold vs warm artifact cache.
+
+    python bench_import_time.py --runs 5
+
+Each run is a fresh interpreter that imports blockchain_client and loads the
+contract ABI/bytecode. The cold run starts without a cache file, so it pays
+for solc installation (first time only) and compilation; warm runs read the
+cached artifacts. No node is contacted.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+SNIPPET = """
+import json, time
+start = time.perf_counter()
+import blockchain_client
+imported = time.perf_counter()
+blockchain_client.load_artifacts()
+loaded = time.perf_counter()
+print(json.dumps({"import": imported - start, "artifacts": loaded - imported}))
+"""
+
+
+def run_once(cache_path):
+    env = dict(os.environ, ARTIFACT_CACHE=cache_path)
+    out = subprocess.run([sys.executable, "-c", SNIPPET], env=env, check=True,
+                         capture_output=True, text=True,
+                         cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def report(label, timings):
+    imports = [t["import"] * 1e3 for t in timings]
+    totals = [(t["import"] + t["artifacts"]) * 1e3 for t in timings]
+    print(f"{label}: import {statistics.median(imports):.1f} ms, "
+          f"import + artifacts {statistics.median(totals):.1f} ms "
+          f"(median of {len(timings)})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_path = os.path.join(tmp, "artifacts.json")
+        cold = []
+        for _ in range(args.runs):
+            if os.path.exists(cache_path):
+                os.remove(cache_path)
+            cold.append(run_once(cache_path))
+        warm = [run_once(cache_path) for _ in range(args.runs)]
+    report("cold", cold)
+    report("warm", warm)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Benchmark: per-record attendance transactions vs one Merkle root per window.
+
+    PROVIDER_URL=http://127.0.0.1:8545 python bench_merkle_anchor.py --records 200
+
+Runs against the node blockchain_client is configured for (a local Ganache
+or anvil instance). Deploys a fresh contract, records `records` students
+one transaction each, then anchors the same number of students as a single
+root, and reports wall time, throughput and gas per record for both paths,
+plus proof generation/verification cost.
+"""
+import argparse
+import os
+import tempfile
+import time
+import blockchain_client
+from merkle_anchor import MerkleAnchor, verify_proof
+
+SECRET_KEY = "bench-secret"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--records", type=int, default=200)
+    args = parser.parse_args()
+    names = [f"student{i}" for i in range(args.records)]
+
+    contract_address = blockchain_client.deploy_contract()
+
+    start = time.perf_counter()
+    gas = 0
+    for name in names:
+        gas += blockchain_client.record_attendance(contract_address, name, SECRET_KEY)["gasUsed"]
+    per_record_seconds = time.perf_counter() - start
+    print(f"per-record: {args.records} txs in {per_record_seconds:.2f}s "
+          f"({args.records / per_record_seconds:.1f} records/s), "
+          f"{gas / args.records:.0f} gas/record")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        anchor = MerkleAnchor(contract_address, SECRET_KEY,
+                              store_path=os.path.join(tmp, "anchors.db"))
+        timestamp = int(time.time())
+        start = time.perf_counter()
+        for name in names:
+            anchor.add(name, timestamp)
+        (_, root, receipt), = anchor.flush(force=True)
+        anchored_seconds = time.perf_counter() - start
+        print(f"anchored:   {args.records} records in 1 tx, {anchored_seconds:.2f}s "
+              f"({args.records / anchored_seconds:.1f} records/s), "
+              f"{receipt['gasUsed'] / args.records:.0f} gas/record")
+
+        start = time.perf_counter()
+        proofs = [anchor.proof_for(name, timestamp) for name in names]
+        proof_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        assert all(verify_proof(p["leaf"], p["proof"], p["root"]) for p in proofs)
+        verify_seconds = time.perf_counter() - start
+        anchor.close()
+
+    print(f"proofs:     {len(proofs[0]['proof'])} hashes each, "
+          f"{proof_seconds / args.records * 1e3:.2f} ms to build, "
+          f"{verify_seconds / args.records * 1e6:.1f} us to verify")
+    print(f"speedup:    {per_record_seconds / anchored_seconds:.1f}x time, "
+          f"{gas / receipt['gasUsed']:.1f}x gas")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Benchmark: how fast a backlog in the attendance outbox drains after an outage.
+
+    python bench_outbox_replay.py --events 5000 --batch-size 500
+
+Fills a temporary outbox with backlogged events, then replays it against a
+local stub backend that acknowledges bulk POSTs (so only the outbox, the
+client and HTTP are measured, not the Flask app or its database).
+"""
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from attendance_client import AttendanceClient
+from outbox import Outbox, OutboxSyncer
+
+
+class StubBackend(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real server behind a pooled session
+    received = 0
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        StubBackend.received += len(body.get("events", [body]))
+        out = json.dumps({"message": "ok"}).encode("utf-8")
+        self.send_response(201)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+    def log_message(self, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubBackend)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    api_url = f"http://127.0.0.1:{server.server_port}/attendance"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        outbox = Outbox(os.path.join(tmp, "outbox.db"))
+        start = time.perf_counter()
+        for i in range(args.events):
+            outbox.append({"name": f"student{i % 500}", "timestamp": 1700000000 + i,
+                           "hash": f"{i:064x}"})
+        append_seconds = time.perf_counter() - start
+
+        client = AttendanceClient(api_url)
+        syncer = OutboxSyncer(outbox, client, batch_size=args.batch_size)
+        start = time.perf_counter()
+        sent = syncer.drain()
+        replay_seconds = time.perf_counter() - start
+        client.close()
+        outbox.close()
+
+    server.shutdown()
+    print(f"append: {args.events} events in {append_seconds:.2f}s "
+          f"({args.events / append_seconds:.0f} events/s)")
+    print(f"replay: {sent} events in {replay_seconds:.2f}s "
+          f"({sent / replay_seconds:.0f} events/s), backend received {StubBackend.received}")
+
+
+if __name__ == "__main__":
+    main()
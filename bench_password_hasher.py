@@ -0,0 +1,58 @@
+"""
+Benchmark: concurrent logins with inline bcrypt vs the PasswordHasher pool.
+
+    python bench_password_hasher.py --users 200 --threads 32 --rounds 10
+
+Simulates a morning login burst: `threads` request threads (like Flask
+workers) each log users in. Reports logins/s and p50/p99 latency for
+  inline   bcrypt.checkpw on the request thread, as security.py used to
+  pool     PasswordHasher process pool, cold verified-session cache
+  cached   the same users again, served from the verified-session cache
+"""
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+import bcrypt
+from password_hasher import PasswordHasher
+
+
+def run(label, check, logins, threads):
+    latencies = []
+
+    def login(item):
+        started = time.perf_counter()
+        assert check(*item)
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(threads) as executor:
+        list(executor.map(login, logins))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    print(f"{label:<7} {len(logins) / elapsed:8.1f} logins/s  "
+          f"p50 {statistics.median(latencies) * 1e3:7.1f} ms  "
+          f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1e3:7.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--processes", type=int, default=None, help="default: all cores")
+    args = parser.parse_args()
+
+    with PasswordHasher(rounds=args.rounds, processes=args.processes,
+                        max_pending=args.threads) as hasher:
+        passwords = [f"password-{i}" for i in range(args.users)]
+        logins = [(p, h) for p, h in zip(passwords, map(hasher.hash, passwords))]
+
+        run("inline", lambda p, h: bcrypt.checkpw(p.encode("utf-8"), h), logins, args.threads)
+        run("pool", hasher.verify, logins, args.threads)
+        run("cached", hasher.verify, logins, args.threads)
+        print(f"cache hits: {hasher.cache_hits}, pool processes: {hasher.processes}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+"""
+End-to-end recognition benchmark with per-stage timings, saved as JSON.
+
+    python bench_recognition.py --sizes 100,1000,10000,100000 --output bench.json
+    python bench_recognition.py --fixtures fixtures/ --gallery known_faces --output bench.json
+    python bench_recognition.py --output new.json --compare bench.json
+
+Each frame goes through the same stages as the live loop: decode (JPEG to
+BGR), detect, encode, match (matcher.identify) and dispatch (dedup window
+plus an outbox append, as record_attendance does), headless. Detect and
+encode (HOG and dlib, usually the bulk of a frame) are only measured with
+--fixtures; the default synthetic mode times decode, match and dispatch.
+
+Fixtures mode (--fixtures) reads labelled frames, fixtures/<name>/*.jpg
+(put frames with no known person under fixtures/Unknown/), and runs real
+HOG detection and dlib encoding against the --gallery faces.
+
+Synthetic mode (the default) needs no dlib and is fully determined by
+--seed. Frames are generated JPEGs; each carries --faces query encodings that
+are noisy copies of gallery identities, with --unknown-rate of them strangers.
+Detect and encode are not run (reported as null).
+
+In both modes the gallery is padded with synthetic distractor identities up
+to each --sizes entry, so accuracy and match cost are measured as the
+gallery grows; a real gallery larger than an entry is used whole, and each
+run records its actual gallery_size. The JSON holds per-stage mean/p50/p99
+in ms, FPS, accuracy, matcher build time and memory (the resident-set growth
+while building and running that matcher, rss_delta_mb, since the process
+peak would carry over from the largest gallery run before); --compare prints the change against an
+earlier run, and --fail-on-regression turns a slowdown into a non-zero exit.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import cv2
+import numpy as np
+from attendance_store import SECRET_KEY, compute_attendance_hash, session_id
+from dedup_window import DedupWindow
+from face_matcher import make_matcher, UNKNOWN_NAME
+from outbox import Outbox
+
+STAGES = ("decode", "detect", "encode", "match", "dispatch")
+IDENTITY_SPREAD = 0.6  # distance between two random identities is about 0.85
+
+
+def random_identities(rng, count):
+    vectors = rng.standard_normal((count, 128))
+    vectors *= IDENTITY_SPREAD / np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def noisy_copy(rng, encoding):
+    """Another 'photo' of the same person: 0.15-0.45 away, under the 0.5 tolerance."""
+    noise = rng.standard_normal(128)
+    return encoding + noise * rng.uniform(0.15, 0.45) / np.linalg.norm(noise)
+
+
+def synthetic_frames(rng, count, gallery, names, faces, unknown_rate, shape=(480, 640)):
+    """[(jpeg bytes, encodings, expected names)], deterministic for a given rng."""
+    base = rng.integers(0, 256, (shape[0] // 8, shape[1] // 8, 3), dtype=np.uint8)
+    base = cv2.resize(base, (shape[1], shape[0]), interpolation=cv2.INTER_CUBIC)
+    frames = []
+    for i in range(count):
+        frame = np.roll(base, i * 7, axis=1)
+        ok, jpeg = cv2.imencode(".jpg", frame)
+        encodings, expected = [], []
+        for _ in range(faces):
+            if rng.random() < unknown_rate:
+                encodings.append(random_identities(rng, 1)[0])
+                expected.append(UNKNOWN_NAME)
+            else:
+                j = int(rng.integers(len(names)))
+                encodings.append(noisy_copy(rng, gallery[j]))
+                expected.append(names[j])
+        frames.append((jpeg.tobytes(), encodings, expected))
+    return frames
+
+
+def fixture_frames(directory):
+    """[(file bytes, None, [label])] from fixtures/<label>/<image>."""
+    from encoding_cache import IMAGE_EXTENSIONS
+
+    frames = []
+    for label in sorted(os.listdir(directory)):
+        folder = os.path.join(directory, label)
+        if not os.path.isdir(folder):
+            continue
+        for filename in sorted(os.listdir(folder)):
+            if filename.lower().endswith(IMAGE_EXTENSIONS):
+                with open(os.path.join(folder, filename), "rb") as f:
+                    frames.append((f.read(), None, [label]))
+    return frames
+
+
+def pad_gallery(rng, encodings, names, size):
+    """Add distractors up to `size` identities; a larger gallery is returned whole."""
+    if len(names) >= size:
+        return encodings, names
+    extra = size - len(names)
+    padded = np.vstack([encodings.reshape(-1, 128), random_identities(rng, extra)])
+    return padded, list(names) + [f"distractor{i}" for i in range(extra)]
+
+
+def summarize(samples):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return {
+        "mean_ms": round(statistics.fmean(ordered) * 1e3, 4),
+        "p50_ms": round(ordered[len(ordered) // 2] * 1e3, 4),
+        "p99_ms": round(ordered[max(0, int(len(ordered) * 0.99) - 1)] * 1e3, 4),
+    }
+
+
+def frame_correct(identified, expected):
+    known = [name for name in expected if name != UNKNOWN_NAME]
+    if len(expected) == 1:  # fixtures: one label per frame
+        return (set(identified) - {UNKNOWN_NAME} == set(known)) if known else \
+            all(name == UNKNOWN_NAME for name in identified)
+    return list(identified) == list(expected)
+
+
+def run(frames, matcher, secret_key, detect=None, encode=None):
+    """Time every stage for every frame; returns the result dict for one gallery."""
+    timings = {stage: [] for stage in STAGES}
+    correct = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        outbox = Outbox(os.path.join(tmp, "outbox.db"))
+        dedup = DedupWindow(seconds=3600)
+        started = time.perf_counter()
+        for data, encodings, expected in frames:
+            t0 = time.perf_counter()
+            frame = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+            t1 = time.perf_counter()
+            timings["decode"].append(t1 - t0)
+            if detect is not None:
+                locations = detect(frame)
+                t2 = time.perf_counter()
+                encodings = encode(frame, locations)
+                timings["detect"].append(t2 - t1)
+                t1 = time.perf_counter()
+                timings["encode"].append(t1 - t2)
+            names = matcher.identify(encodings)
+            t3 = time.perf_counter()
+            timings["match"].append(t3 - t1)
+            for name in names:
+                if name != UNKNOWN_NAME and dedup.should_record(name):
+                    timestamp = int(time.time())
+                    outbox.append({"name": name, "timestamp": timestamp,
+                                   "hash": compute_attendance_hash(name, timestamp, secret_key),
+                                   "session": session_id(timestamp)})
+            timings["dispatch"].append(time.perf_counter() - t3)
+            correct += frame_correct(names, expected)
+        elapsed = time.perf_counter() - started
+        outbox.close()
+    return {
+        "frames": len(frames),
+        "fps": round(len(frames) / elapsed, 2) if elapsed else None,
+        "accuracy": round(correct / len(frames), 4) if frames else None,
+        "stages": {stage: summarize(timings[stage]) for stage in STAGES},
+    }
+
+
+def rss_mb():
+    """Current resident set size in MiB (Linux), or None."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        return None
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, cwd=os.path.dirname(os.path.abspath(__file__))
+                              ).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(results, baseline, threshold):
+    """Print FPS/stage changes vs a baseline; returns the number of regressions."""
+    previous = {(r["gallery_size"], r["matcher"]): r for r in baseline["runs"]}
+    regressions = 0
+    for run_result in results["runs"]:
+        key = (run_result["gallery_size"], run_result["matcher"])
+        old = previous.get(key)
+        if old is None:
+            continue
+        change = (run_result["fps"] - old["fps"]) / old["fps"] if old["fps"] else 0.0
+        flag = ""
+        if change < -threshold:
+            regressions += 1
+            flag = "  <-- regression"
+        print(f"{key[1]:>5} gallery {key[0]:>7}: fps {old['fps']:.1f} -> {run_result['fps']:.1f} "
+              f"({change:+.1%}), accuracy {old['accuracy']} -> {run_result['accuracy']}{flag}")
+        for stage in STAGES:
+            a, b = old["stages"].get(stage), run_result["stages"].get(stage)
+            if a and b and a["mean_ms"]:
+                print(f"        {stage:<8} {a['mean_ms']:.3f} -> {b['mean_ms']:.3f} ms "
+                      f"({(b['mean_ms'] - a['mean_ms']) / a['mean_ms']:+.1%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="100,1000,10000,100000",
+                        help="comma-separated gallery sizes")
+    parser.add_argument("--matchers", default="exact,ivf")
+    parser.add_argument("--frames", type=int, default=300, help="synthetic frames")
+    parser.add_argument("--faces", type=int, default=3, help="faces per synthetic frame")
+    parser.add_argument("--unknown-rate", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--fixtures", help="labelled frames: DIR/<name>/*.jpg")
+    parser.add_argument("--gallery", default="known_faces", help="known faces (fixtures mode)")
+    parser.add_argument("--scale", type=float, default=1.0, help="detection scale (fixtures mode)")
+    parser.add_argument("--template", default="centroid",
+                        help="gallery template: centroid, medoids or all (fixtures mode)")
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--compare", help="earlier results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="FPS drop counted as a regression (default 20%%)")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    detect = encode = None
+    if args.fixtures:
+        from encoding_cache import load_known_faces
+        from recognition_pipeline import detect_and_encode, encode_faces
+
+        base_encodings, base_names = load_known_faces(args.gallery, template=args.template)
+        base_encodings = np.asarray(base_encodings, dtype=np.float64).reshape(-1, 128)
+        frames = fixture_frames(args.fixtures)
+        detect = lambda frame: detect_and_encode(frame, args.scale, encode=False)[0]  # noqa: E731
+        encode = encode_faces
+        mode = "fixtures"
+    else:
+        base_names = [f"student{i}" for i in range(min(100, int(args.sizes.split(",")[0])))]
+        base_encodings = random_identities(rng, len(base_names))
+        frames = synthetic_frames(rng, args.frames, base_encodings, base_names,
+                                  args.faces, args.unknown_rate)
+        mode = "synthetic"
+
+    results = {
+        "meta": {
+            "mode": mode,
+            "commit": git_commit(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "opencv": cv2.__version__,
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "frames": len(frames),
+            "seed": args.seed,
+            "template": args.template if args.fixtures else None,
+        },
+        "runs": [],
+    }
+    for size in (int(s) for s in args.sizes.split(",")):
+        encodings, names = pad_gallery(rng, base_encodings, base_names, size)
+        for kind in args.matchers.split(","):
+            rss_before = rss_mb()
+            started = time.perf_counter()
+            matcher = make_matcher(kind, encodings, names, tolerance=0.5)
+            build_seconds = time.perf_counter() - started
+            result = run(frames, matcher, SECRET_KEY, detect, encode)
+            rss_after = rss_mb()
+            result.update({
+                "gallery_size": len(names),
+                "requested_size": size,
+                "matcher": kind,
+                "build_ms": round(build_seconds * 1e3, 2),
+                "gallery_mb": round(np.asarray(matcher.encodings).nbytes / 2**20, 2),
+                "rss_delta_mb": round(rss_after - rss_before, 1)
+                if rss_before is not None else None,
+            })
+            matcher = None  # free this gallery's index before the next one is measured
+            results["runs"].append(result)
+            stages = ", ".join(f"{stage} {result['stages'][stage]['mean_ms']:.3f}"
+                               for stage in STAGES if result["stages"][stage])
+            print(f"{kind:>5} gallery {len(names):>7}: {result['fps']:8.1f} fps, "
+                  f"accuracy {result['accuracy']:.3f}, build {result['build_ms']:.0f} ms "
+                  f"[{stages} ms]", file=sys.stderr)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
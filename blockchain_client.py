@@ -154,8 +154,8 @@ import os.path
 from web3 import Web3
 from solcx import compile_standard, install_solc
 from dotenv import load_dotenv
-import hashlib
 import time
+from attendance_store import compute_attendance_hash
 
 # Load environment variables from .env
 load_dotenv()
@@ -219,10 +219,6 @@ print("Deployer/Authorized address:", deployer_address)
 # For convenience: 20 Gwei in wei
 GAS_PRICE_20_GWEI = 20 * 10**9
 
-def compute_attendance_hash(name, timestamp, secret_key):
-    data_str = f"{name}|{timestamp}|{secret_key}"
-    return hashlib.sha256(data_str.encode("utf-8")).hexdigest()
-
 def deploy_contract():
     Attendance = w3.eth.contract(abi=abi, bytecode=bytecode)
     nonce = w3.eth.get_transaction_count(deployer_address)
@@ -290,114 +286,261 @@ if __name__ == "__main__":
 """
 import os
 import os.path
-from web3 import Web3
-from solcx import compile_standard, install_solc
+import json
+import threading
 from dotenv import load_dotenv
 import hashlib
 import time
+from attendance_store import compute_attendance_hash
 
 load_dotenv()
-install_solc('0.8.0')
+
+SOLC_VERSION = "0.8.0"
 
 # Adjust path if needed
 sol_path = os.path.join(os.path.dirname(__file__), "Attendance.sol")
-if not os.path.isfile(sol_path):
-    raise FileNotFoundError(f"Could not find Attendance.sol at: {sol_path}")
-
-with open(sol_path, "r") as file:
-    contract_source = file.read()
+# Compiled ABI/bytecode, reused while Attendance.sol and SOLC_VERSION are unchanged
+artifact_path = os.getenv("ARTIFACT_CACHE", os.path.join(os.path.dirname(__file__),
+                                                          ".attendance_artifacts.json"))
+provider_url = os.getenv("PROVIDER_URL", "http://127.0.0.1:7545")
+private_key = os.getenv("PRIVATE_KEY")
 
-compiled_sol = compile_standard(
-    {
-        "language": "Solidity",
-        "sources": {
-            "Attendance.sol": {
-                "content": contract_source
-            }
-        },
-        "settings": {
-            "outputSelection": {
-                "*": {
-                    "*": ["abi", "metadata", "evm.bytecode", "evm.sourceMap"]
+# Filled in on first use by load_artifacts() and get_web3(), so importing this
+# module neither compiles Solidity nor needs a running node
+abi = None
+bytecode = None
+w3 = None
+account = None
+deployer_address = None
+_init_lock = threading.Lock()
+
+def _compile(contract_source):
+    from solcx import compile_standard, install_solc
+
+    install_solc(SOLC_VERSION)
+    compiled_sol = compile_standard(
+        {
+            "language": "Solidity",
+            "sources": {
+                "Attendance.sol": {
+                    "content": contract_source
                 }
-            }
+            },
+            "settings": {
+                "outputSelection": {
+                    "*": {
+                        "*": ["abi", "metadata", "evm.bytecode", "evm.sourceMap"]
+                    }
+                }
+            },
         },
-    },
-    solc_version="0.8.0",
-)
-
-bytecode = compiled_sol["contracts"]["Attendance.sol"]["Attendance"]["evm"]["bytecode"]["object"]
-abi = compiled_sol["contracts"]["Attendance.sol"]["Attendance"]["abi"]
-
-provider_url = os.getenv("PROVIDER_URL", "http://127.0.0.1:7545")
-w3 = Web3(Web3.HTTPProvider(provider_url))
-if not w3.is_connected():
-    raise Exception(f"Unable to connect to Ethereum node at {provider_url}")
+        solc_version=SOLC_VERSION,
+    )
+    contract = compiled_sol["contracts"]["Attendance.sol"]["Attendance"]
+    return contract["abi"], contract["evm"]["bytecode"]["object"]
+
+def load_artifacts():
+    """
+    (abi, bytecode) for Attendance.sol, compiling only when the on-disk cache
+    was built from a different source or solc version.
+    """
+    global abi, bytecode
+    if abi is not None:
+        return abi, bytecode
+    with _init_lock:
+        if abi is not None:
+            return abi, bytecode
+        if not os.path.isfile(sol_path):
+            raise FileNotFoundError(f"Could not find Attendance.sol at: {sol_path}")
+        with open(sol_path, "r") as file:
+            contract_source = file.read()
+        key = f"{hashlib.sha256(contract_source.encode('utf-8')).hexdigest()}:{SOLC_VERSION}"
+        try:
+            with open(artifact_path) as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            cached = {}
+        if cached.get("key") == key:
+            new_abi, new_bytecode = cached["abi"], cached["bytecode"]
+        else:
+            new_abi, new_bytecode = _compile(contract_source)
+            tmp_path = artifact_path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"key": key, "abi": new_abi, "bytecode": new_bytecode}, f)
+            os.replace(tmp_path, artifact_path)
+        bytecode = new_bytecode
+        abi = new_abi
+    return abi, bytecode
+
+def get_web3():
+    """Connect to PROVIDER_URL on first use."""
+    global w3, account, deployer_address
+    if w3 is not None:
+        return w3
+    with _init_lock:
+        if w3 is not None:
+            return w3
+        from web3 import Web3
+
+        if not private_key:
+            raise Exception("Please set PRIVATE_KEY in your .env file")
+        web3 = Web3(Web3.HTTPProvider(provider_url))
+        if not web3.is_connected():
+            raise Exception(f"Unable to connect to Ethereum node at {provider_url}")
+        account = web3.eth.account.from_key(private_key)
+        deployer_address = account.address
+        print("Deployer/Authorized address:", deployer_address)
+        w3 = web3
+    return w3
 
-private_key = os.getenv("PRIVATE_KEY")
-if not private_key:
-    raise Exception("Please set PRIVATE_KEY in your .env file")
+GAS_PRICE_20_GWEI = 20 * 10**9
 
-account = w3.eth.account.from_key(private_key)
-deployer_address = account.address
-print("Deployer/Authorized address:", deployer_address)
+_submitter = None
+_submitter_lock = threading.Lock()
 
-GAS_PRICE_20_GWEI = 20 * 10**9
+def get_submitter():
+    """
+    The process-wide TxSubmitter for the deployer key. All transactions go
+    through it, so nonces are assigned locally and never race.
+    """
+    global _submitter
+    with _submitter_lock:
+        if _submitter is None:
+            from tx_submitter import TxSubmitter
 
-def compute_attendance_hash(name, timestamp, secret_key):
-    data_str = f"{name}|{timestamp}|{secret_key}"
-    return hashlib.sha256(data_str.encode("utf-8")).hexdigest()
+            _submitter = TxSubmitter(get_web3(), private_key, poll_interval=0.1,
+                                     gas_price=GAS_PRICE_20_GWEI).start()
+    return _submitter
 
 def deploy_contract():
-    Attendance = w3.eth.contract(abi=abi, bytecode=bytecode)
-    nonce = w3.eth.get_transaction_count(deployer_address)
+    abi, bytecode = load_artifacts()
+    Attendance = get_web3().eth.contract(abi=abi, bytecode=bytecode)
     tx_dict = Attendance.constructor().build_transaction({
-        'chainId': w3.eth.chain_id,
+        'chainId': get_submitter().chain_id(),
         'gas': 3000000,
         'gasPrice': GAS_PRICE_20_GWEI,
-        'nonce': nonce,
     })
-    signed_tx = w3.eth.account.sign_transaction(tx_dict, private_key=private_key)
-    tx_hash = w3.eth.send_raw_transaction(signed_tx.raw_transaction)
     print("Deploying contract...")
-    tx_receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
+    tx_receipt = get_submitter().submit(tx_dict).result()
     print("Contract deployed at address:", tx_receipt.contractAddress)
     return tx_receipt.contractAddress
 
 def get_contract(address):
-    return w3.eth.contract(address=address, abi=abi)
+    return get_web3().eth.contract(address=address, abi=load_artifacts()[0])
 
-def record_attendance(contract_address, name, secret_key):
+def submit_record(contract_address, name, record_hash):
+    """Send recordAttendance(name, record_hash) without waiting; returns a Future."""
     contract = get_contract(contract_address)
-    nonce = w3.eth.get_transaction_count(deployer_address)
-
-    # We'll create a recordHash using the name + timestamp + secret_key
-    timestamp = int(time.time())
-    record_hash = compute_attendance_hash(name, timestamp, secret_key)
-
     tx = contract.functions.recordAttendance(name, record_hash).build_transaction({
-        'chainId': w3.eth.chain_id,
+        'chainId': get_submitter().chain_id(),
         'gas': 300000,
         'gasPrice': GAS_PRICE_20_GWEI,
-        'nonce': nonce,
     })
-    signed_tx = w3.eth.account.sign_transaction(tx, private_key=private_key)
-    tx_hash = w3.eth.send_raw_transaction(signed_tx.raw_transaction)
+    return get_submitter().submit(tx)
+
+def _send_record(contract_address, name, record_hash):
+    receipt = submit_record(contract_address, name, record_hash).result()
+    return receipt.transactionHash, receipt
+
+def record_attendance_async(contract_address, name, secret_key):
+    """Like record_attendance, but returns (record_hash, Future of the receipt)."""
+    record_hash = compute_attendance_hash(name, int(time.time()), secret_key)
+    return record_hash, submit_record(contract_address, name, record_hash)
+
+def record_attendance(contract_address, name, secret_key):
+    # We'll create a recordHash using the name + timestamp + secret_key
+    timestamp = int(time.time())
+    record_hash = compute_attendance_hash(name, timestamp, secret_key)
     print(f"Submitting attendance for '{name}' with recordHash '{record_hash}'...")
-    receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
+    tx_hash, receipt = _send_record(contract_address, name, record_hash)
     print(f"Attendance recorded in tx {tx_hash.hex()}")
     return receipt
 
+def anchor_root(contract_address, label, root):
+    """
+    Commit the Merkle root of a window of attendance hashes (merkle_anchor.py)
+    as one record, stored under `label` in place of a student name.
+    """
+    tx_hash, receipt = _send_record(contract_address, label, root)
+    print(f"Anchored root '{root}' as '{label}' in tx {tx_hash.hex()}")
+    return receipt
+
+def find_anchor(contract_address, label, root, tx_hash=None):
+    """
+    True if a record with this label and root exists on chain. With the
+    anchor's tx_hash (stored by merkle_anchor at commit time) this is one
+    transaction lookup: the transaction must have succeeded and called
+    recordAttendance(label, root) on this contract. Without it every record
+    is scanned.
+    """
+    if tx_hash is not None:
+        web3 = get_web3()
+        if not str(tx_hash).startswith("0x"):
+            tx_hash = "0x" + str(tx_hash)
+        tx = web3.eth.get_transaction(tx_hash)
+        receipt = web3.eth.get_transaction_receipt(tx_hash)
+        if receipt.status != 1 or (tx.to or "").lower() != contract_address.lower():
+            return False
+        function, args = get_contract(contract_address).decode_function_input(tx.input)
+        return function.fn_name == "recordAttendance" and list(args.values()) == [label, root]
+    for _, record in iter_records(contract_address):
+        name, record_hash, _ = record_fields(record_to_dict(record))
+        if name == label and record_hash == root:
+            return True
+    return False
+
 def get_record_count(contract_address):
     contract = get_contract(contract_address)
     return contract.functions.getRecordCount().call()
 
-def get_all_records(contract_address):
+def _record_fields():
+    # Field names of the record struct returned by getAllRecords, from the ABI
+    for item in load_artifacts()[0]:
+        if item.get("type") == "function" and item.get("name") == "getAllRecords":
+            output = item["outputs"][0]
+            return [c["name"] for c in output.get("components", [])]
+    return []
+
+def record_to_dict(record):
+    """Turn a record tuple from getAllRecords into {field name: value}."""
+    fields = _record_fields()
+    if fields and len(fields) == len(record):
+        return dict(zip(fields, record))
+    return {f"field{i}": value for i, value in enumerate(record)}
+
+def record_fields(record):
+    """(name, record_hash, timestamp) from a record_to_dict() dict."""
+    name = record_hash = timestamp = None
+    for key, value in record.items():
+        lowered = key.lower()
+        if "hash" in lowered:
+            record_hash = value
+        elif "time" in lowered:
+            timestamp = value
+        elif "name" in lowered:
+            name = value
+    if name is None or record_hash is None:
+        # Unnamed ABI components: same order as recordAttendance(name, hash)
+        values = list(record.values())
+        name, record_hash = values[0], values[1]
+        timestamp = values[2] if len(values) > 2 else None
+    return name, record_hash, timestamp
+
+def iter_records(contract_address, page_size=100, start=0):
+    """
+    Yield (index, record) from `start` onwards, calling getAllRecords one
+    fixed-size page at a time so no single call hits RPC or gas limits.
+    """
     contract = get_contract(contract_address)
     total_records = get_record_count(contract_address)
-    if total_records == 0:
-        return []
-    return contract.functions.getAllRecords(0, total_records).call()
+    for page_start in range(start, total_records, page_size):
+        page_end = min(page_start + page_size, total_records)
+        page = contract.functions.getAllRecords(page_start, page_end).call()
+        for offset, record in enumerate(page):
+            yield page_start + offset, record
+
+def get_all_records(contract_address, page_size=100):
+    return [record for _, record in iter_records(contract_address, page_size)]
 
 if __name__ == "__main__":
     SECRET_KEY = "YourSecretKeyHere"  # For hashing
@@ -0,0 +1,49 @@
+import collections
+import threading
+
+DROP_OLDEST = "drop_oldest"
+BLOCK = "block"
+
+
+class BoundedQueue:
+    """
+    Thread-safe bounded FIFO with a per-queue backpressure policy.
+
+    DROP_OLDEST discards the oldest item when full so producers never wait;
+    BLOCK makes put() wait for space like queue.Queue.
+    """
+
+    def __init__(self, maxsize, policy=DROP_OLDEST):
+        if policy not in (DROP_OLDEST, BLOCK):
+            raise ValueError(f"Unknown queue policy '{policy}'")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.dropped = 0
+        self._items = collections.deque()
+        self._cond = threading.Condition()
+
+    def __len__(self):
+        with self._cond:
+            return len(self._items)
+
+    def put(self, item, timeout=None):
+        """Returns False if a BLOCK queue stayed full for `timeout` seconds."""
+        with self._cond:
+            if len(self._items) >= self.maxsize:
+                if self.policy == DROP_OLDEST:
+                    self._items.popleft()
+                    self.dropped += 1
+                elif not self._cond.wait_for(lambda: len(self._items) < self.maxsize, timeout):
+                    return False
+            self._items.append(item)
+            self._cond.notify_all()
+            return True
+
+    def get(self, timeout=None):
+        """Returns None if nothing arrived within `timeout` seconds."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._items, timeout):
+                return None
+            item = self._items.popleft()
+            self._cond.notify_all()
+            return item
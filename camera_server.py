@@ -0,0 +1,271 @@
+"""
+Multi-camera recognition server: many sources, one gallery.
+
+    python camera_server.py 0 1 rtsp://10.0.0.21/stream lecture.mp4 --workers 4
+
+Sources are device indices, RTSP/HTTP URLs or video files (files are played
+at their native frame rate so they behave like a live camera). All streams
+share one in-memory gallery and matcher; a pool of detection workers serves
+the streams round-robin, and per-stream FPS and latency are printed
+periodically.
+"""
+import argparse
+import collections
+import threading
+import time
+from functools import partial
+import cv2
+from encoding_cache import load_known_faces
+from face_matcher import make_matcher
+from face_tracker import FaceTracker
+from motion_gate import MotionGate
+from recognition_pipeline import (BoundedQueue, DROP_OLDEST, BLOCK, detect_and_encode,
+                                  identify_faces)
+
+STATS_WINDOW = 10.0  # seconds of history behind the FPS / latency figures
+
+
+def parse_source(source):
+    """"0" -> device 0; anything else (URL or path) is passed to OpenCV as is."""
+    return int(source) if str(source).isdigit() else source
+
+
+class CameraStream:
+    """One source: its capture thread, latest-frame slot, tracker, gate and stats."""
+
+    def __init__(self, stream_id, source, tracker=None, motion_gate=None, loop=False):
+        self.stream_id = stream_id
+        self.source = parse_source(source)
+        self.tracker = tracker
+        self.motion_gate = motion_gate
+        self.loop = loop
+        self.capture = cv2.VideoCapture(self.source)
+        self.is_file = isinstance(self.source, str) and "://" not in self.source
+        self.frames = BoundedQueue(1, DROP_OLDEST)  # only the newest frame is worth detecting
+        self.busy = False                          # a worker holds this stream (keeps order)
+        self.finished = False
+        self.frames_captured = 0
+        self.frames_processed = 0
+        self._completed = collections.deque()     # (finish time, latency)
+        self._started = time.monotonic()
+
+    def read_loop(self, running, on_frame):
+        fps = self.capture.get(cv2.CAP_PROP_FPS) if self.is_file else 0
+        interval = 1.0 / fps if fps and fps > 0 else 0.0
+        next_due = self._started = time.monotonic()
+        while running():
+            ret, frame = self.capture.read()
+            if not ret or frame is None:
+                if self.is_file and self.loop:
+                    self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    continue
+                break
+            self.frames_captured += 1
+            if interval:
+                # Pace files at their recorded rate, like a real camera would deliver them
+                next_due += interval
+                time.sleep(max(0.0, next_due - time.monotonic()))
+            if self.motion_gate is None or self.motion_gate.should_process(frame):
+                self.frames.put((time.monotonic(), frame))
+                on_frame()
+        self.finished = True
+        self.capture.release()
+
+    def record(self, captured_at):
+        now = time.monotonic()
+        self.frames_processed += 1
+        self._completed.append((now, now - captured_at))
+        while self._completed and now - self._completed[0][0] > STATS_WINDOW:
+            self._completed.popleft()
+
+    def stats(self):
+        now = time.monotonic()
+        recent = [latency for done, latency in self._completed if now - done <= STATS_WINDOW]
+        stats = {
+            "source": str(self.source),
+            "frames_captured": self.frames_captured,
+            "frames_processed": self.frames_processed,
+            "fps": len(recent) / max(min(STATS_WINDOW, now - self._started), 1e-6),
+            "latency_avg_ms": 1000 * sum(recent) / len(recent) if recent else None,
+            "latency_max_ms": 1000 * max(recent) if recent else None,
+            "finished": self.finished,
+        }
+        if self.motion_gate is not None:
+            stats["motion_gate"] = self.motion_gate.stats()
+        return stats
+
+
+class CameraServer:
+    """
+    Shared gallery + detection worker pool serving many CameraStreams.
+
+    Workers pick the next stream round-robin among those that have a fresh
+    frame and are not already being processed, so one busy entrance cannot
+    starve the others and each stream's tracker sees its frames in order.
+    `dispatch(name)` runs on a single dispatcher thread.
+
+    If any thread raises, the exception is kept in `error`, the server stops
+    and serve_forever() re-raises it.
+    """
+
+    def __init__(self, sources, matcher, dispatch, workers=2, encode_frame=None,
+                 tracking=True, motion_gating=True, loop_files=False):
+        if encode_frame is None:
+            encode_frame = partial(detect_and_encode, encode=not tracking)
+        self.matcher = matcher
+        self.dispatch = dispatch
+        self.workers = workers
+        self.encode_frame = encode_frame
+        self.streams = [
+            CameraStream(i, source,
+                         tracker=FaceTracker() if tracking else None,
+                         motion_gate=MotionGate() if motion_gating else None,
+                         loop=loop_files)
+            for i, source in enumerate(sources)
+        ]
+        self.dispatch_queue = BoundedQueue(10000, BLOCK)
+        self._ready = threading.Condition()
+        self._cursor = 0
+        self.error = None
+        self._stop = threading.Event()
+        self._threads = []
+        self._dispatcher = None
+
+    @property
+    def running(self):
+        return not self._stop.is_set() and not all(s.finished for s in self.streams)
+
+    def start(self):
+        for stream in self.streams:
+            if not stream.capture.isOpened():
+                print(f"Error: Could not open source {stream.source!r}")
+                stream.finished = True
+                continue
+            self._spawn(stream.read_loop, lambda: not self._stop.is_set(), self._notify)
+        self._dispatcher = self._spawn(self._dispatch_loop)
+        for _ in range(self.workers):
+            self._spawn(self._worker_loop)
+        return self
+
+    def stop(self, timeout=2.0):
+        self._stop.set()
+        self._notify()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def serve_forever(self, report_every=5.0):
+        try:
+            while self.running:
+                self._stop.wait(report_every)
+                self.print_stats()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+            self.print_stats()
+        if self.error is not None:
+            raise self.error
+
+    def stats(self):
+        return {"streams": [s.stats() for s in self.streams],
+                "dispatch_queue": len(self.dispatch_queue)}
+
+    def print_stats(self):
+        for s in self.stats()["streams"]:
+            latency = f"{s['latency_avg_ms']:.0f}ms avg / {s['latency_max_ms']:.0f}ms max" \
+                if s["latency_avg_ms"] is not None else "-"
+            print(f"[{s['source']}] {s['fps']:.1f} fps, latency {latency}, "
+                  f"{s['frames_processed']}/{s['frames_captured']} frames processed")
+
+    def _spawn(self, target, *args):
+        thread = threading.Thread(target=self._run, args=(target,) + args, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+        return thread
+
+    def _run(self, target, *args):
+        try:
+            target(*args)
+        except Exception as e:
+            if self.error is None:
+                self.error = e
+            self._stop.set()
+            self._notify()
+
+    def _notify(self):
+        with self._ready:
+            self._ready.notify_all()
+
+    def _next_stream(self):
+        # Called with self._ready held
+        count = len(self.streams)
+        for offset in range(count):
+            stream = self.streams[(self._cursor + offset) % count]
+            if not stream.busy and len(stream.frames):
+                self._cursor = (self._cursor + offset + 1) % count
+                stream.busy = True
+                return stream
+        return None
+
+    def _worker_loop(self):
+        while not self._stop.is_set():
+            with self._ready:
+                stream = self._next_stream()
+                if stream is None:
+                    self._ready.wait(0.1)
+                    continue
+            try:
+                item = stream.frames.get(timeout=0)
+                if item is None:
+                    continue
+                captured_at, frame = item
+                face_locations, face_encodings = self.encode_frame(frame)
+                detections = identify_faces(frame, face_locations, face_encodings,
+                                            self.matcher, stream.tracker)
+                stream.record(captured_at)
+                for name in dict.fromkeys(d["name"] for d in detections):
+                    # Give up only if the dispatcher thread itself has died
+                    while not self.dispatch_queue.put(name, timeout=0.1):
+                        if not self._dispatcher.is_alive():
+                            return
+            finally:
+                with self._ready:
+                    stream.busy = False
+                    self._ready.notify_all()
+
+    def _dispatch_loop(self):
+        while not self._stop.is_set() or len(self.dispatch_queue):
+            name = self.dispatch_queue.get(timeout=0.1)
+            if name is not None:
+                self.dispatch(name)
+
+
+def main():
+    from face_recognition_script import (KNOWN_FACES_DIR, MATCHER_KIND, ENROL_TEMPLATE,
+                                         record_attendance, close_outbox)
+
+    parser = argparse.ArgumentParser(description="Multi-camera face recognition attendance server")
+    parser.add_argument("sources", nargs="+", help="device index, RTSP/HTTP URL or video file")
+    parser.add_argument("--workers", type=int, default=2, help="detection worker threads")
+    parser.add_argument("--no-tracking", action="store_true")
+    parser.add_argument("--no-motion-gate", action="store_true")
+    parser.add_argument("--loop-files", action="store_true", help="replay video files forever")
+    parser.add_argument("--report-every", type=float, default=5.0, help="seconds between stats")
+    args = parser.parse_args()
+
+    known_faces, known_names = load_known_faces(KNOWN_FACES_DIR, template=ENROL_TEMPLATE)
+    matcher = make_matcher(MATCHER_KIND, known_faces, known_names, tolerance=0.5)
+    print(f"✅ Loaded {len(known_faces)} known faces, serving {len(args.sources)} streams.")
+
+    server = CameraServer(args.sources, matcher, record_attendance,
+                          workers=args.workers,
+                          tracking=not args.no_tracking,
+                          motion_gating=not args.no_motion_gate,
+                          loop_files=args.loop_files)
+    server.start().serve_forever(args.report_every)
+    close_outbox()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+COOLDOWN = "cooldown"
+PERIOD = "period"
+
+
+def _period_end(now, seconds):
+    """End of the `seconds`-long period, counted from local midnight, containing `now`."""
+    midnight = datetime.fromtimestamp(now).replace(
+        hour=0, minute=0, second=0, microsecond=0).timestamp()
+    return midnight + ((now - midnight) // seconds + 1) * seconds
+
+
+class DedupWindow:
+    """
+    Decides whether a sighting should become an attendance record.
+
+    policy="cooldown": at most one record per identity every `seconds`.
+    policy="period":   at most one record per identity per class period; the
+                       day is split into `seconds`-long periods from local
+                       midnight (3600 = once per clock hour).
+
+    With `session_seconds` (the attendance session length), a cooldown never
+    runs past the end of the session it started in: a sighting at 09:55
+    must not suppress the student's first sighting in the 10:00 class.
+
+    Entries live in an OrderedDict in insertion order. With either policy a
+    later insertion never expires earlier than an earlier one, so expiry only
+    ever pops from the front: O(1) amortized per call, and memory is bounded
+    by the identities seen within one window. With `path`, entries are also
+    kept in SQLite so a restart does not re-record everyone in the window.
+    """
+
+    def __init__(self, policy=COOLDOWN, seconds=3600.0, path=None, clock=time.time,
+                 session_seconds=None):
+        if policy not in (COOLDOWN, PERIOD):
+            raise ValueError(f"Unknown dedup policy: {policy}")
+        self.policy = policy
+        self.seconds = seconds
+        self.session_seconds = session_seconds
+        self.clock = clock
+        self.suppressed = 0
+        self._expiry = OrderedDict()  # name -> expires_at
+        self._lock = threading.Lock()
+        self._conn = None
+        if path is not None:
+            self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS dedup (name TEXT PRIMARY KEY, expires_at REAL NOT NULL)")
+            self._conn.execute("DELETE FROM dedup WHERE expires_at <= ?", (self.clock(),))
+            for name, expires_at in self._conn.execute(
+                    "SELECT name, expires_at FROM dedup ORDER BY expires_at"):
+                self._expiry[name] = expires_at
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def __len__(self):
+        return len(self._expiry)
+
+    def expires_at(self, now):
+        if self.policy == PERIOD:
+            expires_at = _period_end(now, self.seconds)
+        else:
+            expires_at = now + self.seconds
+        if self.session_seconds:
+            # Still non-decreasing in `now`, so expiry stays front-only
+            expires_at = min(expires_at, _period_end(now, self.session_seconds))
+        return expires_at
+
+    def should_record(self, name, now=None):
+        """True (and start a window for `name`) unless it is already in one."""
+        now = self.clock() if now is None else now
+        with self._lock:
+            self._expire(now)
+            if name in self._expiry:
+                self.suppressed += 1
+                return False
+            expires_at = self.expires_at(now)
+            self._expiry[name] = expires_at
+            if self._conn is not None:
+                self._conn.execute("INSERT OR REPLACE INTO dedup VALUES (?, ?)", (name, expires_at))
+            return True
+
+    def _expire(self, now):
+        expired = []
+        while self._expiry:
+            name, expires_at = next(iter(self._expiry.items()))
+            if expires_at > now:
+                break
+            self._expiry.popitem(last=False)
+            expired.append(name)
+        if expired and self._conn is not None:
+            self._conn.executemany("DELETE FROM dedup WHERE name = ?", [(n,) for n in expired])
@@ -0,0 +1,173 @@
+import os
+import json
+import hashlib
+import numpy as np
+from enrolment import (encode_sample, build_templates, check_template_mode, MIN_FACE_SIZE,
+                       BLUR_THRESHOLD)
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+CACHE_MATRIX_FILE = ".encodings.npy"      # (N, 128) matrix, memory-mapped on load
+CACHE_INDEX_FILE = ".encodings.json"      # file -> mtime/size/sha1/row/rejected
+CACHE_VERSION = 2
+# Changing the quality gate re-encodes everything, since rejections are cached
+QUALITY_SETTINGS = {"min_face_size": MIN_FACE_SIZE, "blur_threshold": BLUR_THRESHOLD}
+ENCODING_SIZE = 128
+ENCODING_DTYPE = np.float64
+
+
+def file_digest(path):
+    """
+    SHA-1 of a file's contents, read in chunks so large photos don't sit in memory.
+    """
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def encode_files(paths):
+    """
+    Default encoder: the face encoding of each image, or a string saying why
+    the image was rejected (no face, several faces, too small or blurry).
+    """
+    results = []
+    for path in paths:
+        encoding, reason = encode_sample(path)
+        results.append(encoding if reason is None else reason)
+    return results
+
+
+def enrolment_files(known_faces_dir):
+    """
+    (relative path, person) for every enrolment image, sorted: alice.jpg
+    belongs to "alice", and so does every image under alice/.
+    """
+    files = []
+    for entry in sorted(os.scandir(known_faces_dir), key=lambda e: e.name):
+        if entry.is_file() and entry.name.lower().endswith(IMAGE_EXTENSIONS):
+            files.append((entry.name, os.path.splitext(entry.name)[0]))
+        elif entry.is_dir() and not entry.name.startswith("."):
+            for filename in sorted(os.listdir(entry.path)):
+                if filename.lower().endswith(IMAGE_EXTENSIONS):
+                    files.append((f"{entry.name}/{filename}", entry.name))
+    return files
+
+
+def _read_index(index_path, matrix_path):
+    if not (os.path.isfile(index_path) and os.path.isfile(matrix_path)):
+        return {}, None
+    try:
+        with open(index_path, "r") as f:
+            index = json.load(f)
+        if index.get("version") != CACHE_VERSION or index.get("quality") != QUALITY_SETTINGS:
+            return {}, None
+        matrix = np.load(matrix_path, mmap_mode="r")
+    except (OSError, ValueError):
+        # Corrupt or half-written cache: rebuild from scratch
+        return {}, None
+    return index.get("files", {}), matrix
+
+
+def _write_atomic(path, write):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+def load_known_faces(known_faces_dir, cache_dir=None, encoder=encode_files, template=None):
+    """
+    Load the (N, 128) encoding matrix and matching name list for every
+    enrolment image in known_faces_dir (see enrolment_files).
+
+    Entries are keyed by relative path, mtime, size and a SHA-1 of the
+    contents, so only new or changed images go through `encoder`. Entries for
+    deleted files are dropped, and photos the encoder rejected are remembered
+    so they are not retried. When nothing changed the matrix is returned
+    straight from the memory-mapped cache without re-reading any image.
+
+    With template="centroid", "medoids" or "all" the per-photo rows are
+    reduced to per-person templates (enrolment.build_templates); with None
+    every accepted photo is one row.
+    """
+    if template is not None:
+        check_template_mode(template)  # before any encoding work
+    cache_dir = cache_dir or known_faces_dir
+    matrix_path = os.path.join(cache_dir, CACHE_MATRIX_FILE)
+    index_path = os.path.join(cache_dir, CACHE_INDEX_FILE)
+
+    old_files, old_matrix = _read_index(index_path, matrix_path)
+    new_files = {}
+    to_encode = []
+    dirty = False
+
+    people = dict(enrolment_files(known_faces_dir))
+    for filename in people:
+        img_path = os.path.join(known_faces_dir, filename)
+        stat = os.stat(img_path)
+        entry = old_files.get(filename)
+
+        if entry and entry["mtime"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+            new_files[filename] = entry
+            continue
+
+        # mtime/size changed (or new file): only re-encode if the bytes changed too
+        digest = file_digest(img_path)
+        dirty = True
+        if entry and entry["sha1"] == digest:
+            new_files[filename] = dict(entry, mtime=stat.st_mtime_ns, size=stat.st_size)
+        else:
+            new_files[filename] = {"mtime": stat.st_mtime_ns, "size": stat.st_size,
+                                   "sha1": digest, "row": None}
+            to_encode.append(filename)
+
+    if set(old_files) - set(new_files):
+        dirty = True  # stale entries for removed images
+
+    if not dirty and old_matrix is not None:
+        names = [None] * len(old_matrix)
+        for filename, entry in new_files.items():
+            if entry["row"] is not None:
+                names[entry["row"]] = people[filename]
+        return _apply_template(old_matrix, names, template)
+
+    encoded = dict(zip(to_encode, encoder([os.path.join(known_faces_dir, f) for f in to_encode])))
+
+    rows = []
+    names = []
+    rejected = []
+    for filename, entry in new_files.items():
+        if filename in encoded:
+            vector = encoded[filename]
+            entry["rejected"] = vector if isinstance(vector, str) else None
+            if entry["rejected"]:
+                rejected.append(f"{filename} ({entry['rejected']})")
+        elif entry["row"] is not None:
+            vector = old_matrix[entry["row"]]
+        else:
+            vector = None  # known to be rejected
+        if vector is None or isinstance(vector, str):
+            entry["row"] = None
+            continue
+        entry["row"] = len(rows)
+        rows.append(np.asarray(vector, dtype=ENCODING_DTYPE))
+        names.append(people[filename])
+    if rejected:
+        print(f"Rejected {len(rejected)} enrolment photo(s): {', '.join(rejected)}")
+
+    matrix = np.vstack(rows) if rows else np.empty((0, ENCODING_SIZE), dtype=ENCODING_DTYPE)
+    rows = old_matrix = None  # release the old mmap before replacing the file (Windows)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    _write_atomic(matrix_path, lambda f: np.save(f, matrix))
+    index = {"version": CACHE_VERSION, "quality": QUALITY_SETTINGS, "files": new_files}
+    _write_atomic(index_path, lambda f: f.write(json.dumps(index).encode("utf-8")))
+
+    return _apply_template(np.load(matrix_path, mmap_mode="r"), names, template)
+
+
+def _apply_template(matrix, names, template):
+    if template is None:
+        return matrix, names
+    return build_templates(matrix, names, template)
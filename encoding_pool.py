@@ -0,0 +1,203 @@
+import os
+import sys
+import itertools
+import queue
+import threading
+import multiprocessing as mp
+from multiprocessing import shared_memory, resource_tracker
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+from recognition_pipeline import detect_and_encode
+
+
+def _attach(name, own_tracker):
+    """
+    Open a segment the parent created. The parent owns (and unlinks) every
+    segment, so the worker must not leave it registered with a resource
+    tracker of its own, which would unlink it when the worker exits. A
+    tracker shared with the parent (spawn, forkserver, or fork after the
+    parent started it) must be left alone: unregistering there would drop
+    the parent's own registration.
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    shm = shared_memory.SharedMemory(name=name)
+    if own_tracker:
+        resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+def _worker_main(tasks, results, encode_frame):
+    from encoding_cache import encode_files
+
+    # No tracker inherited from the parent: attaching will start our own
+    own_tracker = getattr(resource_tracker._resource_tracker, "_fd", None) is None
+    segments = {}
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        kind, seq, payload = task
+        try:
+            if kind == "frame":
+                name, shape, dtype = payload
+                if name not in segments:
+                    segments[name] = _attach(name, own_tracker)
+                frame = np.ndarray(shape, dtype=dtype, buffer=segments[name].buf)
+                face_locations, face_encodings = encode_frame(frame)
+                del frame  # drop the view before the segment can be closed
+                if face_encodings is not None:
+                    face_encodings = [np.asarray(e) for e in face_encodings]
+                result = (list(face_locations), face_encodings)
+            else:
+                result = encode_files([payload])[0]
+            results.put((seq, result, None))
+        except Exception as e:
+            results.put((seq, None, repr(e)))
+    for shm in segments.values():
+        shm.close()
+
+
+class EncodingPool:
+    """
+    Detection/encoding on a pool of worker processes, for CPUs where dlib
+    holding the GIL keeps the threaded pipeline on a single core.
+
+    Frames are copied into a fixed set of shared-memory slots and only the
+    slot name, shape and dtype are sent to the workers, so no pixels are
+    pickled. When every slot is in flight submit() blocks, which bounds
+    memory use. map() and encode_files() return results in input order.
+
+    If a worker process dies, every pending Future fails with
+    BrokenProcessPool, the remaining workers are stopped and later submits
+    raise BrokenProcessPool.
+    """
+
+    def __init__(self, processes=None, slots=None, encode_frame=detect_and_encode,
+                 poll_interval=0.5):
+        self.processes = processes or os.cpu_count() or 1
+        self.slots = slots or 2 * self.processes
+        self._tasks = mp.Queue()
+        self._results = mp.Queue()
+        self._free_slots = queue.Queue()
+        for _ in range(self.slots):
+            self._free_slots.put(None)  # segments are created on first use
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+        self.poll_interval = poll_interval  # how often worker liveness is checked when idle
+        self._broken = None
+        self._closing = False
+
+        # Start the resource tracker before the workers so they share it
+        resource_tracker.ensure_running()
+        self._workers = [mp.Process(target=_worker_main,
+                                    args=(self._tasks, self._results, encode_frame),
+                                    daemon=True)
+                         for _ in range(self.processes)]
+        for worker in self._workers:
+            worker.start()
+        self._collector = threading.Thread(target=self._collect, daemon=True)
+        self._collector.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def submit(self, frame):
+        """Queue one frame; the Future resolves to (face_locations, face_encodings)."""
+        frame = np.ascontiguousarray(frame)
+        slot = self._free_slots.get()
+        if slot is None or slot.size < frame.nbytes:
+            if slot is not None:
+                slot.close()
+                slot.unlink()
+            slot = shared_memory.SharedMemory(create=True, size=frame.nbytes)
+        np.ndarray(frame.shape, dtype=frame.dtype, buffer=slot.buf)[...] = frame
+        return self._submit("frame", (slot.name, frame.shape, frame.dtype.str), slot)
+
+    def encode(self, frame):
+        """Blocking drop-in for detect_and_encode, usable as the pipeline's encode_frame."""
+        return self.submit(frame).result()
+
+    def map(self, frames):
+        """Yield (face_locations, face_encodings) for each frame, in input order."""
+        in_flight = []
+        for frame in frames:
+            in_flight.append(self.submit(frame))
+            if len(in_flight) >= self.slots:
+                yield in_flight.pop(0).result()
+        for future in in_flight:
+            yield future.result()
+
+    def encode_files(self, paths):
+        """Parallel version of encoding_cache.encode_files, for the gallery load."""
+        futures = [self._submit("file", path) for path in paths]
+        return [future.result() for future in futures]
+
+    def close(self):
+        self._closing = True
+        for _ in self._workers:
+            self._tasks.put(None)
+        for worker in self._workers:
+            worker.join()
+        self._results.put(None)
+        self._collector.join()
+        while not self._free_slots.empty():
+            slot = self._free_slots.get()
+            if slot is not None:
+                slot.close()
+                slot.unlink()
+
+    def _submit(self, kind, payload, slot=None):
+        future = Future()
+        with self._lock:
+            if self._broken is not None:
+                if slot is not None:
+                    self._free_slots.put(slot)
+                raise BrokenProcessPool(self._broken)
+            seq = next(self._seq)
+            self._pending[seq] = (future, slot)
+        self._tasks.put((kind, seq, payload))
+        return future
+
+    def _collect(self):
+        while True:
+            if self._broken is None and not self._closing:
+                dead = [w for w in self._workers if w.exitcode is not None]
+                if dead:
+                    self._break(f"worker process {dead[0].pid} died "
+                                f"(exit code {dead[0].exitcode})")
+            try:
+                item = self._results.get(timeout=self.poll_interval)
+            except queue.Empty:
+                continue
+            if item is None:
+                break
+            seq, result, error = item
+            with self._lock:
+                future, slot = self._pending.pop(seq, (None, None))
+            if future is None:
+                continue  # already failed by _break
+            if slot is not None:
+                self._free_slots.put(slot)
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(RuntimeError(error))
+
+    def _break(self, reason):
+        """Fail everything in flight: the dead worker's task is never answered."""
+        with self._lock:
+            self._broken = reason
+            pending, self._pending = self._pending, {}
+        for worker in self._workers:
+            if worker.exitcode is None:
+                worker.terminate()
+        for future, slot in pending.values():
+            if slot is not None:
+                self._free_slots.put(slot)
+            future.set_exception(BrokenProcessPool(reason))
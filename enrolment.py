@@ -0,0 +1,159 @@
+"""
+Quality-gated enrolment samples and compact per-person templates.
+
+Enrolment photos go in known_faces/ either as one image per person
+(alice.jpg) or as a folder of images per person (alice/1.jpg, alice/2.jpg...).
+Each photo is checked before it is encoded, and it is rejected if:
+  - it does not contain exactly one face
+  - the face is smaller than MIN_FACE_SIZE pixels on its short side
+  - the face is blurry (Laplacian variance of the face crop below BLUR_THRESHOLD)
+
+The accepted samples are then reduced to a template per person:
+  centroid  the mean encoding (one row per person)
+  medoids   up to MAX_MEDOIDS real samples spread over the person's looks
+            (glasses/no glasses, lighting), for people one mean does not fit
+  all       every accepted sample
+Before that, samples further than OUTLIER_DISTANCE from the person's medoid
+are dropped as mislabelled. The gallery therefore grows with people, not with
+photos.
+
+    python enrolment.py known_faces     # report accepted/rejected photos and templates
+"""
+import argparse
+import os
+import cv2
+import numpy as np
+import face_recognition
+
+MIN_FACE_SIZE = int(os.getenv("MIN_FACE_SIZE", "80"))
+BLUR_THRESHOLD = float(os.getenv("BLUR_THRESHOLD", "60"))
+MAX_MEDOIDS = 3
+OUTLIER_DISTANCE = 0.6  # face_recognition's own "different person" distance
+TEMPLATE_MODES = ("centroid", "medoids", "all")
+BLUR_CROP_SIZE = 150  # crops are resized first so the blur score does not depend on face size
+
+
+def sharpness(image, location):
+    """Laplacian variance of the face crop; low values mean a blurry face."""
+    top, right, bottom, left = location
+    crop = cv2.cvtColor(image[top:bottom, left:right], cv2.COLOR_RGB2GRAY)
+    crop = cv2.resize(crop, (BLUR_CROP_SIZE, BLUR_CROP_SIZE), interpolation=cv2.INTER_AREA)
+    return float(cv2.Laplacian(crop, cv2.CV_64F).var())
+
+
+def check_sample(image, face_locations, min_face_size=MIN_FACE_SIZE,
+                 blur_threshold=BLUR_THRESHOLD):
+    """Why an enrolment photo is unusable, or None if it passes."""
+    if not face_locations:
+        return "no face"
+    if len(face_locations) > 1:
+        return f"{len(face_locations)} faces"
+    top, right, bottom, left = face_locations[0]
+    if min(bottom - top, right - left) < min_face_size:
+        return f"face too small ({min(bottom - top, right - left)} px)"
+    score = sharpness(image, face_locations[0])
+    if score < blur_threshold:
+        return f"blurry ({score:.0f})"
+    return None
+
+
+def encode_sample(path, min_face_size=MIN_FACE_SIZE, blur_threshold=BLUR_THRESHOLD):
+    """(encoding, None) for a usable photo, or (None, reason) for a rejected one."""
+    image = face_recognition.load_image_file(path)
+    face_locations = face_recognition.face_locations(image)
+    reason = check_sample(image, face_locations, min_face_size, blur_threshold)
+    if reason is not None:
+        return None, reason
+    return face_recognition.face_encodings(image, face_locations)[0], None
+
+
+def _pairwise(vectors):
+    sq_norms = np.einsum("ij,ij->i", vectors, vectors)
+    sq_dists = sq_norms[:, None] + sq_norms[None, :] - 2.0 * (vectors @ vectors.T)
+    return np.sqrt(np.maximum(sq_dists, 0.0))
+
+
+def check_template_mode(mode):
+    """Raise ValueError for a mode not in TEMPLATE_MODES."""
+    if mode not in TEMPLATE_MODES:
+        raise ValueError(f"unknown template mode {mode!r}; expected one of {TEMPLATE_MODES}")
+
+
+def person_template(samples, mode="centroid", max_medoids=MAX_MEDOIDS,
+                    outlier_distance=OUTLIER_DISTANCE):
+    """(k, 128) template rows for one person's (n, 128) accepted samples."""
+    check_template_mode(mode)
+    samples = np.asarray(samples, dtype=np.float64).reshape(-1, 128)
+    if len(samples) <= 1:
+        return samples
+    distances = _pairwise(samples)
+    medoid = int(distances.sum(axis=1).argmin())
+    keep = distances[medoid] <= outlier_distance
+    samples, distances = samples[keep], distances[np.ix_(keep, keep)]
+    if mode == "all":
+        return samples
+    if mode == "centroid":
+        return samples.mean(axis=0, keepdims=True)
+
+    # Farthest-point seeds, then each cluster is replaced by its own medoid
+    medoid = int(distances.sum(axis=1).argmin())
+    seeds = [medoid]
+    while len(seeds) < min(max_medoids, len(samples)):
+        nearest = distances[:, seeds].min(axis=1)
+        if nearest.max() < outlier_distance / 2:
+            break  # the rest are already well covered
+        seeds.append(int(nearest.argmax()))
+    clusters = distances[:, seeds].argmin(axis=1)
+    rows = []
+    for c in range(len(seeds)):
+        members = np.flatnonzero(clusters == c)
+        within = distances[np.ix_(members, members)].sum(axis=1)
+        rows.append(members[int(within.argmin())])
+    return samples[rows]
+
+
+def build_templates(encodings, names, mode="centroid", **options):
+    """
+    Collapse a per-sample gallery (rows, names) into per-person templates.
+    Returns (matrix, names); names repeat when a person has several rows.
+    """
+    encodings = np.asarray(encodings, dtype=np.float64).reshape(-1, 128)
+    rows_by_name = {}
+    for i, name in enumerate(names):
+        rows_by_name.setdefault(name, []).append(i)
+    matrices, template_names = [], []
+    for name, rows in rows_by_name.items():
+        template = person_template(encodings[rows], mode, **options)
+        matrices.append(template)
+        template_names += [name] * len(template)
+    if not matrices:
+        return np.empty((0, 128)), []
+    return np.vstack(matrices), template_names
+
+
+def main():
+    from encoding_cache import enrolment_files
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("directory", nargs="?", default="known_faces")
+    parser.add_argument("--template", choices=TEMPLATE_MODES, default="centroid")
+    parser.add_argument("--min-face-size", type=int, default=MIN_FACE_SIZE)
+    parser.add_argument("--blur-threshold", type=float, default=BLUR_THRESHOLD)
+    args = parser.parse_args()
+
+    encodings, names = [], []
+    for relpath, name in enrolment_files(args.directory):
+        encoding, reason = encode_sample(os.path.join(args.directory, relpath),
+                                         args.min_face_size, args.blur_threshold)
+        print(f"{'ok' if reason is None else 'REJECTED':>8}  {relpath}"
+              + (f"  ({reason})" if reason else ""))
+        if encoding is not None:
+            encodings.append(encoding)
+            names.append(name)
+    matrix, template_names = build_templates(encodings, names, args.template)
+    print(f"{len(encodings)} accepted samples -> {len(matrix)} template rows "
+          f"for {len(set(template_names))} people ({args.template})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+import numpy as np
+
+UNKNOWN_NAME = "Unknown"
+DEFAULT_TOLERANCE = 0.5
+
+
+def _sq_distances(queries, gallery, gallery_sq_norms):
+    # |q - g|^2 = |q|^2 + |g|^2 - 2 q.g ; rounding can go slightly negative
+    sq_dists = (np.einsum("ij,ij->i", queries, queries)[:, None]
+                + gallery_sq_norms[None, :]
+                - 2.0 * (queries @ gallery.T))
+    return np.maximum(sq_dists, 0.0, out=sq_dists)
+
+
+def _best_two(sq_dists):
+    """
+    Column of the smallest value in each row, its square-rooted distance and
+    the margin to the runner-up (inf when there is only one column).
+    """
+    rows = np.arange(len(sq_dists))
+    if sq_dists.shape[1] == 1:
+        best = np.zeros(len(sq_dists), dtype=np.intp)
+        return best, np.sqrt(sq_dists[:, 0]), np.full(len(sq_dists), np.inf)
+    # Only the two smallest distances per row are needed, no full sort
+    top2 = np.argpartition(sq_dists, 1, axis=1)[:, :2]
+    top2_d = np.sqrt(sq_dists[rows[:, None], top2])
+    order = np.argsort(top2_d, axis=1)
+    best = top2[rows, order[:, 0]]
+    distances = top2_d[rows, order[:, 0]]
+    return best, distances, top2_d[rows, order[:, 1]] - distances
+
+
+def _as_queries(face_encodings):
+    return np.asarray(face_encodings, dtype=np.float64).reshape(-1, 128)
+
+
+def _no_match(count):
+    return (np.full(count, -1, dtype=np.intp),
+            np.full(count, np.inf),
+            np.full(count, np.inf))
+
+
+class FaceMatcher:
+    """
+    Exact nearest-neighbour matcher over the known_faces gallery.
+
+    The gallery is held as one contiguous (N, 128) array with its squared
+    norms precomputed, so all faces in a frame are matched with a single
+    matrix product.
+    """
+
+    def __init__(self, encodings, names, tolerance=DEFAULT_TOLERANCE):
+        self.encodings = np.ascontiguousarray(encodings, dtype=np.float64).reshape(-1, 128)
+        self.names = list(names)
+        self.tolerance = tolerance
+        self._sq_norms = np.einsum("ij,ij->i", self.encodings, self.encodings)
+
+    def __len__(self):
+        return len(self.names)
+
+    def match(self, face_encodings):
+        """
+        Match a batch of encodings against the gallery.
+
+        Returns three arrays, one entry per query: index into self.names of
+        the best match (-1 if the gallery is empty), its euclidean distance,
+        and the margin between the runner-up distance and the best one (inf
+        when there is no runner-up).
+        """
+        queries = _as_queries(face_encodings)
+        if len(queries) == 0 or len(self) == 0:
+            return _no_match(len(queries))
+        return _best_two(_sq_distances(queries, self.encodings, self._sq_norms))
+
+    def identify(self, face_encodings):
+        """
+        Names for a batch of encodings, UNKNOWN_NAME where the best distance
+        is above the tolerance (same rule as face_recognition.compare_faces).
+        """
+        best, distances, _ = self.match(face_encodings)
+        return [self.names[i] if i >= 0 and d <= self.tolerance else UNKNOWN_NAME
+                for i, d in zip(best, distances)]
+
+    def add(self, encoding, name):
+        """Enrol one more encoding under `name`."""
+        vector = _as_queries(encoding)
+        self.encodings = np.vstack([self.encodings, vector])
+        self._sq_norms = np.append(self._sq_norms, np.einsum("ij,ij->i", vector, vector))
+        self.names.append(name)
+
+    def remove(self, name):
+        """Drop every encoding enrolled under `name`; returns how many were removed."""
+        keep = np.array([n != name for n in self.names], dtype=bool)
+        removed = len(self.names) - int(keep.sum())
+        if removed:
+            self.encodings = np.ascontiguousarray(self.encodings[keep])
+            self._sq_norms = self._sq_norms[keep]
+            self.names = [n for n in self.names if n != name]
+        return removed
+
+
+def _kmeans(vectors, k, iterations=10, seed=0):
+    """Plain Lloyd's k-means; returns the (k, 128) centroid matrix."""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), size=k, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = _assign(vectors, centroids)
+        counts = np.bincount(assignment, minlength=k)
+        empty = counts == 0
+        # Per-cluster sums via one sorted pass (np.add.at is far slower)
+        order = np.argsort(assignment, kind="stable")
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])[~empty]
+        sums = np.add.reduceat(vectors[order], starts, axis=0)
+        centroids[~empty] = sums / counts[~empty, None]
+        # Re-seed empty clusters from random points so no list stays unused
+        if empty.any():
+            centroids[empty] = vectors[rng.choice(len(vectors), size=int(empty.sum()))]
+    return centroids
+
+
+def _assign(vectors, centroids, chunk=4096):
+    sq_norms = np.einsum("ij,ij->i", centroids, centroids)
+    out = np.empty(len(vectors), dtype=np.intp)
+    for start in range(0, len(vectors), chunk):
+        block = vectors[start:start + chunk]
+        out[start:start + chunk] = _sq_distances(block, centroids, sq_norms).argmin(axis=1)
+    return out
+
+
+class IVFMatcher(FaceMatcher):
+    """
+    Approximate matcher: an inverted-file index over k-means partitions.
+
+    The gallery is split into `n_lists` clusters; each query is compared
+    only with the members of its `n_probe` nearest clusters, so the cost per
+    face grows with N / n_lists * n_probe instead of N. Encodings can be
+    added and removed without rebuilding; call rebuild() after large roster
+    changes to re-balance the partitions.
+    """
+
+    def __init__(self, encodings, names, tolerance=DEFAULT_TOLERANCE,
+                 n_lists=None, n_probe=8, seed=0):
+        self.tolerance = tolerance
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.seed = seed
+        self._build(np.ascontiguousarray(encodings, dtype=np.float64).reshape(-1, 128),
+                    list(names))
+
+    def _build(self, encodings, names):
+        n_lists = self.n_lists or max(1, int(np.sqrt(len(encodings))))
+        n_lists = max(1, min(n_lists, len(encodings)))
+        if len(encodings):
+            sample_size = min(len(encodings), 64 * n_lists)
+            sample = encodings[np.random.default_rng(self.seed).choice(
+                len(encodings), size=sample_size, replace=False)]
+            self._centroids = _kmeans(sample, n_lists, seed=self.seed)
+            assignment = _assign(encodings, self._centroids)
+        else:
+            self._centroids = np.zeros((1, 128))
+            assignment = np.empty(0, dtype=np.intp)
+        self._centroid_sq_norms = np.einsum("ij,ij->i", self._centroids, self._centroids)
+
+        # ids index into self.names; removed ids are left as None
+        self.names = names
+        self._ids_by_name = {}
+        for i, name in enumerate(names):
+            self._ids_by_name.setdefault(name, []).append(i)
+        self._list_of_id = assignment.tolist()
+        self._list_ids = []
+        self._list_vectors = []
+        self._list_sq_norms = []
+        for c in range(len(self._centroids)):
+            ids = np.flatnonzero(assignment == c)
+            vectors = encodings[ids]
+            self._list_ids.append(ids)
+            self._list_vectors.append(vectors)
+            self._list_sq_norms.append(np.einsum("ij,ij->i", vectors, vectors))
+        self._size = len(names)
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def encodings(self):
+        """Live encodings in id order (used by rebuild and recall checks)."""
+        ids = np.concatenate(self._list_ids)
+        order = np.argsort(ids)
+        return np.vstack(self._list_vectors)[order] if len(ids) else np.empty((0, 128))
+
+    def match(self, face_encodings):
+        queries = _as_queries(face_encodings)
+        if len(queries) == 0 or len(self) == 0:
+            return _no_match(len(queries))
+
+        n_probe = min(self.n_probe, len(self._centroids))
+        coarse = _sq_distances(queries, self._centroids, self._centroid_sq_norms)
+        probes = np.argpartition(coarse, n_probe - 1, axis=1)[:, :n_probe]
+
+        best, distances, margins = _no_match(len(queries))
+        for q, lists in enumerate(probes):
+            ids = np.concatenate([self._list_ids[c] for c in lists])
+            if len(ids) == 0:
+                continue
+            vectors = np.concatenate([self._list_vectors[c] for c in lists])
+            sq_norms = np.concatenate([self._list_sq_norms[c] for c in lists])
+            col, dist, margin = _best_two(_sq_distances(queries[q:q + 1], vectors, sq_norms))
+            best[q], distances[q], margins[q] = ids[col[0]], dist[0], margin[0]
+        return best, distances, margins
+
+    def add(self, encoding, name):
+        vector = _as_queries(encoding)
+        c = int(_sq_distances(vector, self._centroids, self._centroid_sq_norms).argmin())
+        new_id = len(self.names)
+        self.names.append(name)
+        self._ids_by_name.setdefault(name, []).append(new_id)
+        self._list_of_id.append(c)
+        self._list_ids[c] = np.append(self._list_ids[c], new_id)
+        self._list_vectors[c] = np.vstack([self._list_vectors[c], vector])
+        self._list_sq_norms[c] = np.append(self._list_sq_norms[c],
+                                           np.einsum("ij,ij->i", vector, vector))
+        self._size += 1
+
+    def remove(self, name):
+        ids = self._ids_by_name.pop(name, [])
+        for i in ids:
+            c = self._list_of_id[i]
+            keep = self._list_ids[c] != i
+            self._list_ids[c] = self._list_ids[c][keep]
+            self._list_vectors[c] = self._list_vectors[c][keep]
+            self._list_sq_norms[c] = self._list_sq_norms[c][keep]
+            self.names[i] = None
+        self._size -= len(ids)
+        return len(ids)
+
+    def rebuild(self):
+        """Re-run k-means over the live gallery and compact the removed ids."""
+        live_names = [n for n in self.names if n is not None]
+        self._build(self.encodings, live_names)
+
+
+MATCHERS = {
+    "exact": FaceMatcher,
+    "ivf": IVFMatcher,
+}
+
+
+def make_matcher(kind, encodings, names, tolerance=DEFAULT_TOLERANCE, **options):
+    """Build the matcher registered under `kind` ("exact" or "ivf")."""
+    if kind not in MATCHERS:
+        raise ValueError(f"Unknown matcher '{kind}', expected one of {sorted(MATCHERS)}")
+    return MATCHERS[kind](encodings, names, tolerance=tolerance, **options)
+
+
+def measure_recall(matcher, exact, queries):
+    """
+    Compare an approximate matcher with the exact one on `queries`.
+
+    `recall` is the fraction of queries for which both return the same
+    person; `recall_within_tolerance` only counts queries the exact matcher
+    would accept, which is what matters for attendance.
+    """
+    approx_names = [matcher.names[i] if i >= 0 else None for i in matcher.match(queries)[0]]
+    exact_best, exact_dist, _ = exact.match(queries)
+    exact_names = [exact.names[i] if i >= 0 else None for i in exact_best]
+    same = np.array([a == e for a, e in zip(approx_names, exact_names)], dtype=bool)
+    accepted = exact_dist <= exact.tolerance
+    return {
+        "queries": len(same),
+        "recall": float(same.mean()) if len(same) else 1.0,
+        "recall_within_tolerance": float(same[accepted].mean()) if accepted.any() else 1.0,
+    }
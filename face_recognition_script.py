@@ -119,125 +119,230 @@ cv2.destroyAllWindows()
 
 import os
 import cv2
-import face_recognition
-import numpy as np
-import requests
-import hashlib
 import time  # to get a numeric timestamp
+from functools import partial
+from attendance_client import AttendanceClient
+from outbox import Outbox, OutboxSyncer
+from encoding_cache import load_known_faces, encode_files
+from encoding_pool import EncodingPool
+from face_matcher import make_matcher
+from face_tracker import FaceTracker
+from motion_gate import MotionGate
+from dedup_window import DedupWindow
+from attendance_store import SECRET_KEY, SESSION_SECONDS, compute_attendance_hash, session_id
+from recognition_pipeline import RecognitionPipeline, AutoScaleDetector, detect_and_encode
+from metrics import REGISTRY, MetricsServer, JsonDumper, SamplingProfiler
 
 API_URL = "http://127.0.0.1:5000/attendance"  # Flask backend URL
 KNOWN_FACES_DIR = "known_faces"               # Folder with known faces
-
-SECRET_KEY = "YourSecretKeyHere"  # Keep this private, e.g., in an .env file
-
-def compute_attendance_hash(name: str, timestamp: int, secret_key: str) -> str:
+OUTBOX_PATH = os.getenv("OUTBOX_PATH", "outbox.db")  # local log of unsent attendance
+MATCHER_KIND = os.getenv("MATCHER", "exact")   # "exact", or "ivf" for very large galleries
+DETECT_WORKERS = int(os.getenv("DETECT_WORKERS", "2"))  # detection/encoding threads
+QUEUE_SIZE = 4                                 # frames buffered between stages
+# Worker processes for detection/encoding (0 = threads only). dlib holds the
+# GIL for most of the work, so processes are needed to use more than one core.
+ENCODE_PROCESSES = int(os.getenv("ENCODE_PROCESSES", "0"))
+# HOG runs on a frame resized by this factor ("auto" picks 1, 1/2 or 1/4 from
+# TARGET_FPS); encodings always use the full-resolution frame.
+DETECTION_SCALE = os.getenv("DETECTION_SCALE", "1.0")
+TARGET_FPS = float(os.getenv("TARGET_FPS", "10"))
+# Follow faces across frames and only encode/match new or due-for-recheck tracks
+TRACK_FACES = os.getenv("TRACK_FACES", "1") == "1"
+# Skip detection while the scene is static, with a heartbeat every IDLE_INTERVAL seconds
+MOTION_GATE = os.getenv("MOTION_GATE", "1") == "1"
+IDLE_INTERVAL = float(os.getenv("IDLE_INTERVAL", "2.0"))
+# Record each student at most once per DEDUP_SECONDS-long class period
+# counted from midnight ("period") or once per DEDUP_SECONDS ("cooldown").
+# Each event carries its class period (attendance_store.SESSION_SECONDS,
+# shared with batch_process and the API) as its session; the "period"
+# policy uses the same periods by default, and a cooldown is cut off at the
+# end of a session so it cannot swallow the next class.
+DEDUP_POLICY = os.getenv("DEDUP_POLICY", "period")
+DEDUP_SECONDS = float(os.getenv("DEDUP_SECONDS", SESSION_SECONDS))
+DEDUP_PATH = os.getenv("DEDUP_PATH", "dedup.db")  # survives restarts
+# known_faces/<name>.jpg or known_faces/<name>/*.jpg; low-quality photos are
+# rejected and each person's photos are reduced to a "centroid" (one row),
+# "medoids" (a few rows) or "all" template (see enrolment.py)
+ENROL_TEMPLATE = os.getenv("ENROL_TEMPLATE", "centroid")
+# Stage timings: Prometheus text on METRICS_PORT (0 = off) and/or a JSON file
+# rewritten every METRICS_DUMP_INTERVAL seconds. PROFILE=1 starts the sampling
+# profiler at launch; it can also be toggled by POSTing to /profile/start and /profile/stop.
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")  # 0.0.0.0 exposes it to the network
+METRICS_DUMP = os.getenv("METRICS_DUMP", "")
+METRICS_DUMP_INTERVAL = float(os.getenv("METRICS_DUMP_INTERVAL", "10"))
+PROFILE = os.getenv("PROFILE", "0") == "1"
+
+
+_outbox = None
+_outbox_syncer = None
+
+def get_outbox():
     """
-    Combine the name, timestamp, and a secret key, then compute a SHA-256 hash.
+    Local durable outbox, created on first use together with the thread that
+    syncs it to the backend.
     """
-    data_str = f"{name}|{timestamp}|{secret_key}"
-    return hashlib.sha256(data_str.encode("utf-8")).hexdigest()
-
-# -----------------------
-# 1) Load known faces
-# -----------------------
-known_faces = []
-known_names = []
-
-for filename in os.listdir(KNOWN_FACES_DIR):
-    if filename.lower().endswith((".jpg", ".jpeg", ".png")):
-        img_path = os.path.join(KNOWN_FACES_DIR, filename)
-        image = face_recognition.load_image_file(img_path)
-        encodings = face_recognition.face_encodings(image)
-        if encodings:
-            known_faces.append(encodings[0])
-            known_names.append(os.path.splitext(filename)[0])
-
-print(f"✅ Loaded {len(known_faces)} known faces.")
-
-# -----------------------
-# 2) Open Webcam
-# -----------------------
-video_capture = cv2.VideoCapture(0)
-if not video_capture.isOpened():
-    print("Error: Could not open webcam.")
-    exit()
-
-# Keep track of which names have been recorded this session
-recorded_names_this_session = set()
-
-while True:
-    ret, frame = video_capture.read()
-    if not ret or frame is None:
-        print("Error: Could not read frame from webcam.")
-        break
-
-    # Convert from BGR to RGB
-    rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-
-    # Detect & encode faces
-    face_locations = face_recognition.face_locations(rgb_frame)
-    face_encodings = face_recognition.face_encodings(rgb_frame, face_locations)
-
-    detections = []  # e.g. [ {"name": "Alice", "location": (top, right, bottom, left)}, ... ]
-
-    for face_encoding, (top, right, bottom, left) in zip(face_encodings, face_locations):
-        name = "Unknown"
-        matches = face_recognition.compare_faces(known_faces, face_encoding, tolerance=0.5)
-        face_distances = face_recognition.face_distance(known_faces, face_encoding)
-        if True in matches:
-            best_match_index = np.argmin(face_distances)
-            name = known_names[best_match_index]
-        detections.append({"name": name, "location": (top, right, bottom, left)})
-
-    # Record attendance after recognition
-    for detection in detections:
-        name = detection["name"]
-        if name not in recorded_names_this_session:
-            recorded_names_this_session.add(name)
-            if name == "Unknown":
-                print("Sorry, attendance not recorded as student not registered yet")
-            else:
-                # Compute a numeric timestamp
-                record_time = int(time.time())
-
-                # Compute the hash
-                record_hash = compute_attendance_hash(name, record_time, SECRET_KEY)
-
-                # Send to Flask
-                payload = {
-                    "name": name,
-                    "timestamp": record_time,   # we send an int
-                    "hash": record_hash
-                }
-                try:
-                    response = requests.post(API_URL, json=payload)
-                    if response.status_code in (200, 201):
-                        try:
-                            data = response.json()
-                            print(data.get("message", "No message in response"))
-                            if "timestamp" in data:
-                                print("Recorded at:", data["timestamp"])
-                        except ValueError:
-                            print("Server returned non-JSON:", response.text)
-                    else:
-                        print(f"Server returned status code {response.status_code}")
-                        print("Response text:", response.text)
-                except Exception as e:
-                    print("Error sending request:", e)
-
-    # Draw rectangles
-    for detection in detections:
-        name = detection["name"]
-        top, right, bottom, left = detection["location"]
-        color = (0, 255, 0) if name != "Unknown" else (0, 0, 255)
-        cv2.rectangle(frame, (left, top), (right, bottom), color, 2)
-        cv2.putText(frame, name, (left, top - 10),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
-
-    cv2.imshow("Face Recognition Attendance", frame)
-
-    if cv2.waitKey(1) & 0xFF == ord('q'):
-        break
+    global _outbox, _outbox_syncer
+    if _outbox is None:
+        _outbox = Outbox(OUTBOX_PATH)
+        _outbox.purge_sent()
+        # The outbox retries on its own, so the client only retries briefly
+        client = AttendanceClient(API_URL, max_retries=2)
+        _outbox_syncer = OutboxSyncer(_outbox, client).start()
+    return _outbox
+
+def close_outbox():
+    """Try a last sync, then stop; anything unsent is replayed on next start."""
+    if _outbox is None:
+        return
+    _outbox_syncer.stop()
+    _outbox_syncer.drain()
+    _outbox_syncer.client.close()
+    pending = _outbox.pending_count()
+    if pending:
+        print(f"{pending} attendance events still pending in {OUTBOX_PATH}; "
+              "they will be sent on the next start.")
+    dead = _outbox.dead_count()
+    if dead:
+        print(f"{dead} attendance events were rejected by the backend and parked in "
+              f"{OUTBOX_PATH}; fix them and call Outbox.requeue_dead() to resend.")
+    _outbox.close()
+
+_dedup = None
+
+def get_dedup():
+    """Which names were recorded recently enough to skip, created on first use."""
+    global _dedup
+    if _dedup is None:
+        _dedup = DedupWindow(DEDUP_POLICY, DEDUP_SECONDS, path=DEDUP_PATH,
+                             session_seconds=SESSION_SECONDS)
+    return _dedup
+
+def record_attendance(name):
+    """
+    Runs on the pipeline's dispatch thread, so a slow backend no longer
+    freezes the video.
+    """
+    if not get_dedup().should_record(name):
+        return
+    if name == "Unknown":
+        print("Sorry, attendance not recorded as student not registered yet")
+        return
+
+    # Compute a numeric timestamp
+    record_time = int(time.time())
+
+    # Compute the hash
+    record_hash = compute_attendance_hash(name, record_time, SECRET_KEY)
+
+    # Write to the local outbox first; a background thread sends it to Flask,
+    # so an unreachable backend delays the record instead of losing it.
+    payload = {
+        "name": name,
+        "timestamp": record_time,   # we send an int
+        "hash": record_hash,
+        "session": session_id(record_time)
+    }
+    get_outbox().append(payload)
+    _outbox_syncer.notify()
+
+
+def main():
+    # -----------------------
+    # 1) Load known faces
+    # -----------------------
+    # Encodings are cached on disk next to the images; only new or changed
+    # photos are re-encoded at startup.
+    # When tracking, workers only detect; the tracker decides which faces to encode
+    if DETECTION_SCALE == "auto":
+        encode_frame = AutoScaleDetector(TARGET_FPS, encode=not TRACK_FACES)
+    else:
+        encode_frame = partial(detect_and_encode, scale=float(DETECTION_SCALE),
+                               encode=not TRACK_FACES)
+
+    # With a process pool the gallery load is spread over all cores too.
+    pool = (EncodingPool(processes=ENCODE_PROCESSES, encode_frame=encode_frame)
+            if ENCODE_PROCESSES else None)
+    known_faces, known_names = load_known_faces(
+        KNOWN_FACES_DIR, encoder=pool.encode_files if pool else encode_files,
+        template=ENROL_TEMPLATE)
+    matcher = make_matcher(MATCHER_KIND, known_faces, known_names, tolerance=0.5)
+
+    print(f"✅ Loaded {len(known_faces)} templates for {len(set(known_names))} people.")
 
-video_capture.release()
-cv2.destroyAllWindows()
+    # -----------------------
+    # 2) Open Webcam
+    # -----------------------
+    video_capture = cv2.VideoCapture(0)
+    if not video_capture.isOpened():
+        print("Error: Could not open webcam.")
+        return
+
+    # Capture, detection/encoding, matching and attendance dispatch each run on
+    # their own threads; this loop only draws the latest result.
+    # In process mode each worker thread just waits on one frame in the pool.
+    pipeline = RecognitionPipeline(video_capture, matcher, record_attendance,
+                                   workers=ENCODE_PROCESSES or DETECT_WORKERS,
+                                   queue_size=QUEUE_SIZE,
+                                   encode_frame=pool.encode if pool else encode_frame,
+                                   tracker=FaceTracker() if TRACK_FACES else None,
+                                   motion_gate=MotionGate(idle_interval=IDLE_INTERVAL)
+                                   if MOTION_GATE else None)
+    pipeline.start()
+
+    profiler = SamplingProfiler()
+    if PROFILE:
+        profiler.start()
+    metrics_server = MetricsServer(REGISTRY, profiler, host=METRICS_HOST, port=METRICS_PORT).start() \
+        if METRICS_PORT else None
+    dumper = JsonDumper(METRICS_DUMP, REGISTRY, METRICS_DUMP_INTERVAL).start() \
+        if METRICS_DUMP else None
+
+    while pipeline.running:
+        result = pipeline.get_result(timeout=0.1)
+        if result is None:
+            continue
+        frame, detections = result
+        start = time.perf_counter()
+
+        # Draw rectangles
+        for detection in detections:
+            name = detection["name"]
+            top, right, bottom, left = detection["location"]
+            color = (0, 255, 0) if name != "Unknown" else (0, 0, 255)
+            cv2.rectangle(frame, (left, top), (right, bottom), color, 2)
+            cv2.putText(frame, name, (left, top - 10),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
+
+        cv2.imshow("Face Recognition Attendance", frame)
+        key = cv2.waitKey(1) & 0xFF
+        REGISTRY.observe("display", time.perf_counter() - start)
+        pipeline.export_gauges()
+
+        if key == ord('q'):
+            break
+
+    pipeline.stop()
+    print("Pipeline stats:", pipeline.stats())
+    if profiler.running:
+        profiler.stop()
+        with open("profile.folded", "w") as f:
+            f.write(profiler.folded())
+        print("Sampling profile written to profile.folded")
+    if metrics_server:
+        metrics_server.stop()
+    if dumper:
+        dumper.stop()
+    if pipeline.capture_error:
+        print("Error:", pipeline.capture_error)
+
+    video_capture.release()
+    cv2.destroyAllWindows()
+    if pool:
+        pool.close()
+    close_outbox()
+    pipeline.join(timeout=0)  # re-raise the error of a failed stage, if any
+
+
+if __name__ == "__main__":
+    main()
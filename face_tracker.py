@@ -0,0 +1,99 @@
+import itertools
+import numpy as np
+from face_matcher import UNKNOWN_NAME
+
+
+class Track:
+    """One face followed across frames."""
+
+    def __init__(self, track_id, location, frame_index):
+        self.track_id = track_id
+        self.location = location
+        self.name = None            # set by FaceTracker.assign after the first match
+        self.first_seen = frame_index
+        self.last_seen = frame_index
+        self.last_verified = None
+
+    def __repr__(self):
+        return f"Track({self.track_id}, {self.name!r}, {self.location})"
+
+
+def iou_matrix(boxes_a, boxes_b):
+    """Pairwise intersection-over-union of (top, right, bottom, left) boxes."""
+    a = np.asarray(boxes_a, dtype=np.float64).reshape(-1, 4)
+    b = np.asarray(boxes_b, dtype=np.float64).reshape(-1, 4)
+    top = np.maximum(a[:, None, 0], b[None, :, 0])
+    right = np.minimum(a[:, None, 1], b[None, :, 1])
+    bottom = np.minimum(a[:, None, 2], b[None, :, 2])
+    left = np.maximum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(bottom - top, 0, None) * np.clip(right - left, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 1] - a[:, 3])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 1] - b[:, 3])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-9), 0.0)
+
+
+class FaceTracker:
+    """
+    IoU tracker that sits between face_locations and the matcher.
+
+    update() links each detected box to an existing track (greedy, highest
+    IoU first) or opens a new one. Only tracks for which needs_encoding() is
+    true have to go through face_encodings and the matcher; every other face
+    reuses its track's name. Known faces are re-verified every
+    `reverify_every` frames, Unknown ones every `unknown_reverify_every`
+    frames so a blurry first look does not stick.
+    """
+
+    def __init__(self, iou_threshold=0.3, max_missed=10, reverify_every=30,
+                 unknown_reverify_every=5):
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+        self.reverify_every = reverify_every
+        self.unknown_reverify_every = unknown_reverify_every
+        self.tracks = []
+        self.frame_index = 0
+        self.faces_seen = 0
+        self.faces_encoded = 0
+        self._ids = itertools.count(1)
+
+    def update(self, face_locations):
+        """Returns the Track for each location, in the same order."""
+        self.frame_index += 1
+        self.faces_seen += len(face_locations)
+        assigned = [None] * len(face_locations)
+
+        if self.tracks and face_locations:
+            ious = iou_matrix([t.location for t in self.tracks], face_locations)
+            used_tracks = set()
+            for flat in np.argsort(ious, axis=None)[::-1]:
+                t, d = np.unravel_index(flat, ious.shape)
+                if ious[t, d] < self.iou_threshold:
+                    break
+                if assigned[d] is None and t not in used_tracks:
+                    assigned[d] = self.tracks[t]
+                    used_tracks.add(t)
+
+        for d, location in enumerate(face_locations):
+            track = assigned[d]
+            if track is None:
+                track = Track(next(self._ids), location, self.frame_index)
+                self.tracks.append(track)
+                assigned[d] = track
+            track.location = location
+            track.last_seen = self.frame_index
+
+        self.tracks = [t for t in self.tracks
+                       if self.frame_index - t.last_seen <= self.max_missed]
+        return assigned
+
+    def needs_encoding(self, track):
+        if track.last_verified is None:
+            return True
+        every = self.unknown_reverify_every if track.name == UNKNOWN_NAME else self.reverify_every
+        return self.frame_index - track.last_verified >= every
+
+    def assign(self, track, name):
+        track.name = name
+        track.last_verified = self.frame_index
+        self.faces_encoded += 1
@@ -0,0 +1,282 @@
+"""
+Batched on-chain anchoring of attendance hashes with Merkle roots.
+
+Instead of one recordAttendance transaction per student, MerkleAnchor buffers
+the attendance hashes of a time window, builds a Merkle tree over them and
+commits only the root, in a single recordAttendance(label, root) transaction
+on the existing contract. Each student can then be given a proof that their
+hash is a leaf of a root recorded on chain:
+
+    anchor = MerkleAnchor(contract_address, window_seconds=300)  # attendance_store.SECRET_KEY
+    anchor.add("Alice")            # buffered, returns the attendance hash
+    ...
+    anchor.flush()                 # one transaction per window
+    proof = anchor.proof_for("Alice", timestamp)
+    verify_proof(proof["leaf"], proof["proof"], proof["root"])  # True
+
+Windows and their leaves are kept in a small SQLite file so proofs can
+still be served after a restart. A hash is only ever anchored once; events
+that arrive after their window was anchored get an anchor of their own.
+Proofs carry the anchor's transaction hash, so checking one against the
+chain is a single transaction lookup (blockchain_client.find_anchor).
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from attendance_store import SECRET_KEY, compute_attendance_hash
+
+ANCHOR_LABEL_PREFIX = "merkle:"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS anchors (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    window_start INTEGER NOT NULL,
+    root TEXT NOT NULL,
+    leaf_count INTEGER NOT NULL,
+    tx_hash TEXT,
+    gas_used INTEGER,
+    anchored_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_anchors_window ON anchors (window_start);
+CREATE TABLE IF NOT EXISTS anchor_leaves (
+    anchor_id INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    record_hash TEXT NOT NULL,
+    name TEXT NOT NULL,
+    timestamp INTEGER NOT NULL,
+    PRIMARY KEY (anchor_id, position)
+);
+CREATE INDEX IF NOT EXISTS ix_anchor_leaves_hash ON anchor_leaves (record_hash);
+"""
+
+# The first layout keyed leaves by record_hash and anchors by window, so a
+# repeated hash or a second anchor for a window overwrote earlier rows.
+MIGRATE_V1 = """
+ALTER TABLE anchors RENAME TO anchors_v1;
+ALTER TABLE anchor_leaves RENAME TO anchor_leaves_v1;
+DROP INDEX IF EXISTS ix_anchor_leaves_window;
+{schema}
+INSERT INTO anchors (window_start, root, leaf_count, tx_hash, gas_used, anchored_at)
+SELECT window_start, root, leaf_count, tx_hash, gas_used, anchored_at
+FROM anchors_v1 ORDER BY window_start;
+INSERT INTO anchor_leaves (anchor_id, position, record_hash, name, timestamp)
+SELECT a.id, l.position, l.record_hash, l.name, l.timestamp
+FROM anchor_leaves_v1 l JOIN anchors a ON a.window_start = l.window_start;
+DROP TABLE anchors_v1;
+DROP TABLE anchor_leaves_v1;
+"""
+
+
+def ensure_schema(conn):
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(anchors)")}
+    if columns and "id" not in columns:
+        conn.executescript("BEGIN;" + MIGRATE_V1.format(schema=SCHEMA) + "COMMIT;")
+    else:
+        conn.executescript(SCHEMA)
+
+
+def is_anchored(conn, record_hash, schema="main"):
+    """True if `record_hash` is a leaf of an anchored root in this store."""
+    return conn.execute(f"SELECT 1 FROM {schema}.anchor_leaves WHERE record_hash = ? LIMIT 1",
+                        (record_hash,)).fetchone() is not None
+
+
+# Leaves and inner nodes are hashed with different prefixes so an inner node
+# can never be passed off as a leaf (second-preimage protection).
+def hash_leaf(record_hash):
+    return hashlib.sha256(b"\x00" + bytes.fromhex(record_hash)).digest()
+
+
+def hash_pair(left, right):
+    # Sorted pairs: a proof is just the list of siblings, no left/right flags
+    if right < left:
+        left, right = right, left
+    return hashlib.sha256(b"\x01" + left + right).digest()
+
+
+def build_levels(record_hashes):
+    """All tree levels, leaves first. An unpaired node is promoted unchanged."""
+    level = [hash_leaf(h) for h in record_hashes]
+    levels = [level]
+    while len(level) > 1:
+        level = [hash_pair(level[i], level[i + 1]) if i + 1 < len(level) else level[i]
+                 for i in range(0, len(level), 2)]
+        levels.append(level)
+    return levels
+
+
+def merkle_root(record_hashes):
+    if not record_hashes:
+        raise ValueError("Cannot build a Merkle tree with no leaves")
+    return build_levels(record_hashes)[-1][0].hex()
+
+
+def merkle_proof(levels, index):
+    """Sibling hashes (hex) from leaf `index` up to the root."""
+    proof = []
+    for level in levels[:-1]:
+        sibling = index ^ 1
+        if sibling < len(level):
+            proof.append(level[sibling].hex())
+        index //= 2
+    return proof
+
+
+def verify_proof(record_hash, proof, root):
+    """True if `record_hash` is a leaf of the tree with the given root."""
+    node = hash_leaf(record_hash)
+    for sibling in proof:
+        node = hash_pair(node, bytes.fromhex(sibling))
+    return node.hex() == root
+
+
+def window_label(window_start, leaf_count):
+    """The name the root is recorded under on chain, e.g. merkle:1700000000:512."""
+    return f"{ANCHOR_LABEL_PREFIX}{window_start}:{leaf_count}"
+
+
+class MerkleAnchor:
+    """
+    Buffers attendance hashes per `window_seconds` window and anchors each
+    closed window as one Merkle root. `submit(label, root)` sends the anchor
+    transaction and returns its receipt; by default it is
+    blockchain_client.anchor_root on `contract_address`.
+    """
+
+    def __init__(self, contract_address, secret_key=SECRET_KEY, window_seconds=300,
+                 store_path="anchors.db", submit=None):
+        self.contract_address = contract_address
+        self.secret_key = secret_key
+        self.window_seconds = window_seconds
+        self._submit = submit
+        self._lock = threading.Lock()
+        self._buffers = {}  # window_start -> [(record_hash, name, timestamp)]
+        self._buffered = set()  # record hashes in _buffers
+        self._trees = {}    # anchor id -> tree levels, for serving proofs
+        self._conn = sqlite3.connect(store_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        ensure_schema(self._conn)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def window_for(self, timestamp):
+        return int(timestamp) - int(timestamp) % self.window_seconds
+
+    def add(self, name, timestamp=None):
+        """
+        Buffer one attendance event; returns its attendance hash. An event
+        already buffered or anchored (same name and second) is not added again.
+        """
+        timestamp = int(time.time() if timestamp is None else timestamp)
+        record_hash = compute_attendance_hash(name, timestamp, self.secret_key)
+        with self._lock:
+            if record_hash in self._buffered or is_anchored(self._conn, record_hash):
+                return record_hash
+            self._buffered.add(record_hash)
+            self._buffers.setdefault(self.window_for(timestamp), []).append(
+                (record_hash, name, timestamp))
+        return record_hash
+
+    def pending(self):
+        with self._lock:
+            return sum(len(leaves) for leaves in self._buffers.values())
+
+    def flush(self, now=None, force=False):
+        """
+        Anchor every window that has closed (all buffered windows when
+        `force`). Returns [(window_start, root, receipt), ...].
+        """
+        current = self.window_for(time.time() if now is None else now)
+        with self._lock:
+            ready = sorted(w for w in self._buffers if force or w < current)
+            batches = [(w, self._buffers.pop(w)) for w in ready]
+        anchored = []
+        for i, (window_start, leaves) in enumerate(batches):
+            try:
+                anchored.append(self._anchor(window_start, leaves))
+            except Exception:
+                # Keep unanchored windows buffered for the next flush
+                with self._lock:
+                    for w, rest in batches[i:]:
+                        self._buffers[w] = rest + self._buffers.get(w, [])
+                raise
+        return anchored
+
+    def _anchor(self, window_start, leaves):
+        levels = build_levels([record_hash for record_hash, _, _ in leaves])
+        root = levels[-1][0].hex()
+        receipt = self._send(window_label(window_start, len(leaves)), root)
+        tx_hash = receipt["transactionHash"]
+        with self._lock, self._conn:
+            anchor_id = self._conn.execute(
+                "INSERT INTO anchors (window_start, root, leaf_count, tx_hash, gas_used, "
+                "anchored_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (window_start, root, len(leaves),
+                 tx_hash.hex() if isinstance(tx_hash, bytes) else tx_hash,
+                 receipt.get("gasUsed"), time.time())).lastrowid
+            self._conn.executemany(
+                "INSERT INTO anchor_leaves VALUES (?, ?, ?, ?, ?)",
+                [(anchor_id, position, record_hash, name, timestamp)
+                 for position, (record_hash, name, timestamp) in enumerate(leaves)])
+            self._buffered.difference_update(record_hash for record_hash, _, _ in leaves)
+            self._trees[anchor_id] = levels
+        return window_start, root, receipt
+
+    def _send(self, label, root):
+        if self._submit is not None:
+            return self._submit(label, root)
+        import blockchain_client
+
+        return blockchain_client.anchor_root(self.contract_address, label, root)
+
+    def proof_for(self, name, timestamp):
+        """Proof for one student's event, or None if it has not been anchored yet."""
+        return self.proof_for_hash(compute_attendance_hash(name, int(timestamp), self.secret_key))
+
+    def proof_for_hash(self, record_hash):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT l.anchor_id, l.position, a.window_start, a.root, a.leaf_count, a.tx_hash "
+                "FROM anchor_leaves l JOIN anchors a ON a.id = l.anchor_id "
+                "WHERE l.record_hash = ? LIMIT 1", (record_hash,)).fetchone()
+            if row is None:
+                return None
+            anchor_id, position, window_start, root, leaf_count, tx_hash = row
+            levels = self._trees.get(anchor_id)
+            if levels is None:  # anchored before a restart
+                levels = build_levels([h for (h,) in self._conn.execute(
+                    "SELECT record_hash FROM anchor_leaves WHERE anchor_id = ? "
+                    "ORDER BY position", (anchor_id,))])
+                self._trees[anchor_id] = levels
+        return {
+            "leaf": record_hash,
+            "proof": merkle_proof(levels, position),
+            "root": root,
+            "label": window_label(window_start, leaf_count),
+            "window_start": window_start,
+            "tx_hash": tx_hash,
+        }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Check a Merkle attendance proof")
+    parser.add_argument("proof", help="JSON file as returned by MerkleAnchor.proof_for")
+    parser.add_argument("--contract", help="also check the root is recorded on this contract")
+    args = parser.parse_args()
+
+    with open(args.proof) as f:
+        proof = json.load(f)
+    ok = verify_proof(proof["leaf"], proof["proof"], proof["root"])
+    print("Proof matches root:", ok)
+    if ok and args.contract:
+        import blockchain_client
+
+        print("Root recorded on chain:",
+              blockchain_client.find_anchor(args.contract, proof["label"], proof["root"],
+                                            proof.get("tx_hash")))
@@ -0,0 +1,64 @@
+import time
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """
+    Cheap change detector in front of face_locations.
+
+    Each frame is shrunk to a small blurred grayscale thumbnail and compared
+    with a running-average background. Detection runs while the changed
+    share of pixels is above `threshold` (and for `hold_seconds` after), and
+    otherwise only once every `idle_interval` seconds as a heartbeat, so an
+    empty doorway costs almost nothing. One gate per camera.
+    """
+
+    def __init__(self, threshold=0.01, pixel_delta=25, idle_interval=2.0,
+                 hold_seconds=2.0, width=160, learning_rate=0.05, clock=time.monotonic):
+        self.threshold = threshold
+        self.pixel_delta = pixel_delta
+        self.idle_interval = idle_interval
+        self.hold_seconds = hold_seconds
+        self.width = width
+        self.learning_rate = learning_rate
+        self.clock = clock
+        self.frames_processed = 0
+        self.frames_skipped = 0
+        self._background = None
+        self._active_until = 0.0
+        self._last_processed = None
+
+    def should_process(self, frame):
+        now = self.clock()
+        height = max(1, frame.shape[0] * self.width // frame.shape[1])
+        small = cv2.cvtColor(cv2.resize(frame, (self.width, height)), cv2.COLOR_BGR2GRAY)
+        small = cv2.GaussianBlur(small, (5, 5), 0)
+
+        if self._background is None or self._background.shape != small.shape:
+            self._background = small.astype(np.float32)
+            self._active_until = now + self.hold_seconds
+        else:
+            diff = cv2.absdiff(small, cv2.convertScaleAbs(self._background))
+            changed = np.count_nonzero(diff > self.pixel_delta) / diff.size
+            cv2.accumulateWeighted(small, self._background, self.learning_rate)
+            if changed >= self.threshold:
+                self._active_until = now + self.hold_seconds
+
+        process = (now < self._active_until
+                   or self._last_processed is None
+                   or now - self._last_processed >= self.idle_interval)
+        if process:
+            self._last_processed = now
+            self.frames_processed += 1
+        else:
+            self.frames_skipped += 1
+        return process
+
+    def stats(self):
+        total = self.frames_processed + self.frames_skipped
+        return {
+            "frames_processed": self.frames_processed,
+            "frames_skipped": self.frames_skipped,
+            "skip_ratio": self.frames_skipped / total if total else 0.0,
+        }
@@ -0,0 +1,234 @@
+"""
+One-time passwords with queued, rate-limited delivery.
+
+    service = OtpService(TwilioTransport(from_number="+15550100")).start()
+    service.request("alice", "+15550123")   # returns at once; a sender thread delivers
+    service.verify("alice", "123456")
+
+Each request draws a fresh random code, stored in SQLite with its expiry in
+place of the user's previous one, and a code can only be used once, so
+re-requesting always sends a new, usable code. Codes are stored as an HMAC
+under a server secret (OTP_SECRET), so a leaked otp.db does not give them
+away, and a code is invalidated after MAX_FAILURES wrong guesses.
+
+Messages go through one long-lived transport, so the Twilio client and its
+HTTPS connections are reused. Delivery happens on sender threads behind a
+bounded queue, and a token bucket keeps the send rate within the provider's
+limit. A burst of requests at shift start queues up instead of holding up
+the login requests. StubTransport stands in for Twilio in tests and
+benchmarks.
+"""
+import hashlib
+import hmac
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from bounded_queue import BoundedQueue, BLOCK
+
+OTP_INTERVAL = 300  # seconds a code stays valid
+OTP_DIGITS = 6
+MAX_FAILURES = 5    # wrong guesses before the code is thrown away
+
+# Columns added after the first release of the otp_codes table
+MIGRATIONS = (
+    ("failures", "ALTER TABLE otp_codes ADD COLUMN failures INTEGER NOT NULL DEFAULT 0"),
+)
+
+
+class StubTransport:
+    """Keeps messages in memory (and optionally prints them) instead of sending."""
+
+    def __init__(self, delay=0.0, echo=False):
+        self.delay = delay
+        self.echo = echo
+        self.sent = []
+        self._lock = threading.Lock()
+
+    def send(self, to, body):
+        if self.delay:
+            time.sleep(self.delay)
+        with self._lock:
+            self.sent.append((to, body))
+        if self.echo:
+            print(f"OTP to {to}: {body}")
+
+
+class TwilioTransport:
+    """SMS through one shared Twilio client, created on first send."""
+
+    def __init__(self, account_sid=None, auth_token=None, from_number=None):
+        self.account_sid = account_sid
+        self.auth_token = auth_token
+        self.from_number = from_number or os.getenv("TWILIO_FROM_NUMBER", "your_twilio_number")
+        self._client = None
+        self._lock = threading.Lock()
+
+    def send(self, to, body):
+        with self._lock:
+            if self._client is None:
+                from twilio.rest import Client
+
+                # Falls back to TWILIO_ACCOUNT_SID / TWILIO_AUTH_TOKEN when None
+                self._client = Client(self.account_sid, self.auth_token)
+        self._client.messages.create(to=to, from_=self.from_number, body=body)
+
+
+class TokenBucket:
+    """`rate` tokens per second, up to `capacity` saved up for bursts."""
+
+    def __init__(self, rate, capacity, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self._tokens = capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take one token, sleeping until one is available; returns seconds waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = self.clock()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+
+class OtpService:
+    def __init__(self, transport, path="otp.db", interval=OTP_INTERVAL, rate=10.0, burst=50,
+                 queue_size=1000, senders=2, secret=None, max_failures=MAX_FAILURES):
+        self.transport = transport
+        self.interval = interval
+        self.max_failures = max_failures
+        # Without a configured secret, codes do not survive a restart
+        secret = secret or os.getenv("OTP_SECRET") or secrets.token_bytes(32)
+        self._secret = secret.encode() if isinstance(secret, str) else secret
+        self.bucket = TokenBucket(rate, burst)
+        self.senders = senders
+        self.queued = 0
+        self.sent = 0
+        self.failed = 0
+        self.throttled_seconds = 0.0
+        self._queue = BoundedQueue(queue_size, BLOCK)
+        self._threads = []
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS otp_codes ("
+            "user TEXT PRIMARY KEY, code_hash TEXT NOT NULL, expires_at REAL NOT NULL, "
+            "failures INTEGER NOT NULL DEFAULT 0)")
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(otp_codes)")}
+        for column, sql in MIGRATIONS:
+            if column not in columns:
+                self._conn.execute(sql)
+
+    def start(self):
+        for _ in range(self.senders):
+            thread = threading.Thread(target=self._send_loop, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self, timeout=10.0):
+        """Deliver what is queued (up to `timeout`), then stop the senders."""
+        deadline = time.monotonic() + timeout
+        while len(self._queue) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        with self._lock:
+            self._conn.close()
+
+    def _hash(self, user, code):
+        return hmac.new(self._secret, f"{user}:{code}".encode(), hashlib.sha256).hexdigest()
+
+    def request(self, user, destination, timeout=0.5):
+        """
+        Generate a new code for the user (replacing any earlier one) and
+        queue it for delivery. Returns the code, or None if the queue stayed
+        full for `timeout` seconds; the earlier code is then still valid.
+        """
+        code = f"{secrets.randbelow(10 ** OTP_DIGITS):0{OTP_DIGITS}d}"
+        if not self._queue.put((destination, f"Your OTP is: {code}"), timeout):
+            return None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO otp_codes (user, code_hash, expires_at, failures) "
+                "VALUES (?, ?, ?, 0)",
+                (user, self._hash(user, code), time.time() + self.interval))
+        self.queued += 1
+        return code
+
+    def verify(self, user, code):
+        """
+        True once per code: a verified code is deleted and cannot be replayed.
+        After `max_failures` wrong codes the user's code is deleted too, and
+        only a new request() can succeed.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT code_hash, expires_at, failures FROM otp_codes WHERE user = ?",
+                (user,)).fetchone()
+            if row is None:
+                return False
+            code_hash, expires_at, failures = row
+            if not hmac.compare_digest(code_hash, self._hash(user, str(code))):
+                if failures + 1 >= self.max_failures:
+                    self._conn.execute("DELETE FROM otp_codes WHERE user = ?", (user,))
+                else:
+                    self._conn.execute(
+                        "UPDATE otp_codes SET failures = failures + 1 WHERE user = ?", (user,))
+                return False
+            self._conn.execute("DELETE FROM otp_codes WHERE user = ?", (user,))
+        return expires_at >= time.time()
+
+    def metrics(self):
+        return {
+            "queued": self.queued,
+            "sent": self.sent,
+            "failed": self.failed,
+            "pending": len(self._queue),
+            "throttled_seconds": round(self.throttled_seconds, 3),
+        }
+
+    def _send_loop(self):
+        while not self._stop.is_set():
+            item = self._queue.get(timeout=0.5)
+            if item is None:
+                continue
+            self.throttled_seconds += self.bucket.acquire()
+            to, body = item
+            try:
+                self.transport.send(to, body)
+                self.sent += 1
+            except Exception as e:
+                self.failed += 1
+                print(f"OTP delivery to {to} failed: {e}")
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_otp_service():
+    """Process-wide OtpService; OTP_TRANSPORT=stub prints codes instead of texting."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            if os.getenv("OTP_TRANSPORT", "twilio") == "stub":
+                transport = StubTransport(echo=True)
+            else:
+                transport = TwilioTransport()
+            _service = OtpService(transport, path=os.getenv("OTP_DB", "otp.db")).start()
+    return _service
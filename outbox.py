@@ -0,0 +1,221 @@
+import json
+import sqlite3
+import threading
+import time
+from metrics import REGISTRY
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    timestamp INTEGER NOT NULL,
+    hash TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    sent_at REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    dead_at REAL,
+    error TEXT,
+    UNIQUE (name, timestamp, hash)
+);
+CREATE INDEX IF NOT EXISTS outbox_pending ON outbox (id) WHERE sent_at IS NULL;
+"""
+
+# Columns added after the first release of the outbox table
+MIGRATIONS = (
+    ("dead_at", "ALTER TABLE outbox ADD COLUMN dead_at REAL"),
+    ("error", "ALTER TABLE outbox ADD COLUMN error TEXT"),
+)
+
+
+class Outbox:
+    """
+    Durable write-ahead log of attendance events (SQLite in WAL mode).
+
+    Events are committed locally before any network I/O, so a backend outage
+    or a crash never loses an attendance record. (name, timestamp, hash) is
+    unique, so appending the same event twice is a no-op, and the backend
+    can acknowledge re-sends idempotently.
+
+    Events the backend rejects permanently, or that keep failing, are
+    parked as dead letters (dead_at set) so they stop blocking the events
+    behind them; requeue_dead() puts them back once the cause is fixed.
+    """
+
+    def __init__(self, path="outbox.db"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # NORMAL is durable across application crashes in WAL mode; only an
+        # OS crash can lose the last transactions.
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(outbox)")}
+        for column, sql in MIGRATIONS:
+            if column not in columns:
+                self._conn.execute(sql)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def append(self, payload):
+        """Store one event; returns False if it was already in the outbox."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO outbox (name, timestamp, hash, payload, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (payload["name"], payload["timestamp"], payload["hash"],
+                 json.dumps(payload), time.time()))
+            return cursor.rowcount == 1
+
+    def pending(self, limit=500):
+        """Oldest unsent events as [(id, payload), ...]."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, payload FROM outbox WHERE sent_at IS NULL AND dead_at IS NULL "
+                "ORDER BY id LIMIT ?",
+                (limit,)).fetchall()
+        return [(row_id, json.loads(payload)) for row_id, payload in rows]
+
+    def pending_count(self):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM outbox WHERE sent_at IS NULL AND dead_at IS NULL").fetchone()[0]
+
+    def dead_count(self):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM outbox WHERE sent_at IS NULL AND dead_at IS NOT NULL"
+            ).fetchone()[0]
+
+    def ack(self, ids):
+        self._update("UPDATE outbox SET sent_at = ? WHERE id = ?", [(time.time(), i) for i in ids])
+
+    def mark_failed(self, ids, max_attempts=None):
+        """Count a failed attempt; rows reaching `max_attempts` become dead letters."""
+        self._update("UPDATE outbox SET attempts = attempts + 1 WHERE id = ?", [(i,) for i in ids])
+        if max_attempts is not None:
+            self._update("UPDATE outbox SET dead_at = ?, error = 'too many attempts' "
+                         "WHERE id = ? AND attempts >= ?",
+                         [(time.time(), i, max_attempts) for i in ids])
+
+    def dead_letter(self, ids, error):
+        """Park events the backend will never accept."""
+        self._update("UPDATE outbox SET attempts = attempts + 1, dead_at = ?, error = ? "
+                     "WHERE id = ?", [(time.time(), error, i) for i in ids])
+
+    def requeue_dead(self):
+        """Make every dead letter pending again; returns how many."""
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE outbox SET dead_at = NULL, error = NULL, attempts = 0 "
+                "WHERE sent_at IS NULL AND dead_at IS NOT NULL").rowcount
+
+    def purge_sent(self, older_than_seconds=7 * 24 * 3600):
+        """Delete delivered events older than the retention window."""
+        with self._lock:
+            self._conn.execute("DELETE FROM outbox WHERE sent_at IS NOT NULL AND sent_at < ?",
+                               (time.time() - older_than_seconds,))
+
+    def _update(self, sql, rows):
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(sql, rows)
+            self._conn.execute("COMMIT")
+
+
+class OutboxSyncer:
+    """
+    Background thread that drains the Outbox to the backend through an
+    AttendanceClient, oldest first, in batches of `batch_size`. Delivered
+    events are acknowledged by id; failed ones stay pending and are retried
+    after `retry_wait` seconds, up to `max_attempts` times (None: forever).
+    Events the backend rejects permanently are dead-lettered at once.
+
+    Pending/dead counts and the client's send latency are exported as
+    gauges on metrics.REGISTRY after every batch.
+    """
+
+    def __init__(self, outbox, client, batch_size=500, retry_wait=5.0, max_attempts=100):
+        self.outbox = outbox
+        self.client = client
+        self.batch_size = batch_size
+        self.retry_wait = retry_wait
+        self.max_attempts = max_attempts
+        self.synced = 0
+        self.dead = 0
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._sync_loop, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=10.0):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def notify(self):
+        """Call after append() to send without waiting for the next poll."""
+        self._wake.set()
+
+    def sync_once(self):
+        """
+        Send one batch; returns (sent, failed) counts. Dead-lettered events
+        count as neither, so one bad event does not stall the rest.
+        """
+        rows = self.outbox.pending(self.batch_size)
+        if not rows:
+            return 0, 0
+        ids_by_key = {(p["name"], p["timestamp"], p["hash"]): row_id for row_id, p in rows}
+        failed, invalid = self.client.send([payload for _, payload in rows])
+        failed_ids = [ids_by_key[(p["name"], p["timestamp"], p["hash"])] for p in failed]
+        invalid_ids = [ids_by_key[(p["name"], p["timestamp"], p["hash"])] for p in invalid]
+        done = set(failed_ids) | set(invalid_ids)
+        self.outbox.ack([row_id for row_id, _ in rows if row_id not in done])
+        if failed_ids:
+            self.outbox.mark_failed(failed_ids, self.max_attempts)
+        if invalid_ids:
+            self.outbox.dead_letter(invalid_ids, "rejected by backend")
+            self.dead += len(invalid_ids)
+            print(f"{len(invalid_ids)} attendance events rejected by the backend; "
+                  f"parked as dead letters in {self.outbox.path}")
+        sent = len(rows) - len(done)
+        self.synced += sent
+        self.export_gauges()
+        return sent, len(failed_ids)
+
+    def export_gauges(self, registry=REGISTRY):
+        registry.set_gauge("outbox_pending", self.outbox.pending_count())
+        registry.set_gauge("outbox_dead", self.outbox.dead_count())
+        client = self.client.metrics()
+        registry.set_gauge("client_send_latency_avg_ms", client["send_latency_avg_ms"] or 0)
+        registry.set_gauge("client_send_latency_p95_ms", client["send_latency_p95_ms"] or 0)
+
+    def drain(self):
+        """
+        Sync until nothing is pending or a send fails; returns events sent.
+        A batch that was entirely dead-lettered does not stop the drain.
+        """
+        total = 0
+        while True:
+            sent, failed = self.sync_once()
+            total += sent
+            if failed or not self.outbox.pending_count():
+                return total
+
+    def _sync_loop(self):
+        while not self._stop.is_set():
+            sent, failed = self.sync_once()
+            if failed:
+                # Backend is down: back off (new events do not cut this short)
+                self._stop.wait(self.retry_wait)
+            elif not sent and not self.outbox.pending_count():
+                self._wake.wait(1.0)
+                self._wake.clear()
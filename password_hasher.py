@@ -0,0 +1,146 @@
+"""
+bcrypt hashing off the request threads.
+
+    hasher = PasswordHasher(rounds=12)
+    hashed = hasher.hash("s3cret")
+    ok, new_hash = hasher.verify_and_update("s3cret", hashed)  # new_hash if cost changed
+
+bcrypt runs in a bounded process pool, so a login burst queues up instead of
+pinning every web worker on CPU. When more than `max_pending` hashes are
+queued, callers wait up to `timeout` and then get HasherBusy (a 503 for the
+login view). Successful verifications are remembered for `cache_ttl`
+seconds, keyed by an HMAC with a per-process random key, so a user who logs
+in again, or a session re-check, skips bcrypt. The stored hash is part of the
+key, so entries stop matching as soon as a password is changed.
+"""
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import bcrypt
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+
+class HasherBusy(Exception):
+    pass
+
+
+def _hash(password, rounds):
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds))
+
+
+def _check(password, hashed):
+    return bcrypt.checkpw(password, hashed)
+
+
+def hash_rounds(hashed):
+    """Cost factor of a $2b$12$... hash."""
+    return int(hashed.split(b"$")[2])
+
+
+def _as_bytes(value):
+    return value.encode("utf-8") if isinstance(value, str) else value
+
+
+class PasswordHasher:
+    def __init__(self, rounds=BCRYPT_ROUNDS, processes=None, max_pending=None,
+                 timeout=None, cache_ttl=300.0, cache_size=10000, clock=time.monotonic):
+        self.rounds = rounds
+        self.processes = processes or os.cpu_count() or 1
+        self.timeout = timeout
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+        self.clock = clock
+        self.cache_hits = 0
+        self.rehashed = 0
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_pending or 4 * self.processes)
+        self._cache_key = secrets.token_bytes(32)
+        self._verified = OrderedDict()  # hmac digest -> expires_at, in expiry order
+        self._cache_lock = threading.Lock()
+
+    def close(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise HasherBusy("Too many password checks queued")
+        try:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ProcessPoolExecutor(max_workers=self.processes)
+                future = self._pool.submit(fn, *args)
+            return future.result()
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        return self._run(_hash, _as_bytes(password), self.rounds)
+
+    def needs_rehash(self, hashed):
+        return hash_rounds(_as_bytes(hashed)) != self.rounds
+
+    def verify(self, password, hashed):
+        password, hashed = _as_bytes(password), _as_bytes(hashed)
+        key = hmac.new(self._cache_key, hashed + b"\0" + password, hashlib.sha256).digest()
+        now = self.clock()
+        with self._cache_lock:
+            self._expire(now)
+            if key in self._verified:
+                self.cache_hits += 1
+                return True
+        if not self._run(_check, password, hashed):
+            return False
+        with self._cache_lock:
+            self._verified[key] = now + self.cache_ttl
+            self._verified.move_to_end(key)
+            while len(self._verified) > self.cache_size:
+                self._verified.popitem(last=False)
+        return True
+
+    def verify_and_update(self, password, hashed):
+        """
+        (ok, new_hash): new_hash is a re-hash at the current cost when the
+        stored hash used a different one, for the caller to save; else None.
+        """
+        if not self.verify(password, hashed):
+            return False, None
+        if not self.needs_rehash(hashed):
+            return True, None
+        self.rehashed += 1
+        return True, self.hash(password)
+
+    def _expire(self, now):
+        while self._verified:
+            key, expires_at = next(iter(self._verified.items()))
+            if expires_at > now:
+                break
+            self._verified.popitem(last=False)
+
+
+_hasher = None
+_hasher_lock = threading.Lock()
+
+
+def get_hasher():
+    """The process-wide PasswordHasher, created on first use."""
+    global _hasher
+    with _hasher_lock:
+        if _hasher is None:
+            _hasher = PasswordHasher()
+    return _hasher
@@ -0,0 +1,354 @@
+import threading
+import time
+import cv2
+import face_recognition
+from bounded_queue import BoundedQueue, DROP_OLDEST, BLOCK
+from metrics import REGISTRY
+
+# Default backpressure per queue: stale video frames and display results can be
+# dropped, but recognised names must never be.
+DEFAULT_POLICIES = {
+    "frames": DROP_OLDEST,
+    "encoded": BLOCK,
+    "results": DROP_OLDEST,
+    "dispatch": BLOCK,
+}
+
+
+DETECTION_SCALES = (1.0, 0.5, 0.25)
+
+
+def _locate(rgb_frame, scale):
+    if scale == 1.0:
+        return face_recognition.face_locations(rgb_frame)
+    small = cv2.resize(rgb_frame, (0, 0), fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    height, width = rgb_frame.shape[:2]
+    return [
+        (max(0, int(top / scale)), min(width, int(right / scale)),
+         min(height, int(bottom / scale)), max(0, int(left / scale)))
+        for top, right, bottom, left in face_recognition.face_locations(small)
+    ]
+
+
+def detect_and_encode(frame, scale=1.0, encode=True):
+    """
+    HOG face locations and 128-d encodings for one BGR frame.
+
+    With scale < 1 HOG runs on a resized copy (its cost falls roughly with
+    scale squared); boxes are mapped back so encodings are still computed on
+    the full-resolution frame. With encode=False only the locations are
+    computed and None is returned for the encodings (tracking mode).
+    """
+    start = time.perf_counter()
+    rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    face_locations = _locate(rgb_frame, scale)
+    REGISTRY.observe("face_locations", time.perf_counter() - start)
+    if not encode:
+        return face_locations, None
+    start = time.perf_counter()
+    face_encodings = face_recognition.face_encodings(rgb_frame, face_locations)
+    REGISTRY.observe("face_encodings", time.perf_counter() - start)
+    return face_locations, face_encodings
+
+
+def encode_faces(frame, face_locations):
+    """128-d encodings for the given boxes of one BGR frame."""
+    start = time.perf_counter()
+    rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    face_encodings = face_recognition.face_encodings(rgb_frame, face_locations)
+    REGISTRY.observe("face_encodings", time.perf_counter() - start)
+    return face_encodings
+
+
+class AutoScaleDetector:
+    """
+    detect_and_encode with the detection scale picked from a target FPS.
+
+    Keeps a moving average of the per-frame time and steps down through
+    DETECTION_SCALES while it is slower than the target, and back up when
+    the next larger scale (about 4x the cost) would still meet it with some
+    headroom, so it does not flap between two scales. Usable
+    anywhere an encode_frame callable is expected.
+    """
+
+    def __init__(self, target_fps, scales=DETECTION_SCALES, smoothing=0.2, encode=True):
+        self.target_fps = target_fps
+        self.encode = encode
+        self.scales = sorted(scales, reverse=True)
+        self.smoothing = smoothing
+        self.level = 0
+        self._avg_seconds = None
+
+    @property
+    def scale(self):
+        return self.scales[self.level]
+
+    def __call__(self, frame):
+        start = time.perf_counter()
+        result = detect_and_encode(frame, self.scale, self.encode)
+        self._update(time.perf_counter() - start)
+        return result
+
+    def _update(self, seconds):
+        if self._avg_seconds is None:
+            self._avg_seconds = seconds
+        else:
+            self._avg_seconds += self.smoothing * (seconds - self._avg_seconds)
+        budget = 1.0 / self.target_fps
+        if self._avg_seconds > budget and self.level < len(self.scales) - 1:
+            self.level += 1
+            self._avg_seconds = None
+        elif self.level > 0:
+            ratio = (self.scales[self.level - 1] / self.scale) ** 2
+            if self._avg_seconds * ratio < 0.8 * budget:
+                self.level -= 1
+                self._avg_seconds = None
+
+
+def identify_faces(frame, face_locations, face_encodings, matcher, tracker=None):
+    """
+    Detections ({"name", "location", "track_id"} dicts) for one frame.
+
+    Without a tracker every face is matched from `face_encodings`. With one,
+    `face_encodings` may be None: only faces whose track is new or due for
+    re-verification are encoded and matched, the rest reuse the track name.
+    """
+    if tracker is None:
+        start = time.perf_counter()
+        names = matcher.identify(face_encodings)
+        REGISTRY.observe("matching", time.perf_counter() - start)
+        track_ids = [None] * len(names)
+    else:
+        tracks = tracker.update(face_locations)
+        pending = [t for t in tracks if tracker.needs_encoding(t)]
+        if pending:
+            pending_encodings = encode_faces(frame, [t.location for t in pending])
+            start = time.perf_counter()
+            pending_names = matcher.identify(pending_encodings)
+            REGISTRY.observe("matching", time.perf_counter() - start)
+            for track, name in zip(pending, pending_names):
+                tracker.assign(track, name)
+        names = [t.name for t in tracks]
+        track_ids = [t.track_id for t in tracks]
+    return [{"name": name, "location": location, "track_id": track_id}
+            for name, location, track_id in zip(names, face_locations, track_ids)]
+
+
+class RecognitionPipeline:
+    """
+    Staged capture -> detect/encode -> match -> dispatch pipeline.
+
+    Each stage runs on its own thread(s), connected by BoundedQueues, so a
+    slow POST or a slow display never stalls the camera or the detectors:
+
+        capture --frames--> N encode workers --encoded--> matcher
+        matcher --results--> caller (display)   matcher --dispatch--> dispatcher
+
+    `dispatch(name)` is called on the dispatcher thread for every recognised
+    name in every processed frame; it is responsible for de-duplication.
+    Results are (frame, detections) pairs in the same shape the display
+    code already uses.
+
+    With a FaceTracker, encode_frame should only detect (encode=False): the
+    matcher stage then encodes just the faces whose track is new or due for
+    re-verification, and every other face reuses its track's name.
+
+    With a MotionGate, frames the gate rejects skip detection entirely and
+    go straight to the results queue with no detections.
+
+    When capture ends (or stop() is called) each stage finishes what is
+    already queued before exiting, so every captured frame is processed. If
+    a stage raises, the exception is kept in `error`, every stage stops and
+    join() re-raises it.
+
+    Stage timings go to metrics.REGISTRY: "capture" (video_capture.read),
+    "encode_frame" (the whole encode_frame call, which is all the parent
+    process sees when it runs in an EncodingPool), "matching" and
+    "dispatch"; detect_and_encode adds "face_locations" and "face_encodings"
+    when it runs in this process. Queue depths and drops are gauges.
+    """
+
+    def __init__(self, video_capture, matcher, dispatch, workers=2, queue_size=4,
+                 dispatch_queue_size=1000, policies=None, encode_frame=detect_and_encode,
+                 tracker=None, motion_gate=None):
+        policies = dict(DEFAULT_POLICIES, **(policies or {}))
+        self.video_capture = video_capture
+        self.matcher = matcher
+        self.dispatch = dispatch
+        self.encode_frame = encode_frame
+        self.tracker = tracker
+        self.motion_gate = motion_gate
+        self.workers = workers
+        self.queues = {
+            "frames": BoundedQueue(queue_size, policies["frames"]),
+            "encoded": BoundedQueue(queue_size, policies["encoded"]),
+            "results": BoundedQueue(queue_size, policies["results"]),
+            "dispatch": BoundedQueue(dispatch_queue_size, policies["dispatch"]),
+        }
+        self.frames_captured = 0
+        self.frames_processed = 0
+        self.capture_error = None  # set when the camera stops delivering frames
+        self.error = None          # first exception raised by any stage
+        self._stop = threading.Event()   # stop capturing; queued work still drains
+        self._abort = threading.Event()  # a stage failed: stop everything now
+        # Set when a stage has exited and its output queue gets no more items
+        self._done = {stage: threading.Event() for stage in ("capture", "encode", "match")}
+        self._encoders_left = workers
+        self._lock = threading.Lock()
+        self._threads = []
+        self._last_seq = -1
+
+    @property
+    def running(self):
+        return not self._stop.is_set()
+
+    def start(self):
+        targets = [(self._capture_loop, "capture"), (self._match_loop, "match"),
+                   (self._dispatch_loop, "dispatch")]
+        targets += [(self._encode_loop, "encode")] * self.workers
+        for target, stage in targets:
+            thread = threading.Thread(target=self._run_stage, args=(target, stage), daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self, timeout=2.0):
+        """Stop capturing and give the other stages `timeout` seconds to drain."""
+        self._stop.set()
+        self._join_threads(timeout)
+
+    def join(self, timeout=None):
+        """Wait for every stage to finish; re-raises the error of a failed stage."""
+        self._join_threads(timeout)
+        if self.error is not None:
+            raise self.error
+
+    def _join_threads(self, timeout):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+
+    def _run_stage(self, target, stage):
+        try:
+            target()
+        except Exception as e:
+            with self._lock:
+                if self.error is None:
+                    self.error = e
+            self._abort.set()
+            self._stop.set()
+        finally:
+            if stage == "encode":
+                with self._lock:
+                    self._encoders_left -= 1
+                    if self._encoders_left == 0:
+                        self._done["encode"].set()
+            elif stage in self._done:
+                self._done[stage].set()
+
+    def _next(self, queue_name, upstream):
+        """
+        Next item from a stage's input queue; None once the upstream stage
+        is done and the queue is empty, or the pipeline was aborted.
+        """
+        while not self._abort.is_set():
+            done = self._done[upstream].is_set()  # read before get: no item can follow
+            item = self.queues[queue_name].get(timeout=0.1)
+            if item is not None:
+                return item
+            if done:
+                return None
+        return None
+
+    def _put(self, queue_name, item):
+        """put() on a BLOCK queue that gives up if the pipeline is aborted."""
+        while not self.queues[queue_name].put(item, timeout=0.1):
+            if self._abort.is_set():
+                return False
+        return True
+
+    def get_result(self, timeout=0.1):
+        """Latest (frame, detections) for display, or None."""
+        return self.queues["results"].get(timeout)
+
+    def stats(self):
+        stats = {
+            "frames_captured": self.frames_captured,
+            "frames_processed": self.frames_processed,
+            "queue_depth": {k: len(q) for k, q in self.queues.items()},
+            "dropped": {k: q.dropped for k, q in self.queues.items()},
+        }
+        if self.motion_gate is not None:
+            stats["motion_gate"] = self.motion_gate.stats()
+        return stats
+
+    def export_gauges(self, registry=REGISTRY):
+        """Copy queue depths and drop counts into `registry` (cheap; call per frame)."""
+        registry.set_gauge("frames_captured", self.frames_captured)
+        for name, queue in self.queues.items():
+            registry.set_gauge(f"queue_depth_{name}", len(queue))
+            registry.set_gauge(f"queue_dropped_{name}", queue.dropped)
+
+    def _capture_loop(self):
+        seq = 0
+        while self.running:
+            start = time.perf_counter()
+            ret, frame = self.video_capture.read()
+            REGISTRY.observe("capture", time.perf_counter() - start)
+            if not ret or frame is None:
+                self.capture_error = "Could not read frame from webcam."
+                self._stop.set()
+                break
+            self.frames_captured += 1
+            if self.motion_gate is not None and not self.motion_gate.should_process(frame):
+                self.queues["results"].put((frame, []))  # keep the preview live
+                continue
+            self.queues["frames"].put((seq, frame))
+            seq += 1
+
+    def _encode_loop(self):
+        while True:
+            item = self._next("frames", "capture")
+            if item is None:
+                return
+            seq, frame = item
+            start = time.perf_counter()
+            face_locations, face_encodings = self.encode_frame(frame)
+            REGISTRY.observe("encode_frame", time.perf_counter() - start)
+            if not self._put("encoded", (seq, frame, face_locations, face_encodings)):
+                return
+
+    def _match_loop(self):
+        while True:
+            item = self._next("encoded", "encode")
+            if item is None:
+                return
+            seq, frame, face_locations, face_encodings = item
+            # Tracks must see frames in order; a frame that lost the race is skipped
+            if self.tracker is not None and seq < self._last_seq:
+                continue
+            detections = identify_faces(frame, face_locations, face_encodings,
+                                        self.matcher, self.tracker)
+            names = [d["name"] for d in detections]
+            for name in dict.fromkeys(names):  # once per frame, in order
+                if not self._put("dispatch", name):
+                    return
+            self.frames_processed += 1
+            REGISTRY.inc("frames_processed")
+            # Workers finish out of order; never show an older frame after a newer one
+            if seq > self._last_seq:
+                self._last_seq = seq
+                self.queues["results"].put((frame, detections))
+
+    def _dispatch_loop(self):
+        # Runs until the matcher is done and everything it recognised went out,
+        # even if another stage failed: recognised names must not be lost
+        while True:
+            done = self._done["match"].is_set()
+            name = self.queues["dispatch"].get(timeout=0.1)
+            if name is not None:
+                start = time.perf_counter()
+                self.dispatch(name)
+                REGISTRY.observe("dispatch", time.perf_counter() - start)
+            elif done:
+                return
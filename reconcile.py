@@ -0,0 +1,259 @@
+"""
+Incremental reconciliation of the SQLite attendance table against the chain.
+
+    python reconcile.py --contract 0xABC... --db attendance.db
+    python reconcile.py --contract 0xABC... --json > issues.json
+    python reconcile.py --contract 0xABC... --anchors anchors.db
+
+Chain records are indexed into a local `chain_records` table from a stored
+checkpoint (the next record index per contract), one getAllRecords page at a
+time. Each run then only checks what is new since the last run: attendance
+rows past the DB checkpoint and chain records past the chain checkpoint, via
+indexed hash lookups. Open issues are kept in `reconcile_issues` and
+re-checked on every run (a row written moments ago may not be on chain yet),
+so after the first sync a run costs time proportional to new records plus
+open issues, not to total history.
+
+Issues:
+    missing_on_chain   attendance row whose hash is neither on chain nor a
+                       leaf of an anchored Merkle root
+    missing_in_db      chain record whose hash is not in the attendance table
+    hash_mismatch      stored hash does not match compute_attendance_hash of
+                       the row's own name/timestamp, or DB and chain disagree
+                       on the name for the same hash
+
+Rows committed through Merkle anchors (see merkle_anchor.py) are looked up
+in the anchor store's `anchor_leaves` table, attached as schema "anchors".
+Rehashing uses attendance_store.SECRET_KEY (the SECRET_KEY environment
+variable), the same key the live script hashes with.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+import attendance_store
+from merkle_anchor import ANCHOR_LABEL_PREFIX, is_anchored
+
+ANCHORS_SCHEMA = "anchors"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chain_records (
+    contract TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    record_hash TEXT NOT NULL,
+    timestamp INTEGER,
+    PRIMARY KEY (contract, idx)
+);
+CREATE INDEX IF NOT EXISTS ix_chain_records_hash ON chain_records (record_hash);
+
+CREATE TABLE IF NOT EXISTS reconcile_checkpoints (
+    contract TEXT PRIMARY KEY,
+    next_index INTEGER NOT NULL,
+    last_attendance_id INTEGER NOT NULL,
+    synced_at REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS reconcile_issues (
+    kind TEXT NOT NULL,
+    ref TEXT NOT NULL,
+    detail TEXT,
+    found_at REAL NOT NULL,
+    PRIMARY KEY (kind, ref)
+);
+"""
+
+
+def ensure_schema(conn):
+    conn.executescript(SCHEMA)
+
+
+def checkpoint(conn, contract):
+    row = conn.execute(
+        "SELECT next_index, last_attendance_id FROM reconcile_checkpoints WHERE contract = ?",
+        (contract,)).fetchone()
+    return row if row else (0, 0)
+
+
+def sync_chain(conn, contract, page_size=100):
+    """
+    Index chain records from the checkpoint onwards. Each page is committed
+    together with the advanced checkpoint, so an interrupted sync resumes
+    where it stopped. Returns the (idx, name, record_hash) rows added.
+    """
+    import blockchain_client
+
+    start, _ = checkpoint(conn, contract)
+    added = []
+    page = []
+
+    def commit(page):
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO chain_records VALUES (?, ?, ?, ?, ?)",
+                [(contract, idx, name, record_hash, timestamp)
+                 for idx, name, record_hash, timestamp in page])
+            conn.execute(
+                "INSERT INTO reconcile_checkpoints VALUES (?, ?, 0, ?) "
+                "ON CONFLICT (contract) DO UPDATE SET next_index = excluded.next_index, "
+                "synced_at = excluded.synced_at",
+                (contract, page[-1][0] + 1, time.time()))
+        added.extend((idx, name, record_hash) for idx, name, record_hash, _ in page)
+
+    for idx, record in blockchain_client.iter_records(contract, page_size, start):
+        name, record_hash, timestamp = blockchain_client.record_fields(
+            blockchain_client.record_to_dict(record))
+        page.append((idx, name, record_hash, timestamp))
+        if len(page) == page_size:
+            commit(page)
+            page = []
+    if page:
+        commit(page)
+    return added
+
+
+def _unix_seconds(db_timestamp):
+    return int(datetime.strptime(db_timestamp, attendance_store.TIMESTAMP_FORMAT).timestamp())
+
+
+def _set_issue(conn, kind, ref, detail):
+    conn.execute("INSERT OR IGNORE INTO reconcile_issues VALUES (?, ?, ?, ?)",
+                 (kind, str(ref), detail, time.time()))
+
+
+def _chain_has(conn, record_hash):
+    return conn.execute("SELECT 1 FROM chain_records WHERE record_hash = ? LIMIT 1",
+                        (record_hash,)).fetchone() is not None
+
+
+def attach_anchors(conn, path):
+    """Attach the Merkle anchor store; returns False if there is none at `path`."""
+    if not path or not os.path.exists(path):
+        return False
+    conn.execute(f"ATTACH DATABASE ? AS {ANCHORS_SCHEMA}", (path,))
+    return True
+
+
+def _anchors_attached(conn):
+    return any(row[1] == ANCHORS_SCHEMA for row in conn.execute("PRAGMA database_list"))
+
+
+def _committed(conn, record_hash, anchors):
+    return _chain_has(conn, record_hash) or (
+        anchors and is_anchored(conn, record_hash, schema=ANCHORS_SCHEMA))
+
+
+def check_db_row(conn, row_id, name, timestamp, record_hash, secret_key=None, anchors=False):
+    if not _committed(conn, record_hash, anchors):
+        _set_issue(conn, "missing_on_chain", row_id, f"{name} at {timestamp}")
+    if secret_key is not None and timestamp is not None:
+        expected = attendance_store.compute_attendance_hash(name, _unix_seconds(timestamp),
+                                                            secret_key)
+        if expected != record_hash:
+            _set_issue(conn, "hash_mismatch", row_id,
+                       f"{name} at {timestamp}: stored {record_hash}, expected {expected}")
+
+
+def check_chain_record(conn, contract, idx, name, record_hash):
+    if name.startswith(ANCHOR_LABEL_PREFIX):
+        return
+    row = conn.execute("SELECT id, name FROM attendance WHERE hash = ? LIMIT 1",
+                       (record_hash,)).fetchone()
+    if row is None:
+        _set_issue(conn, "missing_in_db", f"{contract}:{idx}", f"{name} {record_hash}")
+    elif row[1] != name:
+        _set_issue(conn, "hash_mismatch", f"{contract}:{idx}",
+                   f"chain name {name!r}, attendance row {row[0]} name {row[1]!r}")
+
+
+def recheck_open_issues(conn, anchors=False):
+    """Drop missing_* issues that the latest rows or anchors have resolved."""
+    resolved = []
+    for kind, ref in conn.execute(
+            "SELECT kind, ref FROM reconcile_issues "
+            "WHERE kind IN ('missing_on_chain', 'missing_in_db')").fetchall():
+        if kind == "missing_on_chain":
+            row = conn.execute("SELECT hash FROM attendance WHERE id = ?", (int(ref),)).fetchone()
+            ok = row is None or _committed(conn, row[0], anchors)
+        else:
+            contract, idx = ref.rsplit(":", 1)
+            row = conn.execute(
+                "SELECT record_hash FROM chain_records WHERE contract = ? AND idx = ?",
+                (contract, int(idx))).fetchone()
+            ok = row is None or conn.execute(
+                "SELECT 1 FROM attendance WHERE hash = ? LIMIT 1", (row[0],)).fetchone()
+        if ok:
+            resolved.append((kind, ref))
+    conn.executemany("DELETE FROM reconcile_issues WHERE kind = ? AND ref = ?", resolved)
+    return len(resolved)
+
+
+def reconcile(conn, contract, secret_key=None, page_size=100):
+    """
+    Sync the chain index, check everything new since the last run and return
+    a summary dict with the open issues. Attach the anchor store first
+    (attach_anchors) so anchored rows count as committed.
+    """
+    ensure_schema(conn)
+    anchors = _anchors_attached(conn)
+    added = sync_chain(conn, contract, page_size)
+    _, last_id = checkpoint(conn, contract)
+    with conn:
+        new_rows = conn.execute(
+            "SELECT id, name, timestamp, hash FROM attendance "
+            "WHERE id > ? AND hash IS NOT NULL ORDER BY id", (last_id,)).fetchall()
+        for row_id, name, timestamp, record_hash in new_rows:
+            check_db_row(conn, row_id, name, timestamp, record_hash, secret_key, anchors)
+        for idx, name, record_hash in added:
+            check_chain_record(conn, contract, idx, name, record_hash)
+        resolved = recheck_open_issues(conn, anchors)
+        max_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM attendance").fetchone()[0]
+        conn.execute(
+            "INSERT INTO reconcile_checkpoints VALUES (?, 0, ?, ?) "
+            "ON CONFLICT (contract) DO UPDATE SET last_attendance_id = excluded.last_attendance_id",
+            (contract, max(max_id, last_id), time.time()))
+    issues = conn.execute(
+        "SELECT kind, ref, detail, found_at FROM reconcile_issues ORDER BY kind, found_at").fetchall()
+    return {
+        "chain_records_added": len(added),
+        "attendance_rows_checked": len(new_rows),
+        "resolved": resolved,
+        "issues": [dict(zip(("kind", "ref", "detail", "found_at"), issue)) for issue in issues],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconcile the attendance DB against the chain")
+    parser.add_argument("--contract", required=True)
+    parser.add_argument("--db", default=attendance_store.DB_PATH)
+    parser.add_argument("--anchors", default="anchors.db",
+                        help="Merkle anchor store (see merkle_anchor.py), if any")
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--no-rehash", action="store_true",
+                        help="skip recomputing attendance hashes from name/timestamp")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    secret_key = None if args.no_rehash else attendance_store.SECRET_KEY
+    conn = attendance_store.connect(args.db)
+    attach_anchors(conn, args.anchors)
+    started = time.perf_counter()
+    report = reconcile(conn, args.contract, secret_key, args.page_size)
+    elapsed = time.perf_counter() - started
+    conn.close()
+
+    if args.json:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+        return
+    print(f"Indexed {report['chain_records_added']} new chain records, checked "
+          f"{report['attendance_rows_checked']} new attendance rows in {elapsed:.2f}s; "
+          f"{report['resolved']} issues resolved, {len(report['issues'])} open")
+    for issue in report["issues"]:
+        print(f"  {issue['kind']:<17} {issue['ref']:<20} {issue['detail']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,28 @@
-import bcrypt
-import pyotp
-from twilio.rest import Client
+from otp_service import get_otp_service
+from password_hasher import get_hasher
 
 def hash_password(password):
-    # Hash the password with a salt
-    salt = bcrypt.gensalt()
-    hashed_password = bcrypt.hashpw(password.encode('utf-8'), salt)
-    return hashed_password
+    # Hash the password with a salt, in the hasher's process pool
+    return get_hasher().hash(password)
 
 def verify_password(password, hashed_password):
-    return bcrypt.checkpw(password.encode('utf-8'), hashed_password)
+    return get_hasher().verify(password, hashed_password)
 
-def send_otp(email):
-    # Generate OTP using pyotp
-    totp = pyotp.TOTP('base32secret3232')
-    otp = totp.now()
-    
-    # Send OTP via email (use Twilio/SendGrid for real implementation)
-    client = Client()
-    client.messages.create(
-        to=email,
-        from_="your_twilio_number",
-        body=f"Your OTP is: {otp}"
-    )
-    return otp
+def verify_and_update_password(password, hashed_password):
+    """
+    Like verify_password, but returns (ok, new_hash); store new_hash when it
+    is not None (the stored hash used an older BCRYPT_ROUNDS cost).
+    """
+    return get_hasher().verify_and_update(password, hashed_password)
+
+def send_otp(email, destination=None):
+    # Fresh one-time code per request; the message is queued and sent by the OTP
+    # service's sender threads, so the login request does not wait on Twilio
+    return get_otp_service().request(email, destination or email)
 
 def verify_otp(input_otp, otp):
     return input_otp == otp
+
+def verify_user_otp(email, input_otp):
+    """Check a code against the user's latest requested one; each code works once."""
+    return get_otp_service().verify(email, input_otp)
@@ -0,0 +1,62 @@
+from datetime import datetime
+import pytest
+import attendance_store
+
+
+def _ts(hour, minute=0):
+    return datetime(2026, 10, 19, hour, minute).timestamp()
+
+
+def test_rollups_keep_one_row_per_class_session(tmp_path):
+    conn = attendance_store.connect(str(tmp_path / "attendance.db"))
+    events = []
+    # Three classes in one day; bob misses the second one
+    for hour in (9, 10, 11):
+        for name in ("alice", "bob"):
+            if not (name == "bob" and hour == 10):
+                events.append({"name": name, "timestamp": _ts(hour, 5),
+                               "session": attendance_store.session_id(_ts(hour, 5))})
+    assert attendance_store.insert_events(conn, events) == (5, 0)
+    # A second sighting in the same class is a duplicate; one in the next class is not
+    assert attendance_store.insert_events(conn, [{"name": "alice", "timestamp": _ts(9, 40)}]) == (0, 1)
+    assert attendance_store.insert_events(conn, [{"name": "bob", "timestamp": _ts(12, 1)}]) == (1, 0)
+
+    assert attendance_store.daily_summary(conn) == [("2026-10-19", 2, 6)]
+    counts = {name: count for name, _, _, count in attendance_store.day_detail(conn, "2026-10-19")}
+    assert counts == {"alice": 3, "bob": 3}
+    sessions = attendance_store.session_summary(conn, "2026-10-19")
+    assert [(s, students) for s, _, _, students in sessions] == [
+        ("2026-10-19T09:00", 2), ("2026-10-19T10:00", 1),
+        ("2026-10-19T11:00", 2), ("2026-10-19T12:00", 1)]
+    assert attendance_store.rollup_mismatches(conn) == []
+
+    attendance_store.rebuild_rollups(conn)
+    assert attendance_store.rollup_mismatches(conn) == []
+    conn.close()
+
+
+@pytest.mark.parametrize("timestamp", [True, False, float("nan"), float("inf"), -float("inf"),
+                                       1e20, -1, 0, "1760000000", None])
+def test_validate_event_rejects_bad_timestamps(timestamp):
+    assert attendance_store.validate_event({"name": "alice", "timestamp": timestamp})
+
+
+@pytest.mark.parametrize("timestamp", [_ts(9), int(_ts(9))])
+def test_validate_event_accepts_unix_seconds(timestamp):
+    assert attendance_store.validate_event({"name": "alice", "timestamp": timestamp}) is None
+
+
+def test_api_rejects_bad_timestamps_with_400(tmp_path):
+    from attendance_api import create_app
+
+    client = create_app(str(tmp_path / "attendance.db")).test_client()
+    for timestamp in (True, 1e20):
+        response = client.post("/attendance", json={"name": "alice", "timestamp": timestamp})
+        assert response.status_code == 400
+    # NaN is not valid JSON; Python's encoder writes it anyway
+    response = client.post("/attendance", data='{"name": "alice", "timestamp": NaN}',
+                           content_type="application/json")
+    assert response.status_code == 400
+    response = client.post("/attendance/bulk", json={"events": [
+        {"name": "alice", "timestamp": _ts(9)}, {"name": "bob", "timestamp": True}]})
+    assert response.status_code == 400
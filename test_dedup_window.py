@@ -0,0 +1,70 @@
+from datetime import datetime
+import pytest
+from dedup_window import COOLDOWN, PERIOD, DedupWindow
+
+
+def _ts(hour, minute=0, second=0):
+    return datetime(2026, 10, 19, hour, minute, second).timestamp()
+
+
+def test_cooldown_suppresses_repeats_until_it_expires():
+    dedup = DedupWindow(COOLDOWN, seconds=600)
+    assert dedup.should_record("alice", now=_ts(9))
+    assert not dedup.should_record("alice", now=_ts(9, 9, 59))
+    assert dedup.should_record("bob", now=_ts(9, 5))
+    assert dedup.should_record("alice", now=_ts(9, 10))
+    assert dedup.suppressed == 1
+
+
+def test_period_records_once_per_clock_period():
+    dedup = DedupWindow(PERIOD, seconds=3600)
+    assert dedup.should_record("alice", now=_ts(9, 55))
+    assert not dedup.should_record("alice", now=_ts(9, 59, 59))
+    assert dedup.should_record("alice", now=_ts(10))
+
+
+def test_cooldown_does_not_cross_into_the_next_session():
+    # Without session_seconds a 09:55 sighting would suppress the 10:00 class
+    plain = DedupWindow(COOLDOWN, seconds=3600)
+    assert plain.should_record("alice", now=_ts(9, 55))
+    assert not plain.should_record("alice", now=_ts(10, 5))
+
+    dedup = DedupWindow(COOLDOWN, seconds=3600, session_seconds=3600)
+    assert dedup.should_record("alice", now=_ts(9, 55))
+    assert not dedup.should_record("alice", now=_ts(9, 58))
+    assert dedup.should_record("alice", now=_ts(10, 5))
+    assert not dedup.should_record("alice", now=_ts(10, 30))
+
+
+def test_expiry_only_pops_from_the_front():
+    dedup = DedupWindow(COOLDOWN, seconds=3600, session_seconds=3600)
+    for minute, name in enumerate(("a", "b", "c")):
+        dedup.should_record(name, now=_ts(9, 50 + minute))
+    assert len(dedup) == 3
+    assert dedup.should_record("d", now=_ts(10, 1))
+    assert len(dedup) == 1
+
+
+def test_windows_survive_a_restart(tmp_path):
+    path = str(tmp_path / "dedup.db")
+    clock = [_ts(9, 5)]
+    dedup = DedupWindow(PERIOD, seconds=3600, path=path, clock=lambda: clock[0])
+    assert dedup.should_record("alice")
+    dedup.close()
+
+    clock[0] = _ts(9, 30)
+    restarted = DedupWindow(PERIOD, seconds=3600, path=path, clock=lambda: clock[0])
+    assert not restarted.should_record("alice")
+    assert restarted.should_record("bob")
+    restarted.close()
+
+    clock[0] = _ts(10, 1)  # expired entries are dropped on load
+    later = DedupWindow(PERIOD, seconds=3600, path=path, clock=lambda: clock[0])
+    assert len(later) == 0
+    assert later.should_record("alice")
+    later.close()
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        DedupWindow("sliding")
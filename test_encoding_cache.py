@@ -0,0 +1,106 @@
+import os
+import numpy as np
+import pytest
+
+pytest.importorskip("face_recognition")
+from encoding_cache import CACHE_INDEX_FILE, load_known_faces  # noqa: E402
+
+
+class FakeEncoder:
+    """Encodes a file as its first byte repeated; files starting with b"x" are rejected."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, paths):
+        if paths:
+            self.calls.append(sorted(os.path.basename(p) for p in paths))
+        results = []
+        for path in paths:
+            with open(path, "rb") as f:
+                data = f.read()
+            results.append("no face found" if data.startswith(b"x") else np.full(128, data[0]))
+        return results
+
+
+def _write(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+
+
+@pytest.fixture
+def faces(tmp_path):
+    known = tmp_path / "known_faces"
+    _write(known / "alice.jpg", b"\x01")
+    _write(known / "bob" / "1.jpg", b"\x02")
+    _write(known / "bob" / "2.png", b"\x03")
+    return known
+
+
+def test_unchanged_gallery_is_not_re_encoded(faces):
+    encoder = FakeEncoder()
+    matrix, names = load_known_faces(str(faces), encoder=encoder)
+    assert names == ["alice", "bob", "bob"]
+    assert matrix[:, 0].tolist() == [1, 2, 3]
+
+    again, again_names = load_known_faces(str(faces), encoder=encoder)
+    assert encoder.calls == [["1.jpg", "2.png", "alice.jpg"]]
+    assert again_names == names
+    assert np.array_equal(again, matrix)
+
+
+def test_only_changed_files_are_re_encoded(faces):
+    encoder = FakeEncoder()
+    load_known_faces(str(faces), encoder=encoder)
+
+    _write(faces / "bob" / "1.jpg", b"\x07")
+    _write(faces / "carol.jpg", b"\x04")
+    matrix, names = load_known_faces(str(faces), encoder=encoder)
+    assert encoder.calls[1:] == [["1.jpg", "carol.jpg"]]
+    assert dict(zip(matrix[:, 0].tolist(), names)) == {1: "alice", 7: "bob", 3: "bob", 4: "carol"}
+
+
+def test_touched_file_with_the_same_bytes_is_not_re_encoded(faces):
+    encoder = FakeEncoder()
+    load_known_faces(str(faces), encoder=encoder)
+    stat = os.stat(faces / "alice.jpg")
+    os.utime(faces / "alice.jpg", ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    matrix, names = load_known_faces(str(faces), encoder=encoder)
+    assert len(encoder.calls) == 1
+    assert names == ["alice", "bob", "bob"]
+
+
+def test_deleted_files_are_dropped(faces):
+    encoder = FakeEncoder()
+    load_known_faces(str(faces), encoder=encoder)
+    os.remove(faces / "bob" / "1.jpg")
+    matrix, names = load_known_faces(str(faces), encoder=encoder)
+    assert len(encoder.calls) == 1
+    assert names == ["alice", "bob"]
+    assert matrix[:, 0].tolist() == [1, 3]
+
+
+def test_rejected_photos_are_remembered(faces):
+    encoder = FakeEncoder()
+    _write(faces / "dave.jpg", b"x")
+    matrix, names = load_known_faces(str(faces), encoder=encoder)
+    assert "dave" not in names
+    load_known_faces(str(faces), encoder=encoder)
+    assert len(encoder.calls) == 1
+
+    # A replacement photo is tried again
+    _write(faces / "dave.jpg", b"\x05")
+    matrix, names = load_known_faces(str(faces), encoder=encoder)
+    assert encoder.calls[1:] == [["dave.jpg"]]
+    assert names[-1] == "dave"
+
+
+def test_corrupt_index_rebuilds_the_cache(faces, tmp_path):
+    encoder = FakeEncoder()
+    cache_dir = tmp_path / "cache"
+    load_known_faces(str(faces), cache_dir=str(cache_dir), encoder=encoder)
+    (cache_dir / CACHE_INDEX_FILE).write_text("{not json")
+    matrix, names = load_known_faces(str(faces), cache_dir=str(cache_dir), encoder=encoder)
+    assert len(encoder.calls) == 2
+    assert names == ["alice", "bob", "bob"]
+    assert not any(name.startswith(".") for name in os.listdir(faces))
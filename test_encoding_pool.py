@@ -0,0 +1,53 @@
+import os
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+import pytest
+
+pytest.importorskip("face_recognition")
+from encoding_pool import EncodingPool  # noqa: E402
+
+
+def fake_encode(frame):
+    """One "face" per frame whose encoding is the frame's first pixel value."""
+    value = int(frame[0, 0, 0])
+    if value == 254:
+        raise ValueError("bad frame")
+    if value == 255:
+        os._exit(1)  # the worker dies mid-task, as a dlib crash would
+    height, width = frame.shape[:2]
+    return [(0, width, height, 0)], [np.full(128, value, dtype=np.float64)]
+
+
+def _frame(value, size=8):
+    return np.full((size, size, 3), value, dtype=np.uint8)
+
+
+def test_map_returns_results_in_input_order():
+    with EncodingPool(processes=2, slots=2, encode_frame=fake_encode) as pool:
+        # More frames than slots, and growing sizes, so slots are reused and regrown
+        frames = [_frame(i, size=8 + i) for i in range(10)]
+        results = list(pool.map(frames))
+    assert [encodings[0][0] for _, encodings in results] == list(range(10))
+    assert [locations[0][1] for locations, _ in results] == [8 + i for i in range(10)]
+
+
+def test_encode_error_fails_only_that_frame():
+    with EncodingPool(processes=1, slots=2, encode_frame=fake_encode) as pool:
+        with pytest.raises(RuntimeError, match="bad frame"):
+            pool.encode(_frame(254))
+        assert pool.encode(_frame(3))[1][0][0] == 3
+
+
+def test_dead_worker_breaks_the_pool():
+    pool = EncodingPool(processes=2, slots=4, encode_frame=fake_encode, poll_interval=0.05)
+    try:
+        assert pool.encode(_frame(1))[1][0][0] == 1
+        future = pool.submit(_frame(255))
+        with pytest.raises(BrokenProcessPool):
+            future.result(timeout=10)
+        with pytest.raises(BrokenProcessPool):
+            pool.submit(_frame(2))
+        # Every slot came back, so submit() cannot hang on a lost one
+        assert pool._free_slots.qsize() == pool.slots
+    finally:
+        pool.close()
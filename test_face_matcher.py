@@ -0,0 +1,122 @@
+import numpy as np
+import pytest
+from face_matcher import FaceMatcher, IVFMatcher, UNKNOWN_NAME, make_matcher, measure_recall
+
+
+def _gallery(count, seed=0):
+    rng = np.random.default_rng(seed)
+    encodings = rng.normal(scale=0.1, size=(count, 128))
+    return encodings, [f"person{i}" for i in range(count)]
+
+
+def test_empty_gallery_matches_nobody():
+    matcher = FaceMatcher(np.empty((0, 128)), [])
+    best, distances, margins = matcher.match(np.zeros((2, 128)))
+    assert best.tolist() == [-1, -1]
+    assert np.isinf(distances).all() and np.isinf(margins).all()
+    assert matcher.identify(np.zeros((2, 128))) == [UNKNOWN_NAME, UNKNOWN_NAME]
+    assert matcher.identify(np.empty((0, 128))) == []
+
+
+def test_identify_is_the_exact_nearest_neighbour():
+    encodings, names = _gallery(200)
+    matcher = FaceMatcher(encodings, names, tolerance=0.5)
+    queries = encodings[[3, 50, 199]] + 0.001
+    assert matcher.identify(queries) == ["person3", "person50", "person199"]
+
+    # Brute force agrees on random queries
+    rng = np.random.default_rng(1)
+    queries = rng.normal(scale=0.1, size=(20, 128))
+    expected = np.linalg.norm(queries[:, None] - encodings[None], axis=2).argmin(axis=1)
+    assert matcher.match(queries)[0].tolist() == expected.tolist()
+
+
+def test_single_encoding_gallery_has_no_runner_up():
+    matcher = FaceMatcher(np.zeros((1, 128)), ["alice"])
+    best, distances, margins = matcher.match(np.zeros(128))
+    assert best.tolist() == [0]
+    assert distances[0] == pytest.approx(0.0)
+    assert np.isinf(margins[0])
+
+
+def test_distances_above_tolerance_are_unknown():
+    matcher = FaceMatcher(np.zeros((1, 128)), ["alice"], tolerance=0.5)
+    far = np.full(128, 0.6 / np.sqrt(128))
+    assert matcher.identify(far) == [UNKNOWN_NAME]
+
+
+def test_add_and_remove():
+    encodings, names = _gallery(10)
+    matcher = FaceMatcher(encodings, names)
+    newcomer = np.full(128, 0.3)
+    assert matcher.identify(newcomer) == [UNKNOWN_NAME]
+
+    matcher.add(newcomer, "carol")
+    matcher.add(newcomer + 0.001, "carol")
+    assert len(matcher) == 12
+    assert matcher.identify(newcomer) == ["carol"]
+
+    assert matcher.remove("carol") == 2
+    assert matcher.remove("carol") == 0
+    assert len(matcher) == 10
+    assert matcher.identify(newcomer) == [UNKNOWN_NAME]
+    assert matcher.identify(encodings[4]) == ["person4"]
+
+
+def test_make_matcher_rejects_unknown_kinds():
+    encodings, names = _gallery(3)
+    assert isinstance(make_matcher("exact", encodings, names), FaceMatcher)
+    with pytest.raises(ValueError):
+        make_matcher("annoy", encodings, names)
+
+
+def _clustered(people, per_person=3, seed=0):
+    # Several noisy shots per person, the way an enrolled gallery looks
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(scale=0.1, size=(people, 128))
+    encodings = np.repeat(centres, per_person, axis=0)
+    encodings += rng.normal(scale=0.01, size=encodings.shape)
+    names = [f"person{i}" for i in range(people) for _ in range(per_person)]
+    return centres, encodings, names
+
+
+def test_ivf_empty_gallery():
+    matcher = IVFMatcher(np.empty((0, 128)), [])
+    assert len(matcher) == 0
+    assert matcher.identify(np.zeros((1, 128))) == [UNKNOWN_NAME]
+    matcher.add(np.zeros(128), "alice")
+    assert matcher.identify(np.zeros(128)) == ["alice"]
+
+
+def test_ivf_recall_against_exact():
+    centres, encodings, names = _clustered(500)
+    exact = FaceMatcher(encodings, names)
+    ivf = IVFMatcher(encodings, names, n_probe=8)
+    queries = centres + np.random.default_rng(1).normal(scale=0.01, size=centres.shape)
+    recall = measure_recall(ivf, exact, queries)
+    assert recall["queries"] == 500
+    assert recall["recall_within_tolerance"] >= 0.95
+
+    # Probing every list is an exhaustive search
+    full = IVFMatcher(encodings, names, n_probe=len(encodings))
+    assert measure_recall(full, exact, queries)["recall"] == 1.0
+
+
+def test_ivf_add_remove_and_rebuild():
+    centres, encodings, names = _clustered(50)
+    matcher = IVFMatcher(encodings, names, n_lists=5, n_probe=5)
+    newcomer = np.full(128, 0.3)
+    matcher.add(newcomer, "carol")
+    assert len(matcher) == 151
+    assert matcher.identify(newcomer) == ["carol"]
+
+    assert matcher.remove("person7") == 3
+    assert matcher.remove("person7") == 0
+    assert len(matcher) == 148
+    assert matcher.identify(centres[7]) != ["person7"]
+    assert matcher.identify(centres[8]) == ["person8"]
+
+    matcher.rebuild()
+    assert len(matcher) == len(matcher.names) == 148
+    assert None not in matcher.names
+    assert matcher.identify([newcomer, centres[8]]) == ["carol", "person8"]
@@ -0,0 +1,151 @@
+import sqlite3
+import pytest
+from merkle_anchor import (MerkleAnchor, build_levels, merkle_proof, merkle_root,
+                           verify_proof, window_label)
+
+T0 = 1_760_000_100  # a multiple of 300, the start of a window
+
+
+class FakeChain:
+    """Stands in for blockchain_client.anchor_root; fails while `down` is set."""
+
+    def __init__(self):
+        self.roots = []
+        self.down = False
+
+    def __call__(self, label, root):
+        if self.down:
+            raise ConnectionError("node unreachable")
+        self.roots.append((label, root))
+        return {"transactionHash": bytes([len(self.roots)]) * 32, "gasUsed": 30000}
+
+
+@pytest.fixture
+def chain():
+    return FakeChain()
+
+
+def _anchor(tmp_path, chain):
+    return MerkleAnchor("0xcontract", secret_key="test", window_seconds=300,
+                        store_path=str(tmp_path / "anchors.db"), submit=chain)
+
+
+@pytest.mark.parametrize("count", [1, 2, 3, 7, 8, 33])
+def test_every_leaf_has_a_valid_proof(count):
+    hashes = [f"{i:064x}" for i in range(count)]
+    levels = build_levels(hashes)
+    root = merkle_root(hashes)
+    for index, record_hash in enumerate(hashes):
+        assert verify_proof(record_hash, merkle_proof(levels, index), root)
+    assert not verify_proof(f"{count:064x}", merkle_proof(levels, 0), root)
+
+
+def test_empty_tree_is_rejected():
+    with pytest.raises(ValueError):
+        merkle_root([])
+
+
+def test_one_root_per_closed_window(tmp_path, chain):
+    anchor = _anchor(tmp_path, chain)
+    for i, name in enumerate(("alice", "bob", "carol")):
+        anchor.add(name, T0 + i)
+    anchor.add("dave", T0 + 300)
+    assert anchor.pending() == 4
+
+    anchored = anchor.flush(now=T0 + 310)
+    assert [w for w, _, _ in anchored] == [T0]
+    assert chain.roots == [(window_label(T0, 3), anchored[0][1])]
+    assert anchor.pending() == 1
+
+    proof = anchor.proof_for("bob", T0 + 1)
+    assert verify_proof(proof["leaf"], proof["proof"], proof["root"])
+    assert proof["tx_hash"] == (bytes([1]) * 32).hex()
+    assert anchor.proof_for("dave", T0 + 300) is None
+    anchor.close()
+
+
+def test_duplicates_are_not_anchored_twice(tmp_path, chain):
+    anchor = _anchor(tmp_path, chain)
+    first = anchor.add("alice", T0)
+    assert anchor.add("alice", T0) == first
+    assert anchor.pending() == 1
+    anchor.flush(force=True)
+
+    # Already anchored: neither buffered again nor given a second leaf
+    anchor.add("alice", T0)
+    assert anchor.pending() == 0
+    assert anchor.flush(force=True) == []
+    assert len(chain.roots) == 1
+    anchor.close()
+
+
+def test_late_event_gets_its_own_anchor(tmp_path, chain):
+    anchor = _anchor(tmp_path, chain)
+    anchor.add("alice", T0)
+    anchor.flush(force=True)
+    anchor.add("bob", T0 + 5)
+    anchor.flush(force=True)
+    assert [label for label, _ in chain.roots] == [window_label(T0, 1)] * 2
+    for name, ts in (("alice", T0), ("bob", T0 + 5)):
+        proof = anchor.proof_for(name, ts)
+        assert verify_proof(proof["leaf"], proof["proof"], proof["root"])
+    anchor.close()
+
+
+def test_failed_submit_keeps_the_window_buffered(tmp_path, chain):
+    anchor = _anchor(tmp_path, chain)
+    anchor.add("alice", T0)
+    anchor.add("bob", T0 + 300)
+    chain.down = True
+    with pytest.raises(ConnectionError):
+        anchor.flush(force=True)
+    assert anchor.pending() == 2
+
+    chain.down = False
+    assert len(anchor.flush(force=True)) == 2
+    assert anchor.pending() == 0
+    anchor.close()
+
+
+def test_proofs_survive_a_restart(tmp_path, chain):
+    anchor = _anchor(tmp_path, chain)
+    for i in range(5):
+        anchor.add(f"student{i}", T0 + i)
+    anchor.flush(force=True)
+    before = anchor.proof_for("student3", T0 + 3)
+    anchor.close()
+
+    restarted = _anchor(tmp_path, chain)
+    after = restarted.proof_for("student3", T0 + 3)
+    assert after == before
+    assert verify_proof(after["leaf"], after["proof"], after["root"])
+    restarted.add("student3", T0 + 3)
+    assert restarted.pending() == 0
+    restarted.close()
+
+
+def test_v1_store_is_migrated(tmp_path, chain):
+    path = str(tmp_path / "anchors.db")
+    hashes = [f"{i:064x}" for i in range(3)]
+    root = merkle_root(hashes)
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE anchors (window_start INTEGER PRIMARY KEY, root TEXT NOT NULL,
+            leaf_count INTEGER NOT NULL, tx_hash TEXT, gas_used INTEGER,
+            anchored_at REAL NOT NULL);
+        CREATE TABLE anchor_leaves (record_hash TEXT PRIMARY KEY,
+            window_start INTEGER NOT NULL, position INTEGER NOT NULL,
+            name TEXT NOT NULL, timestamp INTEGER NOT NULL);
+        CREATE INDEX ix_anchor_leaves_window ON anchor_leaves (window_start, position);
+    """)
+    conn.execute("INSERT INTO anchors VALUES (?, ?, 3, 'ab', 30000, 0)", (T0, root))
+    conn.executemany("INSERT INTO anchor_leaves VALUES (?, ?, ?, ?, ?)",
+                     [(h, T0, i, f"s{i}", T0 + i) for i, h in enumerate(hashes)])
+    conn.commit()
+    conn.close()
+
+    anchor = _anchor(tmp_path, chain)
+    proof = anchor.proof_for_hash(hashes[2])
+    assert proof["root"] == root and proof["tx_hash"] == "ab"
+    assert verify_proof(hashes[2], proof["proof"], root)
+    anchor.close()
@@ -0,0 +1,90 @@
+import hashlib
+import time
+import pytest
+from otp_service import OtpService, StubTransport
+
+
+@pytest.fixture
+def service(tmp_path):
+    service = OtpService(StubTransport(), path=str(tmp_path / "otp.db"), interval=60).start()
+    yield service
+    service.stop()
+
+
+def test_code_works_once(service):
+    code = service.request("alice", "+15550123")
+    assert service.verify("alice", code)
+    assert not service.verify("alice", code)
+
+
+def test_rerequest_after_verify_sends_a_usable_code(service):
+    # Logging in twice within one validity window must not lock the user out
+    first = service.request("alice", "+15550123")
+    assert service.verify("alice", first)
+    second = service.request("alice", "+15550123")
+    assert service.verify("alice", second)
+
+
+def test_rerequest_replaces_the_earlier_code(service):
+    first = service.request("alice", "+15550123")
+    second = service.request("alice", "+15550123")
+    if first != second:
+        assert not service.verify("alice", first)
+    assert service.verify("alice", second)
+
+
+def test_codes_are_per_user(service):
+    alice = service.request("alice", "+15550123")
+    bob = service.request("bob", "+15550124")
+    if alice != bob:
+        assert not service.verify("bob", alice)
+    assert service.verify("alice", alice)
+    assert service.verify("bob", bob)
+
+
+def test_expired_code_is_rejected(tmp_path):
+    service = OtpService(StubTransport(), path=str(tmp_path / "otp.db"), interval=0.05).start()
+    code = service.request("alice", "+15550123")
+    time.sleep(0.1)
+    assert not service.verify("alice", code)
+    service.stop()
+
+
+def test_codes_are_delivered(service):
+    code = service.request("alice", "+15550123")
+    service.stop()
+    assert ("+15550123", f"Your OTP is: {code}") in service.transport.sent
+
+
+def test_code_is_invalidated_after_too_many_wrong_guesses(service):
+    code = service.request("alice", "+15550123")
+    wrong = f"{(int(code) + 1) % 10 ** 6:06d}"
+    for _ in range(service.max_failures - 1):
+        assert not service.verify("alice", wrong)
+    assert service.verify("alice", code)  # still valid below the limit
+
+    code = service.request("alice", "+15550123")
+    for _ in range(service.max_failures):
+        assert not service.verify("alice", wrong)
+    assert not service.verify("alice", code)
+    # A new request resets the count
+    code = service.request("alice", "+15550123")
+    assert not service.verify("alice", wrong)
+    assert service.verify("alice", code)
+
+
+def test_codes_are_stored_as_hmac_under_the_server_secret(tmp_path):
+    path = str(tmp_path / "otp.db")
+    first = OtpService(StubTransport(), path=path, secret="server-secret")
+    code = first.request("alice", "+15550123")
+    stored = first._conn.execute("SELECT code_hash FROM otp_codes").fetchone()[0]
+    assert stored != hashlib.sha256(f"alice:{code}".encode()).hexdigest()
+    first.stop(timeout=0)
+
+    # The same secret (e.g. after a restart) accepts the code; another does not
+    other = OtpService(StubTransport(), path=path, secret="another-secret")
+    assert not other.verify("alice", code)
+    other.stop(timeout=0)
+    restarted = OtpService(StubTransport(), path=path, secret="server-secret")
+    assert restarted.verify("alice", code)
+    restarted.stop(timeout=0)
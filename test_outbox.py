@@ -0,0 +1,146 @@
+import threading
+from datetime import datetime
+import pytest
+from werkzeug.serving import make_server
+import attendance_api
+from attendance_client import AttendanceClient
+from outbox import Outbox, OutboxSyncer
+
+TIMESTAMP = int(datetime(2026, 10, 19, 9, 5).timestamp())
+
+
+def event(name, timestamp=TIMESTAMP, **fields):
+    return dict({"name": name, "timestamp": timestamp, "hash": f"hash-{name}-{timestamp}"},
+                **fields)
+
+
+@pytest.fixture
+def outbox(tmp_path):
+    outbox = Outbox(str(tmp_path / "outbox.db"))
+    yield outbox
+    outbox.close()
+
+
+class FakeClient:
+    """send() fails the names in `down` and rejects the names in `bad`."""
+
+    def __init__(self, down=(), bad=()):
+        self.down = set(down)
+        self.bad = set(bad)
+        self.batches = []
+
+    def send(self, batch):
+        self.batches.append(batch)
+        return ([p for p in batch if p["name"] in self.down],
+                [p for p in batch if p["name"] in self.bad])
+
+    def metrics(self):
+        return {"send_latency_avg_ms": None, "send_latency_p95_ms": None}
+
+
+@pytest.fixture
+def backend(tmp_path):
+    """The real attendance API on a local port; yields its /attendance URL."""
+    server = make_server("127.0.0.1", 0, attendance_api.create_app(str(tmp_path / "api.db")))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/attendance"
+    server.shutdown()
+
+
+def test_append_is_idempotent(outbox):
+    assert outbox.append(event("alice"))
+    assert not outbox.append(event("alice"))
+    assert outbox.append(event("alice", TIMESTAMP + 1))
+    assert outbox.pending_count() == 2
+
+
+def test_rows_past_max_attempts_become_dead_letters(outbox):
+    outbox.append(event("alice"))
+    outbox.append(event("bob"))
+    ids = [row_id for row_id, _ in outbox.pending()]
+    outbox.mark_failed(ids, max_attempts=2)
+    assert outbox.pending_count() == 2
+    outbox.mark_failed(ids[:1], max_attempts=2)
+    assert outbox.pending_count() == 1
+    assert outbox.dead_count() == 1
+    assert outbox.requeue_dead() == 1
+    assert outbox.pending_count() == 2 and outbox.dead_count() == 0
+
+
+def test_sync_acks_sent_and_dead_letters_rejected(outbox):
+    for name in ("alice", "bob", "carol"):
+        outbox.append(event(name))
+    syncer = OutboxSyncer(outbox, FakeClient(down={"bob"}, bad={"carol"}))
+    assert syncer.sync_once() == (1, 1)
+    assert [p["name"] for _, p in outbox.pending()] == ["bob"]
+    assert outbox.dead_count() == 1
+    assert syncer.dead == 1
+
+
+def test_drain_continues_past_a_batch_that_was_all_rejected(outbox):
+    for i in range(3):
+        outbox.append(event(f"bad{i}"))
+    for i in range(3):
+        outbox.append(event(f"good{i}"))
+    client = FakeClient(bad={f"bad{i}" for i in range(3)})
+    syncer = OutboxSyncer(outbox, client, batch_size=3)
+    assert syncer.drain() == 3
+    assert outbox.pending_count() == 0
+    assert outbox.dead_count() == 3
+    assert len(client.batches) == 2
+
+
+def test_drain_stops_when_the_backend_is_down(outbox):
+    for name in ("alice", "bob"):
+        outbox.append(event(name))
+    syncer = OutboxSyncer(outbox, FakeClient(down={"alice", "bob"}), batch_size=1)
+    assert syncer.drain() == 0
+    assert outbox.pending_count() == 2
+
+
+def test_client_isolates_the_invalid_event_of_a_bulk_batch(outbox, backend):
+    client = AttendanceClient(backend, max_retries=0)
+    good = [event("alice"), event("bob")]
+    bad = event("mallory", True)  # bool timestamps are rejected with 400
+    failed, invalid = client.send(good[:1] + [bad] + good[1:])
+    assert failed == []
+    assert invalid == [bad]
+    assert client.sent == 2
+
+    for payload in good + [bad]:
+        outbox.append(dict(payload, timestamp=payload["timestamp"] + 3600))
+    syncer = OutboxSyncer(outbox, client)
+    assert syncer.drain() == 2
+    assert outbox.dead_count() == 1
+    client.close()
+
+
+def test_client_retries_transient_errors():
+    attempts = []
+
+    class Response:
+        def __init__(self, status_code):
+            self.status_code = status_code
+            self.text = ""
+
+        def json(self):
+            return {"message": "ok"}
+
+    client = AttendanceClient("http://backend.invalid/attendance", max_retries=3, backoff=0.001)
+
+    def post(url, json, timeout):
+        attempts.append(url)
+        return Response(503 if len(attempts) < 3 else 201)
+
+    client.session.post = post
+    assert client.send([event("alice")]) == ([], [])
+    assert len(attempts) == 3
+    assert client.retries == 2
+
+    attempts.clear()
+    client.max_retries = 1
+    client.session.post = lambda url, json, timeout: attempts.append(url) or Response(503)
+    assert client.send([event("bob")]) == ([event("bob")], [])
+    assert len(attempts) == 2
+    client.close()
@@ -0,0 +1,77 @@
+import pytest
+from password_hasher import HasherBusy, PasswordHasher, hash_rounds
+
+
+@pytest.fixture
+def clock():
+    return [0.0]
+
+
+@pytest.fixture
+def hasher(clock):
+    # Cost 4 is bcrypt's minimum, enough to exercise the pool quickly
+    with PasswordHasher(rounds=4, processes=1, cache_ttl=60, clock=lambda: clock[0]) as hasher:
+        yield hasher
+
+
+def test_hash_and_verify(hasher):
+    hashed = hasher.hash("s3cret")
+    assert hash_rounds(hashed) == 4
+    assert hasher.verify("s3cret", hashed)
+    assert hasher.verify(b"s3cret", hashed.decode())
+    assert not hasher.verify("wrong", hashed)
+
+
+def test_verified_passwords_are_cached_until_the_ttl(hasher, clock):
+    hashed = hasher.hash("s3cret")
+    assert hasher.verify("s3cret", hashed)
+    assert hasher.verify("s3cret", hashed)
+    assert hasher.cache_hits == 1
+
+    # Failures are never cached, and a wrong password never hits
+    assert not hasher.verify("wrong", hashed)
+    assert not hasher.verify("wrong", hashed)
+    assert hasher.cache_hits == 1
+
+    clock[0] = 61
+    assert hasher.verify("s3cret", hashed)
+    assert hasher.cache_hits == 1
+
+
+def test_changed_hash_does_not_match_the_cache(hasher):
+    old = hasher.hash("s3cret")
+    assert hasher.verify("s3cret", old)
+    new = hasher.hash("n3w")
+    assert not hasher.verify("s3cret", new)
+    assert hasher.cache_hits == 0
+
+
+def test_cache_size_is_bounded(clock):
+    with PasswordHasher(rounds=4, processes=1, cache_size=2, clock=lambda: clock[0]) as hasher:
+        hashes = [hasher.hash(f"pw{i}") for i in range(3)]
+        for i, hashed in enumerate(hashes):
+            assert hasher.verify(f"pw{i}", hashed)
+        assert hasher.verify("pw2", hashes[2])
+        assert hasher.verify("pw0", hashes[0])
+        assert hasher.cache_hits == 1
+
+
+def test_verify_and_update_rehashes_at_the_new_cost(hasher):
+    with PasswordHasher(rounds=5, processes=1) as old_hasher:
+        old = old_hasher.hash("s3cret")
+    assert hasher.verify_and_update("wrong", old) == (False, None)
+
+    ok, new = hasher.verify_and_update("s3cret", old)
+    assert ok and hash_rounds(new) == 4
+    assert hasher.rehashed == 1
+    assert hasher.verify_and_update("s3cret", new) == (True, None)
+
+
+def test_full_queue_raises_busy():
+    busy = PasswordHasher(rounds=4, processes=1, max_pending=1, timeout=0.05)
+    busy._slots.acquire()  # one check already queued
+    with pytest.raises(HasherBusy):
+        busy.hash("s3cret")
+    busy._slots.release()
+    assert busy.verify("s3cret", busy.hash("s3cret"))
+    busy.close()
@@ -0,0 +1,108 @@
+import threading
+import numpy as np
+import pytest
+
+pytest.importorskip("face_recognition")
+from bounded_queue import BLOCK  # noqa: E402
+from recognition_pipeline import RecognitionPipeline  # noqa: E402
+
+
+class FakeCapture:
+    """Delivers `count` small frames, then reports the end of the stream."""
+
+    def __init__(self, count):
+        self.count = count
+        self.read_count = 0
+
+    def read(self):
+        if self.read_count >= self.count:
+            return False, None
+        self.read_count += 1
+        return True, np.full((8, 8, 3), self.read_count % 256, np.uint8)
+
+
+class FakeMatcher:
+    def identify(self, encodings):
+        return [f"student{int(e[0])}" for e in encodings]
+
+
+def encode_one_face(frame):
+    return [(0, 8, 8, 0)], [np.full(128, float(frame[0, 0, 0]))]
+
+
+def make_pipeline(capture, dispatch, encode_frame=encode_one_face, **options):
+    # BLOCK on every queue so no frame is dropped by policy
+    policies = {"frames": BLOCK, "results": BLOCK}
+    return RecognitionPipeline(capture, FakeMatcher(), dispatch, workers=3,
+                               encode_frame=encode_frame, policies=policies, **options)
+
+
+def drain_results(pipeline):
+    # The display loop normally consumes results; keep them from filling up
+    def loop():
+        while pipeline.running or pipeline.get_result(0.1) is not None:
+            pipeline.get_result(0.1)
+    thread = threading.Thread(target=loop, daemon=True)
+    thread.start()
+    return thread
+
+
+def test_every_captured_frame_is_processed_before_shutdown():
+    dispatched = []
+    pipeline = make_pipeline(FakeCapture(200), dispatched.append, queue_size=1000).start()
+    pipeline.join(timeout=10)
+    assert pipeline.capture_error is not None
+    assert pipeline.frames_captured == 200
+    assert pipeline.frames_processed == 200
+    assert len(dispatched) == 200
+    assert pipeline.error is None
+
+
+def test_encode_error_stops_the_pipeline_and_is_reraised():
+    def encode(frame):
+        if frame[0, 0, 0] == 50:
+            raise ValueError("bad frame")
+        return encode_one_face(frame)
+
+    pipeline = make_pipeline(FakeCapture(10_000), lambda name: None, encode_frame=encode).start()
+    drain_results(pipeline)
+    with pytest.raises(ValueError, match="bad frame"):
+        pipeline.join(timeout=10)
+    assert not pipeline.running
+    assert all(not thread.is_alive() for thread in pipeline._threads)
+
+
+def test_dispatch_error_does_not_block_the_matcher():
+    def dispatch(name):
+        raise RuntimeError("backend down")
+
+    # A one-slot BLOCK dispatch queue fills at once when nobody drains it
+    pipeline = make_pipeline(FakeCapture(10_000), dispatch, dispatch_queue_size=1).start()
+    drain_results(pipeline)
+    with pytest.raises(RuntimeError, match="backend down"):
+        pipeline.join(timeout=10)
+    assert all(not thread.is_alive() for thread in pipeline._threads)
+
+
+def test_names_recognised_before_a_failure_are_still_dispatched():
+    dispatched = []
+
+    def encode(frame):
+        if frame[0, 0, 0] == 20:
+            raise ValueError("bad frame")
+        return encode_one_face(frame)
+
+    pipeline = make_pipeline(FakeCapture(10_000), dispatched.append, encode_frame=encode).start()
+    drain_results(pipeline)
+    with pytest.raises(ValueError):
+        pipeline.join(timeout=10)
+    assert pipeline.frames_processed == len(dispatched)
+
+
+def test_stop_drains_queued_frames():
+    dispatched = []
+    pipeline = make_pipeline(FakeCapture(10_000), dispatched.append).start()
+    drain_results(pipeline)
+    pipeline.stop(timeout=10)
+    assert pipeline.frames_processed == pipeline.frames_captured
+    assert len(dispatched) == pipeline.frames_processed
@@ -0,0 +1,133 @@
+import sqlite3
+import pytest
+import attendance_store
+import blockchain_client
+import merkle_anchor
+import reconcile
+
+CONTRACT = "0xC0ffee"
+KEY = "test-key"
+T0 = 1_760_000_000
+
+
+@pytest.fixture
+def chain(monkeypatch):
+    """Chain records as (name, record_hash, timestamp), served the way iter_records pages them."""
+    records = []
+
+    def iter_records(contract_address, page_size=100, start=0):
+        assert contract_address == CONTRACT
+        for idx in range(start, len(records)):
+            yield idx, records[idx]
+
+    monkeypatch.setattr(blockchain_client, "iter_records", iter_records)
+    monkeypatch.setattr(blockchain_client, "_record_fields",
+                        lambda: ["name", "recordHash", "timestamp"])
+    return records
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = attendance_store.connect(str(tmp_path / "attendance.db"))
+    yield conn
+    conn.close()
+
+
+def _event(name, timestamp, key=KEY):
+    return {"name": name, "timestamp": timestamp,
+            "hash": attendance_store.compute_attendance_hash(name, timestamp, key)}
+
+
+def _kinds(report):
+    return sorted((issue["kind"], issue["ref"]) for issue in report["issues"])
+
+
+def test_matching_db_and_chain_have_no_issues(conn, chain):
+    events = [_event("alice", T0), _event("bob", T0 + 60)]
+    attendance_store.insert_events(conn, events)
+    chain.extend((e["name"], e["hash"], e["timestamp"]) for e in events)
+    report = reconcile.reconcile(conn, CONTRACT, KEY)
+    assert report["chain_records_added"] == 2
+    assert report["attendance_rows_checked"] == 2
+    assert report["issues"] == []
+
+
+def test_missing_records_are_reported_and_resolved_later(conn, chain):
+    alice, bob = _event("alice", T0), _event("bob", T0 + 60)
+    attendance_store.insert_events(conn, [alice])
+    chain.append((bob["name"], bob["hash"], bob["timestamp"]))
+    report = reconcile.reconcile(conn, CONTRACT, KEY)
+    assert _kinds(report) == [("missing_in_db", f"{CONTRACT}:0"), ("missing_on_chain", "1")]
+
+    # Both sides catch up: the next run only looks at the new rows and records
+    attendance_store.insert_events(conn, [bob])
+    chain.append((alice["name"], alice["hash"], alice["timestamp"]))
+    report = reconcile.reconcile(conn, CONTRACT, KEY)
+    assert report["chain_records_added"] == 1
+    assert report["attendance_rows_checked"] == 1
+    assert report["resolved"] == 2
+    assert report["issues"] == []
+
+
+def test_hash_mismatches(conn, chain):
+    tampered = dict(_event("alice", T0), name="mallory")
+    other_key = _event("bob", T0 + 60, key="another-key")
+    attendance_store.insert_events(conn, [tampered, other_key])
+    chain.append(("alice", tampered["hash"], T0))
+    chain.append(("bob", other_key["hash"], T0 + 60))
+    report = reconcile.reconcile(conn, CONTRACT, KEY)
+    assert _kinds(report) == [("hash_mismatch", f"{CONTRACT}:0"),
+                              ("hash_mismatch", "1"), ("hash_mismatch", "2")]
+
+    # Without a key only the name disagreement with the chain remains
+    conn.execute("DELETE FROM reconcile_issues")
+    conn.execute("DELETE FROM reconcile_checkpoints")
+    report = reconcile.reconcile(conn, CONTRACT, secret_key=None)
+    assert _kinds(report) == [("hash_mismatch", f"{CONTRACT}:0")]
+
+
+def test_anchored_rows_count_as_committed(conn, chain, tmp_path):
+    alice = _event("alice", T0)
+    attendance_store.insert_events(conn, [alice])
+    report = reconcile.reconcile(conn, CONTRACT, KEY)
+    assert _kinds(report) == [("missing_on_chain", "1")]
+
+    anchors_path = str(tmp_path / "anchors.db")
+    assert not reconcile.attach_anchors(conn, anchors_path)
+    anchor = merkle_anchor.MerkleAnchor(
+        CONTRACT, secret_key=KEY, store_path=anchors_path,
+        submit=lambda label, root: {"transactionHash": "0xab", "gasUsed": 1})
+    anchor.add("alice", T0)
+    anchor.flush(force=True)
+    anchor.close()
+    # The root itself is on chain under a merkle: label, which is not a missing row
+    chain.append((merkle_anchor.window_label(anchor.window_for(T0), 1),
+                  merkle_anchor.merkle_root([alice["hash"]]), T0))
+
+    assert reconcile.attach_anchors(conn, anchors_path)
+    report = reconcile.reconcile(conn, CONTRACT, KEY)
+    assert report["resolved"] == 1
+    assert report["issues"] == []
+
+
+def test_interrupted_sync_resumes_from_the_checkpoint(conn, chain, monkeypatch):
+    events = [_event(f"s{i}", T0 + i) for i in range(5)]
+    attendance_store.insert_events(conn, events)
+    chain.extend((e["name"], e["hash"], e["timestamp"]) for e in events)
+    reconcile.ensure_schema(conn)
+
+    def flaky(contract_address, page_size=100, start=0):
+        for idx in range(start, 3):
+            yield idx, chain[idx]
+        raise ConnectionError("node went away")
+
+    with monkeypatch.context() as m:
+        m.setattr(blockchain_client, "iter_records", flaky)
+        with pytest.raises(ConnectionError):
+            reconcile.sync_chain(conn, CONTRACT, page_size=2)
+    assert reconcile.checkpoint(conn, CONTRACT)[0] == 2
+
+    report = reconcile.reconcile(conn, CONTRACT, KEY, page_size=2)
+    assert report["chain_records_added"] == 3
+    assert conn.execute("SELECT COUNT(*) FROM chain_records").fetchone()[0] == 5
+    assert report["issues"] == []
@@ -0,0 +1,187 @@
+import threading
+import time
+import pytest
+from eth_account import Account
+from web3 import Web3
+from web3.exceptions import TransactionNotFound
+from tx_submitter import TxSubmitter
+
+KEY = "0x" + "11" * 32
+ADDRESS = Account.from_key(KEY).address
+TRANSFER = {"to": "0x" + "22" * 20, "value": 1, "gas": 21000}
+
+
+class FakeEth:
+    """
+    A node that mines nothing on its own: tests call mine() on the hashes
+    they want confirmed. Every signed transaction is kept in `signed`.
+    """
+    chain_id = 1337
+    gas_price = 1000
+
+    def __init__(self, nonce=0):
+        self.account = self
+        self.nonce = nonce
+        self.nonce_lookups = 0
+        self.signed = []
+        self.hashes = []
+        self.receipts = {}
+        self.reject = None
+
+    def from_key(self, key):
+        return Account.from_key(key)
+
+    def sign_transaction(self, tx, private_key):
+        self.signed.append(dict(tx))
+        return Account.sign_transaction(tx, private_key)
+
+    def get_transaction_count(self, address, block_identifier):
+        self.nonce_lookups += 1
+        return self.nonce
+
+    def send_raw_transaction(self, raw):
+        if self.reject is not None:
+            raise self.reject
+        tx_hash = bytes(Web3.keccak(raw))
+        self.hashes.append(tx_hash)
+        return tx_hash
+
+    def get_transaction_receipt(self, tx_hash):
+        if tx_hash not in self.receipts:
+            raise TransactionNotFound(tx_hash.hex())
+        return self.receipts[tx_hash]
+
+    def mine(self, tx_hash):
+        self.receipts[tx_hash] = {"transactionHash": tx_hash, "status": 1}
+
+
+class FakeWeb3:
+    def __init__(self, nonce=0):
+        self.eth = FakeEth(nonce)
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def w3():
+    return FakeWeb3(nonce=7)
+
+
+def test_nonces_are_seeded_once_and_counted_locally(w3):
+    submitter = TxSubmitter(w3, KEY, poll_interval=0.01).start()
+    futures = [submitter.submit(TRANSFER) for _ in range(3)]
+    assert [tx["nonce"] for tx in w3.eth.signed] == [7, 8, 9]
+    assert w3.eth.nonce_lookups == 1
+    assert all(tx["chainId"] == 1337 and tx["gasPrice"] == 1000 for tx in w3.eth.signed)
+    assert submitter.in_flight() == 3
+
+    for tx_hash in w3.eth.hashes:
+        w3.eth.mine(tx_hash)
+    assert [f.result(5)["transactionHash"] for f in futures] == w3.eth.hashes
+    submitter.close(timeout=5)
+    assert submitter.metrics()["confirmed"] == 3
+    assert submitter.in_flight() == 0
+
+
+def test_failed_send_resyncs_the_nonce(w3):
+    submitter = TxSubmitter(w3, KEY, poll_interval=0.01)
+    w3.eth.reject = ValueError("insufficient funds")
+    future = submitter.submit(TRANSFER)
+    with pytest.raises(ValueError):
+        future.result(0)
+    assert submitter.in_flight() == 0
+
+    # The node's count may have moved on meanwhile; it is asked again
+    w3.eth.reject = None
+    w3.eth.nonce = 9
+    submitter.submit(TRANSFER)
+    assert w3.eth.nonce_lookups == 2
+    assert w3.eth.signed[-1]["nonce"] == 9
+
+
+def test_stuck_transaction_is_replaced_with_a_higher_gas_price(w3):
+    submitter = TxSubmitter(w3, KEY, poll_interval=0.01, replace_after=0.05).start()
+    future = submitter.submit(TRANSFER)
+    _wait_for(lambda: len(w3.eth.hashes) >= 2)
+    first, second = w3.eth.signed[:2]
+    assert second["nonce"] == first["nonce"] == 7
+    assert second["gasPrice"] > first["gasPrice"] * 1.1
+
+    # Either hash may be the one that gets mined; the original is found too
+    w3.eth.mine(w3.eth.hashes[0])
+    assert future.result(5)["transactionHash"] == w3.eth.hashes[0]
+    submitter.close(timeout=5)
+    assert submitter.metrics()["replaced"] >= 1
+    assert submitter.metrics()["failed"] == 0
+
+
+def test_given_up_transaction_is_cancelled(w3):
+    submitter = TxSubmitter(w3, KEY, poll_interval=0.01, replace_after=0.2,
+                            max_replacements=1).start()
+    future = submitter.submit(TRANSFER)
+    with pytest.raises(TimeoutError):
+        future.result(5)
+    _wait_for(lambda: submitter.metrics()["cancelled"] == 1)
+
+    original, replacement, cancel = w3.eth.signed
+    assert cancel["nonce"] == 7
+    assert cancel["to"] == ADDRESS and cancel["value"] == 0
+    assert cancel["gasPrice"] > replacement["gasPrice"]
+    assert submitter.in_flight() == 1
+
+    # Once the cancel is mined the nonce is used up and counting goes on
+    w3.eth.mine(w3.eth.hashes[-1])
+    _wait_for(lambda: submitter.in_flight() == 0)
+    submitter.submit(TRANSFER)
+    assert w3.eth.signed[-1]["nonce"] == 8
+    assert w3.eth.nonce_lookups == 1
+    submitter.close(timeout=0)
+
+
+def test_unsent_cancel_resyncs_the_nonce(w3):
+    submitter = TxSubmitter(w3, KEY, poll_interval=0.01, replace_after=0.02,
+                            max_replacements=0).start()
+    future = submitter.submit(TRANSFER)
+    w3.eth.reject = ValueError("node unreachable")
+    with pytest.raises(TimeoutError):
+        future.result(5)
+    _wait_for(lambda: submitter._nonce is None)
+    assert submitter.metrics()["cancelled"] == 0
+    assert submitter.in_flight() == 0
+
+    w3.eth.reject = None
+    w3.eth.nonce = 8
+    submitter.submit(TRANSFER)
+    assert w3.eth.nonce_lookups == 2
+    assert w3.eth.signed[-1]["nonce"] == 8
+    submitter.close(timeout=0)
+
+
+def test_concurrent_submitters_on_eth_tester():
+    pytest.importorskip("eth_tester")
+    from web3 import EthereumTesterProvider
+
+    w3 = Web3(EthereumTesterProvider())
+    account = w3.eth.account.create()
+    w3.eth.wait_for_transaction_receipt(w3.eth.send_transaction(
+        {"from": w3.eth.accounts[0], "to": account.address, "value": 10**21}))
+    tx = dict(TRANSFER, to=w3.eth.accounts[0])
+
+    with TxSubmitter(w3, account.key, poll_interval=0.01) as submitter:
+        futures = []
+        threads = [threading.Thread(target=lambda: futures.extend(
+            submitter.submit(tx) for _ in range(5))) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        receipts = [future.result(10) for future in futures]
+    nonces = sorted(w3.eth.get_transaction(r["transactionHash"])["nonce"] for r in receipts)
+    assert nonces == list(range(20))
+    assert all(r["status"] == 1 for r in receipts)
+    assert submitter.metrics()["confirmed"] == 20
@@ -0,0 +1,239 @@
+"""
+Non-blocking transaction submitter with local nonce management.
+
+    submitter = TxSubmitter(w3, private_key).start()
+    future = submitter.submit({"to": address, "data": calldata, "gas": 300000})
+    ...
+    receipt = future.result()
+
+Nonces are handed out from a local counter (seeded once from the node's
+pending count), so callers sharing a key never race on
+get_transaction_count and many transactions can be in flight at once. A
+background thread polls receipts and resolves each submission's Future.
+A transaction that is not mined within `replace_after` seconds is re-sent
+with the same nonce and a gas price raised by `gas_bump`; after
+`max_replacements` attempts its Future fails with TimeoutError, and its
+nonce is filled with a zero-value self-transfer so later transactions are
+not stuck behind a gap if the original was dropped.
+"""
+import threading
+import time
+from concurrent.futures import Future
+from web3.exceptions import TransactionNotFound
+
+
+class _Pending:
+    __slots__ = ("nonce", "tx", "future", "tx_hashes", "sent_at", "replacements", "cancel")
+
+    def __init__(self, nonce, tx, future, cancel=False):
+        self.nonce = nonce
+        self.tx = tx
+        self.future = future
+        self.tx_hashes = []  # every hash sent for this nonce; any one may get mined
+        self.sent_at = 0.0
+        self.replacements = 0
+        self.cancel = cancel  # a self-transfer filling the nonce of a failed transaction
+
+
+class TxSubmitter:
+    def __init__(self, w3, private_key, max_in_flight=64, poll_interval=0.5,
+                 replace_after=60.0, gas_bump=1.125, max_replacements=5, gas_price=None):
+        self.w3 = w3
+        self.private_key = private_key
+        self.address = w3.eth.account.from_key(private_key).address
+        self.poll_interval = poll_interval
+        self.replace_after = replace_after
+        self.gas_bump = gas_bump  # nodes require at least +10% to replace
+        self.max_replacements = max_replacements
+        self.gas_price = gas_price
+        self._chain_id = None
+        self._nonce = None
+        self._lock = threading.Lock()  # guards nonce assignment + send order
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._pending = {}  # nonce -> _Pending
+        self._pending_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.submitted = 0
+        self.confirmed = 0
+        self.replaced = 0
+        self.failed = 0
+        self.cancelled = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._poll_loop, daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self, timeout=None):
+        """Wait up to `timeout` for in-flight transactions, then stop polling."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.in_flight() and (deadline is None or time.monotonic() < deadline):
+            time.sleep(self.poll_interval)
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def in_flight(self):
+        with self._pending_lock:
+            return len(self._pending)
+
+    def submit(self, tx):
+        """
+        Sign and send `tx` (a dict without nonce; chainId and gasPrice are
+        filled in if missing) and return a Future for its receipt. Blocks
+        only while `max_in_flight` transactions are already pending.
+        """
+        self._slots.acquire()
+        future = Future()
+        try:
+            with self._lock:
+                if self._nonce is None:
+                    self._sync_nonce()
+                tx = dict(tx)
+                tx.setdefault("chainId", self.chain_id())
+                if "gasPrice" not in tx and "maxFeePerGas" not in tx:
+                    tx["gasPrice"] = self.gas_price or self.w3.eth.gas_price
+                tx["nonce"] = self._nonce
+                pending = _Pending(self._nonce, tx, future)
+                self._send(pending)
+                self._nonce += 1
+        except Exception as e:
+            # The nonce was not consumed (or the node disagrees about it):
+            # resync so later submissions do not leave a gap
+            with self._lock:
+                self._nonce = None
+            self._slots.release()
+            future.set_exception(e)
+            return future
+        with self._pending_lock:
+            self._pending[pending.nonce] = pending
+        self.submitted += 1
+        return future
+
+    def metrics(self):
+        return {
+            "submitted": self.submitted,
+            "confirmed": self.confirmed,
+            "replaced": self.replaced,
+            "failed": self.failed,
+            "cancelled": self.cancelled,
+            "in_flight": self.in_flight(),
+        }
+
+    def chain_id(self):
+        if self._chain_id is None:
+            self._chain_id = self.w3.eth.chain_id
+        return self._chain_id
+
+    def _sync_nonce(self):
+        self._nonce = self.w3.eth.get_transaction_count(self.address, "pending")
+
+    def _send(self, pending):
+        signed = self.w3.eth.account.sign_transaction(pending.tx, private_key=self.private_key)
+        tx_hash = self.w3.eth.send_raw_transaction(signed.raw_transaction)
+        pending.tx_hashes.append(tx_hash)
+        pending.sent_at = time.monotonic()
+
+    def _replace(self, pending):
+        if pending.replacements >= self.max_replacements:
+            raise TimeoutError(f"Transaction with nonce {pending.nonce} not mined after "
+                               f"{pending.replacements} replacements")
+        pending.tx = self._bumped(pending.tx)
+        pending.replacements += 1  # counted even if the send fails, so this ends
+        self._send(pending)
+        self.replaced += 1
+
+    def _bumped(self, tx):
+        tx = dict(tx)
+        for key in ("gasPrice", "maxFeePerGas", "maxPriorityFeePerGas"):
+            if key in tx:
+                tx[key] = int(tx[key] * self.gas_bump) + 1
+        return tx
+
+    def _cancel(self, pending):
+        """
+        Fill the nonce of a transaction that was given up on with a
+        zero-value transfer to ourselves at a higher gas price. If the
+        original was dropped, this keeps later nonces from waiting forever.
+        If the cancel cannot be sent either (or is not mined), the local
+        counter is dropped so the next submit() resyncs from the node.
+        """
+        fees = {key: value for key, value in pending.tx.items()
+                if key in ("gasPrice", "maxFeePerGas", "maxPriorityFeePerGas")}
+        tx = self._bumped(dict(fees, to=self.address, value=0, gas=21000, nonce=pending.nonce,
+                               chainId=pending.tx["chainId"]))
+        cancel = _Pending(pending.nonce, tx, Future(), cancel=True)
+        cancel.replacements = self.max_replacements  # not bumped again
+        try:
+            if not self._slots.acquire(blocking=False):
+                raise RuntimeError("no free in-flight slot")
+            try:
+                self._send(cancel)
+            except Exception:
+                self._slots.release()
+                raise
+        except Exception as e:
+            print(f"Cancelling nonce {pending.nonce} failed ({e}); resyncing nonces from the node")
+            with self._lock:
+                self._nonce = None
+            return
+        with self._pending_lock:
+            self._pending[cancel.nonce] = cancel
+        self.cancelled += 1
+
+    def _receipt(self, pending):
+        for tx_hash in pending.tx_hashes:
+            try:
+                return self.w3.eth.get_transaction_receipt(tx_hash)
+            except TransactionNotFound:
+                continue
+        return None
+
+    def _finish(self, pending, receipt=None, error=None):
+        with self._pending_lock:
+            self._pending.pop(pending.nonce, None)
+        self._slots.release()
+        if pending.cancel:
+            if error is not None:
+                with self._lock:
+                    self._nonce = None
+            return
+        if error is not None:
+            self.failed += 1
+            pending.future.set_exception(error)
+        else:
+            self.confirmed += 1
+            pending.future.set_result(receipt)
+
+    def _poll_loop(self):
+        while not self._stop.is_set():
+            with self._pending_lock:
+                pendings = sorted(self._pending.values(), key=lambda p: p.nonce)
+            for pending in pendings:
+                try:
+                    receipt = self._receipt(pending)
+                except Exception as e:
+                    print(f"Receipt poll failed (will retry): {e}")
+                    break
+                if receipt is not None:
+                    self._finish(pending, receipt)
+                elif time.monotonic() - pending.sent_at > self.replace_after:
+                    try:
+                        self._replace(pending)
+                    except TimeoutError as e:
+                        self._finish(pending, error=e)
+                        if not pending.cancel:
+                            self._cancel(pending)
+                    except Exception as e:
+                        # e.g. "nonce too low": an earlier hash was mined meanwhile;
+                        # the next poll picks its receipt up
+                        print(f"Replacing tx with nonce {pending.nonce} failed: {e}")
+                        pending.sent_at = time.monotonic()
+            self._stop.wait(self.poll_interval)